@@ -1,11 +1,43 @@
 import discord
 from discord.ext import commands
 import asyncio
+import itertools
+import time
+import uuid
+from collections import OrderedDict
+from engine.bitboard import Position, NUM_CELLS
+from engine.book import Opening_Book
+from engine.cache import evaluation_cache
+from engine.mcts import mcts_job
+from engine.search import Negamax_Engine, DIFFICULTIES, CENTER_ORDER, WIN_SCORE, MIN_WIN_SCORE, search_job, rank_moves_job
+from utils.engine_pool import Engine_Pool, Engine_Pool_Full
+from utils.message_registry import message_registry
+from utils.render_queue import Render_Queue
+from utils.board_renderer import Board_Renderer
+from utils.timing_wheel import timing_wheel
+from utils.move_log import Move_Log
+from utils.stats import Stats_Store
+from utils.analysis_queue import Analysis_Queue
+from utils.metrics import handler_latency, moves_played, games_finished, live_games, pending_timers
 
 empty_space = "⚪"
 red_space = "🔴"
 yellow_space = "🟡"
 moves = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣", "6️⃣", "7️⃣"]
+engine_grace_period = 2  # Seconds an engine job may run past its time limit before the game stops waiting for it
+fallback_depth = 2  # Depth searched on the event loop when the engine pool can't answer in time
+turn_time_limit = 60  # Seconds a player has to make a move
+mailbox_size = 8  # Moves a game holds before new reactions have to wait
+mailbox_linger = 1  # Seconds a finished game keeps emptying its mailbox so no handler stays blocked on it
+leaderboard_size = 10  # Players listed by =leaderboard
+hint_level = "hard"  # Difficulty whose depth and time limit are used for hints
+analysis_depth = 10  # Depth each position of a post-game analysis is searched to
+analysis_time_limit = 1.0  # Seconds each position of a post-game analysis may be searched for
+max_analyses = 4  # Analyses running at once, more requests are turned away
+finished_games_kept = 1000  # Players whose last finished game is remembered for =analyze
+ponder_rank_depth = 6  # Depth of the quick search that guesses which replies the human will play
+ponder_slice = 0.5  # Seconds of each engine job a pondering search is split into, a cancelled search stops within one slice
+board_renderer = Board_Renderer({"*": empty_space, "r": red_space, "y": yellow_space})  # Shared so games reuse each other's rendered boards
 
 class Game_Manager(commands.Cog):
     """
@@ -13,6 +45,16 @@ class Game_Manager(commands.Cog):
     Attributes:
         client: The bot client
         games: Dict to store game instances
+        engine_pool: Worker processes shared by every game for engine searches
+        opening_book: Memory mapped book of early moves, None if it hasn't been generated
+        render_queue: Queue that coalesces embed edits for every game message
+        move_log: Crash-safe log of every live game's moves
+        recovered: Dict of games read back from the move log that haven't been resumed yet
+        stats_store: Database of every player's finished games
+        analysis_queue: Priority queue of positions searched for post-game analyses while the engine pool has room
+        finished_games: Ordered dict with player IDs as keys, values contain the player's last finished game, oldest first
+        analyses: Number of analyses running
+        analysis_order: Counter giving earlier analyses priority over later ones
     """
     def __init__(self, client):
         """
@@ -22,76 +64,397 @@ class Game_Manager(commands.Cog):
         """
         self.client = client
         self.games = {}
+        self.engine_pool = Engine_Pool()
+        self.opening_book = Opening_Book.open_if_exists()
+        self.render_queue = Render_Queue()
+        self.move_log = Move_Log()
+        self.recovered = self.move_log.load()
+        self.stats_store = Stats_Store()
+        self.analysis_queue = Analysis_Queue(self.engine_pool, analysis_depth, analysis_time_limit, max(1, self.engine_pool.workers // 2))  # Half the workers stay free for live games
+        self.finished_games = OrderedDict()
+        self.analyses = 0
+        self.analysis_order = itertools.count()
+        live_games.set_function(lambda: len(self.games))
+        pending_timers.set_function(lambda: timing_wheel.count)
+
+    async def cog_load(self):
+        """
+        Starts writing the move log and player stats and the analysis workers once the event loop is running
+        Parameters: self
+        Returns: None
+        """
+        self.move_log.start()
+        self.stats_store.start()
+        self.analysis_queue.start()
+
+    async def cog_unload(self):
+        """
+        Stops the engine worker processes, closes the opening book and writes the last moves and results when the cog is unloaded
+        Parameters: self
+        Returns: None
+        """
+        self.analysis_queue.stop()
+        self.engine_pool.shutdown()
+        if self.opening_book:
+            self.opening_book.close()
+        await self.move_log.close()
+        await self.stats_store.close()
 
     @commands.Cog.listener()
     async def on_ready(self):
         """
-        Prints a message when the file is running properly
+        Prints a message when the file is running properly and resumes games from before a restart
         Parameters: self
         Returns: None
         """
         print("Success! game_manager is active.")
+        await self.resume_games()
+
+    async def resume_games(self):
+        """
+        Rebuilds the games that were running when the bot stopped, games whose message is gone are dropped
+        Parameters: self
+        Returns: None
+        """
+        recovered = self.recovered
+        self.recovered = {}  # on_ready runs again after reconnects, games are only resumed once
+        resumed = 0
+        for game_id, state in recovered.items():
+            meta = state["meta"]
+            try:
+                channel = self.client.get_channel(meta["channel_id"]) or await self.client.fetch_channel(meta["channel_id"])
+                message = await channel.fetch_message(meta["message_id"])
+            except discord.HTTPException as error:
+                print(f"Could not resume game {game_id}: {error}")
+                self.move_log.end_game(game_id)
+                continue
+            game = Game(self.client, meta["players"], channel, uuid.UUID(game_id), self, meta["ai_level"])
+            game.started = meta.get("started", game.started)  # Logs from before stats were kept don't have it
+            if game.replay(state["moves"]):
+                self.move_log.end_game(game_id)  # The last move ended the game but the end wasn't logged before the stop
+                continue
+            self.games[game.game_id] = game
+            await game.resume_game(message, state["turn_started"])
+            resumed += 1
+        if recovered:
+            print(f"Resumed {resumed} of {len(recovered)} games from the move log.")
     
     @ commands.Cog.listener()
-    async def on_players_assigned(self, players, channel, game_id):
+    async def on_players_assigned(self, players, channel, game_id, ai_level = None):
         """
         Creates a new game instance when players are assigned and stores it in a dictionary
-        Parameters: self, players of type dict, text channel, unique game_id of type UUID
+        Parameters: self, players of type dict, text channel, unique game_id of type UUID, difficulty of the computer player of type str or None
         Returns: None
         """
-        game = Game(self.client, players, channel, game_id)
+        game = Game(self.client, players, channel, game_id, self, ai_level)
         self.games[game_id] = game
         await game.start_game()  # Start the game immediately
 
     @commands.Cog.listener()
-    async def on_reaction_add(self, reaction, user):
+    @handler_latency.time("game_reaction")
+    async def on_raw_reaction_add(self, payload):
         """
         Listens for reactions on game messages and calls the move method of the corresponding game instance
-        Parameters: self, reaction, user who reacted
+        Raw events arrive even when the message isn't cached, only the IDs in the payload are used
+        Parameters: self, payload of type discord.RawReactionActionEvent
+        Returns: None
+        """
+        game = message_registry.get(payload.message_id)
+        emoji = str(payload.emoji)
+        if isinstance(game, Game) and emoji in moves:  # Ignore reactions on messages that aren't games
+            await game.move(moves.index(emoji), payload.user_id)
+
+    @commands.command()
+    @handler_latency.time("hint")
+    async def hint(self, ctx):
+        """
+        Sends the engine's best column and its evaluation for the caller's game in this channel
+        Parameters: self, ctx
+        Returns: None
+        """
+        game = next((game for game in self.games.values() if game.channel.id == ctx.channel.id and ctx.author.id in (game.red_id, game.yellow_id)), None)
+        if game is None or game.game_over:
+            embeded_msg = discord.Embed(title = "No game", description = "You aren't playing a game in this channel.", color = discord.Color.orange())
+            await ctx.channel.send(embed = embeded_msg)
+            return
+        if ctx.author.id != game.current_player_id():
+            embeded_msg = discord.Embed(title = "Not your turn", description = "Hints are for the player whose turn it is.", color = discord.Color.orange())
+            await ctx.channel.send(embed = embeded_msg)
+            return
+
+        position = game.board.copy()  # The game can move on while the engine searches
+        limits = DIFFICULTIES[hint_level]
+        result = await game.search(position, limits["depth"], limits["time_limit"])
+        if result is None:
+            return  # The game ended while searching
+        column, score, depth = result
+        embeded_msg = discord.Embed(title = "Hint", description = f"Play column {column + 1} {moves[column]}. {self.describe_score(position, score, depth)}", color = discord.Color.orange())
+        await ctx.channel.send(embed = embeded_msg)
+
+    def describe_score(self, position, score, depth):
+        """
+        Explains a search score for the player to move
+        Parameters: self, position of type Position, score for the player to move of type int, depth searched of type int
+        Returns: String describing the score
+        """
+        played = len(position.moves)
+        if score >= MIN_WIN_SCORE:
+            return f"You can force a win within {(WIN_SCORE - score - played + 1) // 2} of your moves."
+        if score <= -MIN_WIN_SCORE:
+            return f"Your opponent can force a win within {(WIN_SCORE + score - played) // 2} of their moves, this holds out the longest."
+        if depth >= NUM_CELLS - played:
+            return "With perfect play the game ends in a tie."
+        return f"Evaluation {score:+d} after looking {depth} moves ahead."
+
+    @commands.command()
+    @handler_latency.time("stats")
+    async def stats(self, ctx, user: discord.User = None):
+        """
+        Sends the record of the caller or of the mentioned player
+        Parameters: self, ctx, user of type discord.User or None for the caller
+        Returns: None
+        """
+        player = user or ctx.author
+        record = await self.stats_store.player_record(player.id)
+        if record is None:
+            embeded_msg = discord.Embed(title = "No games", description = f"{player.display_name} hasn't finished a game yet.", color = discord.Color.orange())
+            await ctx.channel.send(embed = embeded_msg)
+            return
+        decided = record["wins"] + record["losses"]
+        embeded_msg = discord.Embed(title = f"{record['name']}'s record", description = f"Rank #{record['rank']} on the leaderboard.", color = discord.Color.orange())
+        embeded_msg.add_field(name = "Games", value = record["games"])
+        embeded_msg.add_field(name = "Wins", value = record["wins"])
+        embeded_msg.add_field(name = "Losses", value = record["losses"])
+        embeded_msg.add_field(name = "Ties", value = record["ties"])
+        embeded_msg.add_field(name = "Timeouts", value = record["timeouts"])
+        embeded_msg.add_field(name = "Win rate", value = f"{record['wins'] / decided:.0%}" if decided else "-")
+        embeded_msg.add_field(name = "Average game", value = f"{record['moves'] / record['games']:.0f} moves, {record['duration'] / record['games']:.0f} seconds", inline = False)
+        await ctx.channel.send(embed = embeded_msg)
+
+    @stats.error
+    async def stats_error(self, ctx, error):
+        """
+        Answers a =stats for a player who can't be found, without the members intent only mentions and IDs can be looked up
+        Parameters: self, ctx, error raised by the command
         Returns: None
         """
-        for game_id, game in self.games.items():
-            if game.message.id == reaction.message.id:
-                await game.move(reaction, user)
+        if not isinstance(error, commands.BadArgument):
+            raise error
+        embeded_msg = discord.Embed(title = "Player not found", description = "Use =stats, =stats @player or =stats followed by a user ID.", color = discord.Color.orange())
+        await ctx.channel.send(embed = embeded_msg)
+
+    @commands.command()
+    @handler_latency.time("leaderboard")
+    async def leaderboard(self, ctx):
+        """
+        Sends the players with the most wins
+        Parameters: self, ctx
+        Returns: None
+        """
+        rows = await self.stats_store.leaderboard(leaderboard_size)
+        if rows:
+            lines = [f"**{place}.** {name}: {wins} wins, {losses} losses, {ties} ties in {games} games" for place, (name, games, wins, losses, ties) in enumerate(rows, 1)]
+        else:
+            lines = ["Nobody has finished a game yet."]
+        embeded_msg = discord.Embed(title = "Leaderboard", description = "\n".join(lines), color = discord.Color.orange())
+        await ctx.channel.send(embed = embeded_msg)
     
+    @commands.command()
+    @handler_latency.time("analyze")
+    async def analyze(self, ctx):
+        """
+        Evaluates every move of the caller's last finished game, flagging blunders and missed wins as the results come in
+        Parameters: self, ctx
+        Returns: None
+        """
+        finished = self.finished_games.get(ctx.author.id)
+        if finished is None or not finished["moves"]:
+            embeded_msg = discord.Embed(title = "No game", description = "You haven't finished a game with any moves since the bot started.", color = discord.Color.orange())
+            await ctx.channel.send(embed = embeded_msg)
+            return
+        if self.analyses >= max_analyses:
+            embeded_msg = discord.Embed(title = "Analysis busy", description = "Too many games are being analyzed, try again in a minute.", color = discord.Color.orange())
+            await ctx.channel.send(embed = embeded_msg)
+            return
+
+        self.analyses += 1
+        try:
+            columns = finished["moves"]
+            positions = [Position.from_moves(columns[:ply]) for ply in range(len(columns) + 1)]
+            # Every position before a move is searched, and so is the last position unless the last move ended the game
+            last = len(columns) if not self.game_ended(positions[-2], columns[-1]) else len(columns) - 1
+            order = next(self.analysis_order)
+            tasks = [asyncio.create_task(self.evaluate_ply(positions[ply], ply, (order, ply))) for ply in range(last + 1)]
+            results = {}
+            message = await ctx.channel.send(embed = self.analysis_embed(finished, positions, results, len(tasks)))
+            for task in asyncio.as_completed(tasks):
+                ply, result = await task
+                results[ply] = result
+                self.render_queue.submit(message, self.analysis_embed(finished, positions, results, len(tasks)))  # Only the newest embed gets sent
+        finally:
+            self.analyses -= 1
+
+    async def evaluate_ply(self, position, ply, priority):
+        """
+        Evaluates one position of an analysis
+        Parameters: self, position of type Position, ply of the position of type int, priority of type tuple
+        Returns: Tuple of (ply, (best column, score, depth reached))
+        """
+        return ply, await self.analysis_queue.evaluate(position, priority)
+
+    def game_ended(self, position, column):
+        """
+        Checks if a move ends the game
+        Parameters: self, position before the move of type Position, column index of type int
+        Returns: True or False based on if the move wins or fills the board
+        """
+        return position.is_winning_move(column) or len(position.moves) + 1 == NUM_CELLS
+
+    def judge_move(self, position, column, before, after):
+        """
+        Compares a move with the engine's best move
+        Parameters: self, position before the move of type Position, column played of type int, result of the position before the move, result of the position after the move or None if the move ended the game
+        Returns: String describing the move, empty if there is nothing to flag
+        """
+        best_column, best_score, _ = before
+        if after is None:
+            played_score = WIN_SCORE if position.is_winning_move(column) else 0
+        else:
+            played_score = -after[1]  # The score after the move is for the opponent
+        if column == best_column:
+            return ""
+        if best_score >= MIN_WIN_SCORE and played_score < MIN_WIN_SCORE:
+            return f"missed win, {moves[best_column]} wins"
+        if played_score <= -MIN_WIN_SCORE and best_score > -MIN_WIN_SCORE:
+            return f"blunder, {moves[best_column]} was better"
+        return ""
+
+    def analysis_embed(self, finished, positions, results, total):
+        """
+        Lists every move of an analyzed game with the moves judged so far
+        Parameters: self, finished game of type dict, positions before and after each move of type list of Position, results of type dict with plies as keys, total number of positions searched of type int
+        Returns: discord.Embed
+        """
+        lines = []
+        flagged = {"red": 0, "yellow": 0}
+        columns = finished["moves"]
+        for ply, column in enumerate(columns):
+            color = "red" if ply % 2 == 0 else "yellow"
+            after = None if ply + 1 == len(columns) and self.game_ended(positions[ply], column) else ply + 1
+            if ply not in results or (after is not None and after not in results):
+                note = "..."
+            else:
+                note = self.judge_move(positions[ply], column, results[ply], None if after is None else results[after])
+                if note:
+                    flagged[color] += 1
+                    note = f"**{note}**"
+            lines.append(f"{ply + 1}. {red_space if color == 'red' else yellow_space} {moves[column]} {note}")
+        done = len(results) == total
+        title = "Analysis" if done else f"Analyzing ({len(results)} of {total} positions)"
+        embeded_msg = discord.Embed(title = title, description = "\n".join(lines)[:4096], color = discord.Color.orange())
+        if done:
+            embeded_msg.add_field(name = "", value = f"Flagged moves: {finished['red_name']} {flagged['red']}, {finished['yellow_name']} {flagged['yellow']}.", inline = False)
+        return embeded_msg
+
+    def remember_game(self, game):
+        """
+        Keeps a finished game's moves so its players can analyze it
+        Parameters: self, game of type Game
+        Returns: None
+        """
+        finished = {"game_id": game.game_id, "moves": game.board.serialize(), "red_name": game.red_name, "yellow_name": game.yellow_name}
+        for player_id in (game.red_id, game.yellow_id):
+            self.finished_games.pop(player_id, None)
+            self.finished_games[player_id] = finished
+        while len(self.finished_games) > finished_games_kept:
+            self.finished_games.popitem(last = False)
+
     @commands.Cog.listener()
     async def on_game_over(self, game_id):
         """
-        Listens for if a game is over and removes it from dictionary
+        Listens for if a game is over and removes it from dictionary and the message registry
         Parameters: self, unique game id of type UUID
         Returns: None
         """
-        self.games.pop(game_id)
+        game = self.games.pop(game_id)
+        message_registry.remove(game.message.id)
+
+class Column_Buttons(discord.ui.View):
+    """
+    Class contains the seven column buttons of a game, presses are sent straight to the game
+    Attributes:
+        game: Game the buttons play moves in
+    """
+    def __init__(self, game):
+        """
+        Initializes a button for each column, the custom IDs include the game ID so the view keeps working after a restart
+        Parameters: self, game of type Game
+        Returns: None
+        """
+        super().__init__(timeout = None)  # The game's own turn timer ends it
+        self.game = game
+        for column, emoji in enumerate(moves):
+            button = discord.ui.Button(emoji = emoji, style = discord.ButtonStyle.secondary, custom_id = f"connect4:{game.game_id}:{column}", row = column // 4)
+            button.callback = self.make_callback(column)
+            self.add_item(button)
+
+    def make_callback(self, column):
+        """
+        Creates the function called when a column's button is pressed
+        Parameters: self, column index of type int
+        Returns: coroutine function taking the interaction
+        """
+        async def press(interaction):
+            await self.game.button_move(interaction, column)
+        return press
 
 class Game:
     """
     Class contains functions related to game functionality
     Attributes:
         client: The bot client
-        board: 2D list representing the game board
+        board: Bitboard position representing the game board
+        rows: Rendered text of each row of the board, updated one row per move
         players: Dict with keys containing player colors, values contain names and IDs
         red_turn: Boolean indicating if it's red's turn
         game_over: Boolean indicating if the game is over
         channel: Text channel where the game is played
         game_id: Unique game ID
         message: Display to be edited later
-        timeout_task: Background task for the timeout timer to prevent AFK
+        timeout_handle: Timer on the shared timing wheel that ends the game if a player goes AFK
+        manager: Game_Manager cog holding the services shared between games
+        ai_level: Difficulty of the computer player seated as yellow, None if both players are human
+        view: Column_Buttons on the game message, None until the message is sent
+        mailbox: Bounded queue of moves and timeouts, applied one at a time by the game's actor task
+        actor: Task applying everything sent to the mailbox in order, None until the game starts
+        ponder_task: Task searching the human's likely replies while they think, None when the computer isn't pondering
+        pondered: Dict with the moves of a position after a human reply as keys, values contain the task searching it
+        started: Time the game started at from time.time(), used for the game's duration in the player stats
     """
-    def __init__(self, client, players, channel, game_id):
+    def __init__(self, client, players, channel, game_id, manager, ai_level = None):
         """
         Initializes the game and assigns players
-        Parameters: client of type commands.Bot, players of type dict, text channel, unique game_id of type UUID
+        Parameters: client of type commands.Bot, players of type dict, text channel, unique game_id of type UUID, manager of type Game_Manager, difficulty of the computer player of type str or None
         Returns: None
         """
         self.client = client
         self.board = self.create_board()
+        self.rows = board_renderer.render_rows(self.board)
         self.players = players
         self.red_turn = True  # Red will always go first
         self.game_over = False
         self.channel = channel
         self.game_id = game_id
         self.message = None
-        self.timeout_task = None
+        self.timeout_handle = None
+        self.manager = manager
+        self.ai_level = ai_level
+        self.view = None
+        self.mailbox = asyncio.Queue(mailbox_size)
+        self.actor = None
+        self.ponder_task = None
+        self.pondered = {}
+        self.started = time.time()
 
         # Assign player names and IDs
         self.red_name = self.players.get("red")[0]
@@ -99,6 +462,7 @@ class Game:
         self.red_id = self.players.get("red")[1]
         self.yellow_id = self.players.get("yellow")[1]
     
+    @handler_latency.time("start_game")
     async def start_game(self):
         """
         Starts the game by sending the initial message and setting up the board
@@ -109,58 +473,81 @@ class Game:
         embeded_msg = discord.Embed(title = "Red's Turn", description = f"{self.red_name} is Red, {self.yellow_name} is Yellow.", color = discord.Color.red())
         embeded_msg.add_field(name = "", value = "You have 60 seconds to make your move.", inline = False)
         embeded_msg.add_field(name = "", value = self.display_board(self.board), inline = False)
-        self.message = await self.channel.send(embed = embeded_msg)
-        for move in moves:
-            await self.message.add_reaction(move)
-        await self.check_timeout("Red", discord.Color.red())  # Check if red player times out
+        self.view = Column_Buttons(self)
+        self.message = await self.channel.send(embed = embeded_msg, view = self.view)  # One request instead of one per reaction
+        message_registry.add(self.message.id, self)  # Players can still react with the number emojis themselves
+        self.manager.move_log.start_game(self.game_id, {"players": self.players, "channel_id": self.channel.id, "message_id": self.message.id, "ai_level": self.ai_level, "started": self.started})
+        self.actor = asyncio.create_task(self.run())
+        self.check_timeout("Red", discord.Color.red())  # Check if red player times out
+
+    def replay(self, moves):
+        """
+        Plays the moves read back from the move log on the empty board
+        Parameters: self, moves of type bytes with one column index per move
+        Returns: True or False based on if the moves ended the game
+        """
+        for column in moves:
+            self.update_board(self.check_below(self.board, column), self.board, column)
+        self.red_turn = self.board.red_turn
+        return self.check_win(self.board, "Red") or self.check_win(self.board, "Yellow") or self.check_tie(self.board)
+
+    async def resume_game(self, message, turn_started):
+        """
+        Continues a replayed game in its old message with the time the player had left before the restart
+        Parameters: self, message of the game, time the current turn started of type float
+        Returns: None
+        """
+        self.message = message
+        message_registry.add(self.message.id, self)
+        self.view = Column_Buttons(self)
+        self.client.add_view(self.view, message_id = self.message.id)  # Route presses on the old message's buttons to this game
+        if self.red_turn:
+            player = "Red"
+            color = discord.Color.red()
+        else:
+            player = "Yellow"
+            color = discord.Color.yellow()
+        time_left = max(0, turn_time_limit - (time.time() - turn_started))
+        embeded_msg = discord.Embed(title = f"{player}'s Turn", description = f"{self.red_name} is Red, {self.yellow_name} is Yellow.", color = color)
+        embeded_msg.add_field(name = "", value = f"The game was resumed after a restart. You have {time_left:.0f} seconds to make your move.", inline = False)
+        embeded_msg.add_field(name = "", value = self.display_board(self.board), inline = False)
+        self.manager.render_queue.submit(self.message, embeded_msg, view = self.view)
+        self.actor = asyncio.create_task(self.run())
+        self.check_timeout(player, color, time_left)
+        if self.ai_level and not self.red_turn:
+            self.mailbox.put_nowait((self.ai_move,))  # The computer was thinking when the bot stopped
+        elif self.ai_level:
+            self.start_pondering()
     
     def create_board(self):
         """
-        Initializes a 6 x 7 empty board at the start of the game
+        Initializes an empty 6 x 7 board at the start of the game
         Parameters: self
-        Returns: 2D list representing empty board
-        """
-        num_rows = 6
-        num_cols = 7
-        board = []
-        for i in range(num_rows):
-            a_row = []
-            for j in range(num_cols):
-                a_row.append("*")  # "*" signifies an empty space
-            board.append(a_row)
-        return(board)
+        Returns: Position representing empty board
+        """
+        return Position()
 
     def display_board(self, board):
         """
         Creates a string representation of the board
-        Parameters: self, board of type 2D list
+        Parameters: self, board of type Position
         Returns: String representing board
         """
-        adjust_factor = 5
-        display = ""
-        for row in board:
-            for element in row:
-                if element == "*":
-                    element = empty_space
-                elif element == "r":
-                    element = red_space
-                else:
-                    element = yellow_space
-                display += element.rjust(adjust_factor)
-            display += "\n"  # Create a new line
-        return display
+        if board is self.board:
+            return board_renderer.render(board, self.rows)  # Rows are already up to date, see update_board
+        return board_renderer.render(board)
 
     def update_board(self, row_placed, board, column):
         """
         Updates the board based on player moves
-        Parameters: self, board of type 2D list, column index of type int
+        Parameters: self, row index of type int, board of type Position, column index of type int
         Returns: None
         """
-        if self.red_turn:
-            board[row_placed][column] = "r"
-        else:
-            board[row_placed][column] = "y"
+        board.play(column)  # The position tracks whose turn it is, so the piece always lands in row_placed
+        if board is self.board:
+            self.rows[row_placed] = board_renderer.render_row(board, row_placed)  # Only the row the piece landed in changed
     
+    @handler_latency.time("update_embed")
     async def update_embed(self):
         """
         Updates the embed showing the game board and who's turn it is
@@ -168,182 +555,60 @@ class Game:
         Returns: None
         """
         if self.red_turn:
-            next_player = "Yellow"
-            color = discord.Color.yellow()
-        else:
             next_player = "Red"
             color = discord.Color.red()
+        else:
+            next_player = "Yellow"
+            color = discord.Color.yellow()
         embeded_msg = discord.Embed(title = f"{next_player}'s Turn", description = f"{self.red_name} is Red, {self.yellow_name} is Yellow.", color = color)
         embeded_msg.add_field(name = "", value = "You have 60 seconds to make your move.", inline = False)
         embeded_msg.add_field(name = "", value = self.display_board(self.board), inline = False)
-        await self.message.edit(embed = embeded_msg)
+        await self.show(embeded_msg)
+
+    async def show(self, embeded_msg, **changes):
+        """
+        Shows an embed on the game message through the render queue, button presses are already acknowledged
+        Parameters: self, embeded_msg of type discord.Embed, other changes to the message such as view
+        Returns: None
+        """
+        self.manager.render_queue.submit(self.message, embeded_msg, **changes)  # Only the newest embed gets sent
 
     def check_below(self, board, column):
         """
         Gets the lowest row a piece can be (i.e the highest index for an empty space character)
-        Parameters: self, board of type 2D list, column index of type int
-        Returns: highest possible row index of type int
-        """
-        rows = len(board)
-        for i in range(rows):
-            if board[i][column] != '*':
-                return i - 1
-        return rows - 1
-    
-    def find_adjacent(self, board, char, row_index, col_index):
-        """
-        Finds the coordinates of adjacent same colored pieces
-        Parameters: self, board of type 2D list, char of type str, row index of type int, column index of type int
-        Returns: List of tuples containing coordinates of adjacent pieces
-        """
-        rows = len(board)
-        cols = len(board[0])
-        coords = []
-        # Up
-        if row_index-1 in range(rows):
-            if board[row_index-1][col_index] == char:
-                coords.append((row_index-1,col_index))
-        # Down
-        if row_index+1 in range(rows):
-            if board[row_index+1][col_index] == char:
-                coords.append((row_index+1,col_index))
-        # Left
-        if col_index-1 in range(cols):
-            if board[row_index][col_index-1] == char:
-                coords.append((row_index,col_index-1))
-        # Right
-        if col_index+1 in range(cols):
-            if board[row_index][col_index+1] == char:
-                coords.append((row_index,col_index+1))
-        # Up-Left
-        if row_index-1 in range(rows) and col_index-1 in range(cols):
-            if board[row_index-1][col_index-1] == char:
-                coords.append((row_index-1,col_index-1))
-        # Up-Right
-        if row_index-1 in range(rows) and col_index+1 in range(cols):
-            if board[row_index-1][col_index+1] == char:
-                coords.append((row_index-1,col_index+1))
-        # Down-Left
-        if row_index+1 in range(rows) and col_index-1 in range(cols):
-            if board[row_index+1][col_index-1] == char:
-                coords.append((row_index+1,col_index-1))
-        # Down-Right
-        if row_index+1 in range(rows) and col_index+1 in range(cols):
-            if board[row_index+1][col_index+1] == char:
-                coords.append((row_index+1,col_index+1))
-
-        return coords
-    
-    def find_directions(self, coords, row_index, col_index):
-        """
-        Determines the directions a win is possible in
-        Parameters: self, coords of type list of tuples, row index of type int, column index of type int
-        Returns: Dictionary of directions with boolean values
-        """
-        # row_index: row index of the most recently placed piece
-        # col_index: col index of the most recently placed piece
-
-        directions = {}
-        # dictionary to ignore repeats
-
-        for x,y in coords:
-            # Horizontal wins -> there's only a difference of index in the columns
-            if x-row_index == 0 and y-col_index in [-1,1]:
-                directions['horizontal'] = True
-            # Verticle wins -> there's only a difference of index in the rows
-            elif x-row_index in [-1,1] and y-col_index == 0:
-                directions['verticle'] = True
-            # backslash diagonal wins -> there must either be a exclusively positive or negative difference of index in the rows and columns
-            elif (x-row_index == -1 and y-col_index == -1) or (x-row_index == 1 and y-col_index == 1):
-                directions['backslash-diag'] = True
-            # slash diagonal wins -> you get the idea
-            elif (x-row_index == 1 and y-col_index == -1) or (x-row_index == -1 and y-col_index == 1):
-                directions['slash-diag'] = True
-        return directions
-    
-    def check_win(self, board, color, row_index, col_index, direction):
-        """
-        Checks if a player has won by counting the pieces in a given direction
-        Parameters: self, board of type 2D list, color of type str, row index of type int, column index of type int, direction of type str
-        Returns: Count of linked of pieces of type int
-        """
-        rows = len(board)
-        cols = len(board[0])
-        count = 1
-        char = color.lower()[0]
-
-        # based on the recent placement, count adjacent pieces moving outward (think like a water drop on undistrubed water)
-        if direction == 'horizontal':
-            # Range (1,4) so we start counting the spaces +-1 through +-3
-            for i in range(1,4):
-                # Once we connect 4, stop checking. Applies for each of these conditionals
-                if count == 4:
-                    break
-                # Double "if" statements to prevent accessing a nonexistent index. Applies for each of these conditionals
-                if col_index-i in range(cols):
-                    # check if the board at the index is the same color piece and the previous one in this direction was a same color piece
-                    if board[row_index][col_index-i] == char and board[row_index][col_index-i+1] == char:
-                        count+=1
-                if col_index+i in range(cols):
-                    if board[row_index][col_index+i] == char and board[row_index][col_index+i-1] == char:
-                        count+=1
-        elif direction == 'verticle':
-            for i in range(1,4):
-                if count == 4:
-                    break
-                if row_index-i in range(rows):
-                    if board[row_index-i][col_index] == char and board[row_index-i+1][col_index] == char:
-                        count+=1
-                if row_index+i in range(rows):
-                    if board[row_index+i][col_index] == char and board[row_index+i-1][col_index] == char:
-                        count+=1
-        elif direction == 'backslash-diag':
-            for i in range(1,4):
-                if count == 4:
-                    break
-                if row_index-i in range(rows) and col_index-i in range(cols):
-                    if board[row_index-i][col_index-i] == char and board[row_index-i+1][col_index-i+1] == char:
-                        count+=1
-                if row_index+i in range(rows) and col_index+i in range(cols):
-                    if board[row_index+i][col_index+i] == char and board[row_index+i-1][col_index+i-1] == char:
-                        count+=1
-        elif direction == 'slash-diag':
-            for i in range(1,4):
-                if count == 4:
-                    break
-                if row_index+i in range(rows) and col_index-i in range(cols):
-                    if board[row_index+i][col_index-i] == char and board[row_index+i-1][col_index-i+1] == char:
-                        count+=1
-                if row_index-i in range(rows) and col_index+i in range(cols):
-                    if board[row_index-i][col_index+i] == char and board[row_index-i+1][col_index+i-1] == char:
-                        count+=1
-        return count == 4
-    
+        Parameters: self, board of type Position, column index of type int
+        Returns: highest possible row index of type int, -1 if the column is full
+        """
+        return board.next_row(column)
+
+    def check_win(self, board, color):
+        """
+        Checks if a player has connected four pieces in any direction
+        Parameters: self, board of type Position, color of type str
+        Returns: True or False based on if the color has won
+        """
+        return board.has_won(color)
+
     def check_tie(self, board):
         """
-        Counts each piece on the board and determines if it is full 
-        Parameters: self, board of type 2D list
+        Determines if the board is full
+        Parameters: self, board of type Position
         Returns: True or False based on if board is full
         """
-        full_count = 0
-        num_rows = len(board)
-        num_cols = len(board[0])
-        for i in range(num_rows):
-            for j in range(num_cols):
-                if board[i][j] != '*':
-                    full_count += 1
-        return full_count == num_rows * num_cols
-    
+        return board.is_full()
+
     async def game_won(self, winner, loser, color):
         """
         Updates the embed when a player wins
         Parameters: self, winner of type str, loser of type str
         Returns: None
         """
+        games_finished.inc("win")
+        self.record_result("loss" if self.red_turn else "win", "win" if self.red_turn else "loss")  # The turn already passed to the loser
+        self.dispatch_game_over()
         embeded_msg = discord.Embed(title = "Game Over!", description = f"{winner} has beaten {loser} at Connect Four!", color = color)
         embeded_msg.add_field(name = "", value = self.display_board(self.board), inline = False)
-        await self.message.edit(embed = embeded_msg)
-        self.dispatch_game_over()
+        await self.show(embeded_msg, view = None)  # Remove the buttons
     
     async def game_tied(self):
         """
@@ -351,97 +616,344 @@ class Game:
         Parameters: self
         Returns: None
         """
+        games_finished.inc("tie")
+        self.record_result("tie", "tie")
+        self.dispatch_game_over()
         embeded_msg = discord.Embed(title = "Game Over!", description = f"The game is a tie, neither {self.red_name} or {self.yellow_name} won.", color = discord.Color.orange())
         embeded_msg.add_field(name = "", value = self.display_board(self.board), inline = False)
-        await self.message.edit(embed = embeded_msg)
-        self.dispatch_game_over()
+        await self.show(embeded_msg, view = None)
     
-    async def timeout_timer(self, player, color):
+    async def timeout_timer(self, player, color, ply):
         """
-        Counts down time for a move and cancels game if timeout occurs, does nothing otherwise
-        Parameters: self, player color of type str, color of type discord.Color
+        Cancels the game when a player runs out of time, sent to the mailbox by the timing wheel once the turn timer expires
+        Parameters: self, player color of type str, color of type discord.Color, number of moves played when the turn started of type int
         Returns: None
         """
-        try:
-            await asyncio.sleep(60)
-            self.game_over = True
-            embeded_msg = discord.Embed(title = "Connect Four game cancelled", description = f"{player} has timed out.", color = color)
-            embeded_msg.add_field(name = "", value = self.display_board(self.board), inline = False)
-            await self.message.edit(embed = embeded_msg)
-            self.dispatch_game_over()
-        except asyncio.CancelledError:
-            pass  # If task is cancelled, do nothing
+        if self.game_over or ply != len(self.board.moves):
+            return  # A move got in ahead of the timeout
+        self.game_over = True
+        games_finished.inc("timeout")
+        self.record_result("timeout" if player == "Red" else "win", "timeout" if player == "Yellow" else "win")  # Whoever is still there wins on time
+        self.dispatch_game_over()
+        embeded_msg = discord.Embed(title = "Connect Four game cancelled", description = f"{player} has timed out.", color = color)
+        embeded_msg.add_field(name = "", value = self.display_board(self.board), inline = False)
+        await self.show(embeded_msg, view = None)
     
-    def check_timeout(self, player, color):
+    def check_timeout(self, player, color, time_limit = turn_time_limit):
         """
-        Checks if a player times out by creating coroutines to act as a turn timer
-        Parameters: self, player color of type str, color of type discord.Color
+        Checks if a player times out by starting or moving the game's timer on the shared timing wheel
+        Parameters: self, player color of type str, color of type discord.Color, seconds the player has of type float
         Returns: None
         """
-        if self.timeout_task:
-            self.timeout_task.cancel()  # Cancel previous task
-        self.timeout_task = asyncio.create_task(self.timeout_timer(player, color))  # Create new task if there is no previous task    
+        ply = len(self.board.moves)
+        if self.timeout_handle:
+            timing_wheel.reschedule(self.timeout_handle, time_limit, (self.timeout_timer, player, color, ply))  # Restart the timer for the next player
+        else:
+            self.timeout_handle = timing_wheel.schedule(time_limit, self.mailbox.put, (self.timeout_timer, player, color, ply))  # Timeouts wait in line behind moves
     
+    def record_result(self, red_outcome, yellow_outcome):
+        """
+        Queues the result of the game to be written to the player stats
+        Parameters: self, red_outcome of type str, yellow_outcome of type str, each "win", "loss", "tie" or "timeout"
+        Returns: None
+        """
+        players = {"red": (self.red_name, self.red_id, red_outcome), "yellow": (self.yellow_name, self.yellow_id, yellow_outcome)}
+        self.manager.stats_store.record_game(self.game_id, players, len(self.board.moves), time.time() - self.started, self.ai_level)
+
     def dispatch_game_over(self):
         """
-        Dispatches a custom event when the game is over
+        Dispatches a custom event when the game is over, drops engine work nobody will use and logs the end of the game
         Parameters: self
         Returns: None
         """
+        self.stop_pondering()
+        self.manager.engine_pool.cancel(self.game_id)
+        if self.view:
+            self.view.stop()  # Stop routing button presses to the finished game
+        self.manager.move_log.end_game(self.game_id)
+        self.manager.remember_game(self)
         self.client.dispatch("game_over", self.game_id)
 
-    async def move(self, reaction, user):
+    async def run(self):
+        """
+        Applies everything sent to the mailbox one at a time until the game ends, so moves never overlap
+        Parameters: self
+        Returns: None
+        """
+        while not self.game_over:
+            function, *args = await self.mailbox.get()
+            try:
+                await function(*args)
+            except Exception as error:
+                print(f"Game {self.game_id} failed to run {function.__name__}: {error!r}")
+        # Keep emptying the mailbox for a moment so handlers waiting on a full mailbox don't wait forever
+        while True:
+            try:
+                await asyncio.wait_for(self.mailbox.get(), mailbox_linger)
+            except asyncio.TimeoutError:
+                break
+
+    def current_player_id(self):
+        """
+        Gets the ID of the player whose turn it is
+        Parameters: self
+        Returns: user ID of type int
+        """
+        return self.red_id if self.red_turn else self.yellow_id
+
+    async def move(self, column, user_id):
         """
-        Processes a player's move, checking victory conditions, updating the board and timeouts
-        Parameters: self, reaction, user who reacted
+        Sends a player's move from a reaction to the mailbox, waiting while the mailbox is full
+        Parameters: self, column index of type int, ID of the user who moved of type int
         Returns: None
         """
         if not self.game_over:
+            await self.mailbox.put((self.play_move, column, user_id, len(self.board.moves)))
 
-            # Red's move
-            if self.red_turn and reaction.emoji in moves and user.id == self.red_id:  # Check if valid player reacted with valid emoji
-                column = moves.index(reaction.emoji)
-                row_placed = self.check_below(self.board, column)
-                while row_placed < 0:  # While the chosen column is full
-                    reaction = await self.client.wait_for('reaction_add', check = lambda u, r : u == user and r.emoji in moves)  # Get another reaction until valid
-
-            # Repeat for Yellow's move
-            elif not self.red_turn and reaction.emoji in moves and user.id == self.yellow_id:
-                column = moves.index(reaction.emoji)
-                row_placed = self.check_below(self.board, column)
-                while row_placed < 0:
-                    reaction = await self.client.wait_for('reaction_add', check = lambda u, r : u == user and r.emoji in moves)
-            
-            self.update_board(row_placed, self.board, column)   
-            await self.update_embed()
-            
-            coords = self.find_adjacent(self.board, "r" if self.red_turn else "y", row_placed, column)
-            
-            directions = self.find_directions(coords, row_placed, column)
-
-            # Check win
-            for direction in directions.keys():
-                win = self.check_win(self.board, "Red" if self.red_turn else "Yellow", row_placed, column, direction)
-                if win:
-                    if self.red_turn:
-                        winner = self.red_name
-                        loser = self.yellow_name
-                        color = discord.Color.red()
-                    else:
-                        winner = self.yellow_name
-                        loser = self.red_name
-                        color = discord.Color.yellow()
-                    self.game_over = True
-                    await self.game_won(winner, loser, color)
-
-            # Check tie
-            if self.check_tie(self.board):
-                self.game_over = True
-                await self.game_tied()
-            
-            self.red_turn = not self.red_turn  # Switch turns
+    @handler_latency.time("button_move")
+    async def button_move(self, interaction, column):
+        """
+        Sends a player's move from a column button to the mailbox, answering presses that can't be played right away
+        Every other press is acknowledged here, the board itself is edited through the render queue
+        Parameters: self, interaction of the button press, column index of type int
+        Returns: None
+        """
+        if self.game_over or interaction.user.id != self.current_player_id():
+            await interaction.response.send_message("It's not your turn.", ephemeral = True)
+        elif self.check_below(self.board, column) < 0:
+            await interaction.response.send_message("That column is full, pick another one.", ephemeral = True)
+        else:
+            try:
+                self.mailbox.put_nowait((self.play_move, column, interaction.user.id, len(self.board.moves)))
+            except asyncio.QueueFull:
+                await interaction.response.send_message("Too many moves at once, try again.", ephemeral = True)
+            else:
+                await interaction.response.defer()  # Discord only waits 3 seconds for an answer, so don't wait for the move
+
+    @handler_latency.time("move")
+    async def play_move(self, column, user_id, ply):
+        """
+        Plays a move taken from the mailbox and lets the computer player reply
+        Moves made before the last move was played, by the wrong player or in a full column are dropped
+        Parameters: self, column index of type int, ID of the user who moved of type int, number of moves played when the move was made of type int
+        Returns: None
+        """
+        row_placed = self.check_below(self.board, column)
+        if self.game_over or ply != len(self.board.moves) or user_id != self.current_player_id() or row_placed < 0:
+            return  # The board the player saw is out of date
+        await self.apply_move(row_placed, column)
+
+        if self.ai_level and not self.game_over and not self.red_turn:
+            self.stop_pondering()
+            await self.ai_move()
 
+    async def ai_move(self):
+        """
+        Picks a column for the computer player and plays it
+        Parameters: self
+        Returns: None
+        """
+        book_move = self.book_move(self.board)
+        if book_move:
+            column, score = book_move
+        else:
+            pondered = self.pondered.pop(bytes(self.board.moves), None)
+            result = await pondered if pondered and not pondered.cancelled() else None  # Searched while the human was thinking, it may still be finishing
+            if result is None:
+                result = await self.think(self.board)
+            if result is None or self.game_over:
+                return  # The game ended while searching
+            column, score, depth = result
+        await self.apply_move(self.check_below(self.board, column), column)
+        if not self.game_over:
+            self.start_pondering()
+
+    def book_move(self, position):
+        """
+        Looks up a position in the opening book if the computer's difficulty uses it
+        Parameters: self, position of type Position
+        Returns: Tuple of (best column, score), None if the book isn't used or doesn't have the position
+        """
+        limits = DIFFICULTIES[self.ai_level]
+        book = self.manager.opening_book
+        if book and limits["book"]:
+            return book.lookup(position, limits["depth"])  # Records searched shallower than the difficulty are skipped
+        return None
+
+    async def think(self, position):
+        """
+        Searches a position with the engine and limits of the computer's difficulty
+        Parameters: self, position of type Position that stays unchanged during the search
+        Returns: Tuple of (best column, score, depth reached or playouts run), None if the game ended during the search
+        """
+        limits = DIFFICULTIES[self.ai_level]
+        if limits.get("engine") == "mcts":
+            return await self.search_mcts(position, limits["time_limit"])
+        return await self.search(position, limits["depth"], limits["time_limit"])
+
+    def start_pondering(self):
+        """
+        Starts searching the human's likely replies while they choose their move
+        Parameters: self
+        Returns: None
+        """
+        self.pondered = {}
+        self.ponder_task = asyncio.create_task(self.ponder(self.board.copy()))
+
+    async def ponder(self, position):
+        """
+        Searches the position after each reply one at a time, the replies a quick search rates best first
+        Stops early when the engine pool has no idle worker, so pondering never delays another game's move
+        Each search runs in short slices, so stopping the pondering frees its worker within ponder_slice seconds
+        Parameters: self, position of type Position with the human to move
+        Returns: None
+        """
+        try:
+            replies = await self.manager.engine_pool.submit(self.game_id, rank_moves_job, position.serialize(), ponder_rank_depth, timeout = engine_grace_period)
+        except (Engine_Pool_Full, asyncio.TimeoutError):
+            replies = None
+        for column in replies or CENTER_ORDER:
+            if not position.can_play(column) or position.is_winning_move(column):
+                continue  # The computer won't have to reply to a move that ends the game
+            if not self.manager.engine_pool.has_idle_worker():
+                return
+            reply = position.copy()
+            reply.play(column)
+            if self.book_move(reply):
+                continue  # Answered from the book without searching
+            search = asyncio.create_task(self.ponder_search(reply))
+            self.pondered[bytes(reply.moves)] = search
+            await asyncio.shield(search)  # Cancelling the pondering keeps the search the human's move may need
+
+    async def ponder_search(self, position):
+        """
+        Searches a position with the limits of the computer's difficulty in short engine jobs instead of one long one
+        A cancelled search only keeps its worker busy until the end of the current slice. Every slice runs on the game's
+        pinned worker, whose transposition table or MCTS tree carries what the earlier slices found
+        Parameters: self, position of type Position that stays unchanged during the search
+        Returns: Tuple of (best column, score, depth reached or playouts run), None if the game ended during the search
+        """
+        limits = DIFFICULTIES[self.ai_level]
+        mcts = limits.get("engine") == "mcts"
+        depth = limits.get("depth")
+        if not mcts:
+            result = evaluation_cache.get(position, depth)
+            if result:
+                return result
+        moves = position.serialize()
+        end = time.time() + limits["time_limit"]
+        result = None
+        while True:
+            deadline = min(end, time.time() + ponder_slice)
+            try:
+                if mcts:
+                    sliced = await self.manager.engine_pool.submit(self.game_id, mcts_job, moves, deadline, timeout = ponder_slice + engine_grace_period, pinned = True)
+                else:
+                    sliced = await self.manager.engine_pool.submit(self.game_id, search_job, moves, depth, deadline, timeout = ponder_slice + engine_grace_period, pinned = True)
+            except (Engine_Pool_Full, asyncio.TimeoutError):
+                break  # Keep the last finished slice, or search normally if there is none
+            if sliced is None:
+                return None  # The game ended
+            result = sliced
+            if deadline >= end:
+                break
+            if not mcts and (result[2] >= min(depth, NUM_CELLS - len(position.moves)) or abs(result[1]) >= MIN_WIN_SCORE):
+                break  # Searched as deep as the difficulty allows or the result is forced
+        if result is None:
+            return await self.think(position)
+        if not mcts:
+            evaluation_cache.put(position, depth, result)
+        return result
+
+    def stop_pondering(self):
+        """
+        Stops pondering once the human has moved, keeping only the search of the position they reached
+        Parameters: self
+        Returns: None
+        """
+        if self.ponder_task:
+            self.ponder_task.cancel()
+            self.ponder_task = None
+        reached = bytes(self.board.moves)
+        kept = self.pondered.get(reached) if not self.game_over else None
+        for search in self.pondered.values():
+            if search is not kept:
+                search.cancel()
+        self.pondered = {reached: kept} if kept else {}
+
+    async def search(self, position, depth, time_limit):
+        """
+        Finds the best move of a position, reusing results of the same or mirrored position from any game
+        Parameters: self, position of type Position that stays unchanged during the search, maximum depth of type int, time limit in seconds of type float
+        Returns: Tuple of (best column, score, depth reached), None if the game ended during the search
+        """
+        result = evaluation_cache.get(position, depth)
+        if result:
+            return result
+
+        deadline = time.time() + time_limit
+        try:
+            # Search in a worker process so other games keep handling reactions meanwhile
+            result = await self.manager.engine_pool.submit(self.game_id, search_job, position.serialize(), depth, deadline, timeout = time_limit + engine_grace_period)
+        except (Engine_Pool_Full, asyncio.TimeoutError):
+            depth = fallback_depth
+            result = Negamax_Engine(1024).best_move(position, depth)  # A shallow search is cheap enough to run here
+        if result is not None:
+            evaluation_cache.put(position, depth, result)
+        return result
+
+    async def search_mcts(self, position, time_limit):
+        """
+        Picks a move with Monte Carlo tree search, its results aren't shared through the evaluation cache since they aren't exact
+        Parameters: self, position of type Position that stays unchanged during the search, time limit in seconds of type float
+        Returns: Tuple of (best column, share of playouts the move won, playouts run), None if the game ended during the search
+        """
+        deadline = time.time() + time_limit
+        try:
+            # Pinned to one worker, which keeps the game's tree so the next search starts from what this one learned
+            return await self.manager.engine_pool.submit(self.game_id, mcts_job, position.serialize(), deadline, timeout = time_limit + engine_grace_period, pinned = True)
+        except (Engine_Pool_Full, asyncio.TimeoutError):
+            return Negamax_Engine(1024).best_move(position, fallback_depth)  # A shallow search is cheap enough to run here
+
+    async def apply_move(self, row_placed, column):
+        """
+        Places a piece for the player whose turn it is, checking victory conditions, updating the board and timeouts
+        The game is fully updated before the message is edited, so a failed edit only loses a frame
+        Parameters: self, row index of type int, column index of type int
+        Returns: None
+        """
+        self.update_board(row_placed, self.board, column)
+        self.manager.move_log.record_move(self.game_id, column)
+        moves_played.inc("computer" if self.ai_level and not self.red_turn else "human")
+
+        # Check win, then tie
+        won = self.check_win(self.board, "Red" if self.red_turn else "Yellow")
+        tied = not won and self.check_tie(self.board)
+        if won:
+            if self.red_turn:
+                winner = self.red_name
+                loser = self.yellow_name
+                color = discord.Color.red()
+            else:
+                winner = self.yellow_name
+                loser = self.red_name
+                color = discord.Color.yellow()
+        self.game_over = won or tied
+
+        self.red_turn = not self.red_turn  # Switch turns
+
+        if self.game_over:
+            if self.timeout_handle:
+                timing_wheel.cancel(self.timeout_handle)  # Nobody needs to move anymore
+        else:
             self.check_timeout("Red" if self.red_turn else "Yellow", discord.Color.red() if self.red_turn else discord.Color.yellow())
-        
+
+        if won:
+            await self.game_won(winner, loser, color)
+        elif tied:
+            await self.game_tied()
+        else:
+            await self.update_embed()
+
 async def setup(client):
     await client.add_cog(Game_Manager(client))
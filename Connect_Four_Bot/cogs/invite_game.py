@@ -1,7 +1,13 @@
 import discord
 from discord.ext import commands
-import asyncio
 import uuid
+from engine.mcts import AVAILABLE as mcts_available
+from engine.search import DIFFICULTIES
+from utils.message_registry import message_registry
+from utils.timing_wheel import timing_wheel
+from utils.metrics import handler_latency, invites_resolved, live_invites
+
+invite_time_limit = 60  # Seconds an invite stays open
 
 class Invite_Manager(commands.Cog):
     """
@@ -18,6 +24,7 @@ class Invite_Manager(commands.Cog):
         """
         self.client = client
         self.invites = {}
+        live_invites.set_function(lambda: len(self.invites))
     
     @commands.Cog.listener()
     async def on_ready(self):
@@ -31,36 +38,64 @@ class Invite_Manager(commands.Cog):
     @ commands.Cog.listener()
     async def on_invite_resolved(self, invite_id):
         """
-        Removes invites from the invites dictionary when no longer needed
+        Removes invites from the invites dictionary and the message registry when no longer needed
         Parameters: self, unique invite ID of type UUID
         Returns: None
         """
-        self.invites.pop(invite_id)
+        invite = self.invites.pop(invite_id, None)
+        if invite:
+            message_registry.remove(invite.message.id)
     
     @ commands.Cog.listener()
-    async def on_reaction_add(self, reaction, user):
+    @handler_latency.time("invite_reaction")
+    async def on_raw_reaction_add(self, payload):
         """
         Calls for an invite instance to assign the yellow player when the proper reaction is added
-        Parameters: self, reaction, user who reacted
+        Parameters: self, payload of type discord.RawReactionActionEvent
         Returns: None
         """
-        if reaction.emoji == "✅":
-            for invite_id, invite in self.invites.items():
-                if invite.message.id == reaction.message.id:
-                    await invite.assign_yellow_player(user)
+        invite = message_registry.get(payload.message_id)
+        if isinstance(invite, Invite) and str(payload.emoji) == "✅":  # Ignore reactions on messages that aren't invites
+            user = payload.member or await self.client.fetch_user(payload.user_id)  # Member is only sent for reactions in guilds
+            await invite.assign_yellow_player(user)
     
     @commands.command()
-    async def play(self, ctx):
+    @handler_latency.time("play")
+    async def play(self, ctx, opponent = None, difficulty = "medium"):
         """
-        Sends an invite to initiate the game
-        Parameters: self, ctx
+        Sends an invite to initiate the game, or starts a game against the computer with "=play ai [difficulty]"
+        Parameters: self, ctx, opponent of type str, difficulty of the computer player of type str
         Returns: None
         """
+        if opponent == "ai":
+            await self.play_ai(ctx, difficulty.lower())
+            return
         invite_id = uuid.uuid4()
         invite = Invite(self.client, invite_id, ctx)
         self.invites[invite_id] = invite
         await invite.setup_invite()  # Send invite message
 
+    async def play_ai(self, ctx, difficulty):
+        """
+        Starts a game with the computer seated as yellow, skipping the invite
+        Parameters: self, ctx, difficulty of the computer player of type str
+        Returns: None
+        """
+        if difficulty not in DIFFICULTIES:
+            embeded_msg = discord.Embed(title = "Unknown difficulty", description = f"Choose one of: {', '.join(DIFFICULTIES)}.", color = discord.Color.orange())
+            await ctx.channel.send(embed = embeded_msg)
+            return
+        if DIFFICULTIES[difficulty].get("engine") == "mcts" and not mcts_available:
+            embeded_msg = discord.Embed(title = "Difficulty unavailable", description = f"The {difficulty} computer player needs NumPy installed on the bot.", color = discord.Color.orange())
+            await ctx.channel.send(embed = embeded_msg)
+            return
+        players = {
+            "red": [ctx.author.display_name, ctx.author.id],
+            "yellow": [f"Computer ({difficulty})", self.client.user.id],
+        }
+        game_id = uuid.uuid4()  # Generate a unique game ID
+        self.client.dispatch("players_assigned", players, ctx.channel, game_id, difficulty)
+
 class Invite():
     """
     Class contains functions related to inviting players to play connect four
@@ -70,6 +105,7 @@ class Invite():
         channel: The channel where the invite was sent
         invite_id: Unique ID for the invite instance
         message: Display to be edited later
+        timeout_handle: Timer on the shared timing wheel that cancels the invite if nobody accepts
     """
     def __init__(self, client, invite_id, ctx):
         """
@@ -84,6 +120,7 @@ class Invite():
         self.players["red"] = [ctx.author.display_name, ctx.author.id]
         self.red_player_name = self.players["red"][0]
         self.message = None
+        self.timeout_handle = None
     
     async def setup_invite(self):
         """
@@ -93,8 +130,9 @@ class Invite():
         """
         embeded_msg = discord.Embed(title = f"{self.red_player_name} wants to play Connect Four!", description = "React using the green checkmark to play against them.", color = discord.Color.orange())
         self.message = await self.channel.send(embed = embeded_msg)
+        message_registry.add(self.message.id, self)  # Route reactions on this message to the invite
         await self.message.add_reaction("✅")
-        await self.check_timeout()
+        self.check_timeout()
     
     async def assign_yellow_player(self, user):
         """
@@ -103,21 +141,31 @@ class Invite():
         Returns: None
         """
         if not user.bot and self.players["red"][1] != user.id and "yellow" not in self.players:  # Ensure yellow player isn't a bot or the red player
+            timing_wheel.cancel(self.timeout_handle)  # The invite was accepted in time
+            invites_resolved.inc("accepted")
             await self.message.delete()
             self.players["yellow"] = [user.display_name, user.id]
             self.dispatch_invite_resolved()
             game_id = uuid.uuid4()  # Generate a unique game ID
             self.client.dispatch("players_assigned", self.players, self.channel, game_id)  # Custom dispatch event called when both players assigned
     
-    async def check_timeout(self):
+    def check_timeout(self):
+        """
+        Checks if the invite times out by scheduling a timer on the shared timing wheel
+        Parameters: self
+        Returns: None
+        """
+        self.timeout_handle = timing_wheel.schedule(invite_time_limit, self.invite_timed_out)  # Cancel the invite if nobody else reacts
+
+    async def invite_timed_out(self):
         """
-        Checks if the invite has timed out and dispatches an event if so
+        Cancels the invite and dispatches an event, called by the timing wheel once the invite timer expires
         Parameters: self
         Returns: None
         """
-        await asyncio.sleep(60)  # Delete invite message after 60 seconds if nobody else reacts
         embeded_msg = discord.Embed(title = "Connect Four Game Cancelled", description = "Nobody else reacted after 60 seconds.", color = discord.Color.orange())
         await self.message.edit(embed = embeded_msg)
+        invites_resolved.inc("expired")
         self.dispatch_invite_resolved()
     
     def dispatch_invite_resolved(self):
@@ -0,0 +1,64 @@
+import discord
+from discord.ext import commands
+from utils.loop_watchdog import loop_watchdog
+
+default_profile_time = 10  # Seconds profiled when =perf is used without a time
+max_profile_time = 120  # Longest profile allowed
+top_functions = 10  # Functions listed in each part of the profile results
+
+class Performance(commands.Cog):
+    """
+    Class contains owner-only commands for finding what slows down the bot
+    Attributes:
+        client: The bot client
+    """
+    def __init__(self, client):
+        """
+        Initializes the cog with bot client
+        Parameters: client of type commands.Bot
+        Returns: None
+        """
+        self.client = client
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """
+        Prints a message when the file is running properly
+        Parameters: self
+        Returns: None
+        """
+        print("Success! performance is active.")
+
+    @commands.command()
+    @commands.is_owner()
+    async def perf(self, ctx, seconds: float = default_profile_time):
+        """
+        Samples the event loop for a number of seconds and sends the hottest functions, using it again while a profile runs stops it early
+        Parameters: self, ctx, seconds to profile for of type float
+        Returns: None
+        """
+        if loop_watchdog.stop_profile():
+            return  # The running profile sends its results
+        seconds = min(max(seconds, 1), max_profile_time)
+        embeded_msg = discord.Embed(title = "Profiling", description = f"Sampling the event loop for {seconds:.0f} seconds. Use =perf again to stop early.", color = discord.Color.orange())
+        await ctx.channel.send(embed = embeded_msg)
+
+        samples, own, total, elapsed = await loop_watchdog.profile(seconds)
+        embeded_msg = discord.Embed(title = "Profile results", description = f"{samples} samples of the event loop thread over {elapsed:.1f} seconds.", color = discord.Color.orange())
+        embeded_msg.add_field(name = "Running", value = self.format_times(own, elapsed), inline = False)
+        embeded_msg.add_field(name = "On the stack", value = self.format_times(total, elapsed), inline = False)
+        await ctx.channel.send(embed = embeded_msg)
+
+    def format_times(self, times, elapsed):
+        """
+        Lists the functions the loop spent the most time in
+        Parameters: self, times of type Counter with seconds per function, elapsed seconds of type float
+        Returns: String with one function per line, cut to fit in an embed field
+        """
+        if not times:
+            return "No samples."
+        lines = [f"{seconds / elapsed:6.1%} {name}" for name, seconds in times.most_common(top_functions)]
+        return ("```\n" + "\n".join(lines))[:1020] + "\n```"
+
+async def setup(client):
+    await client.add_cog(Performance(client))
@@ -0,0 +1,4 @@
+"""
+Game engine used by the bot and the command line game
+Kept free of discord imports so it can run in worker processes and offline tools
+"""
@@ -0,0 +1,251 @@
+"""
+Vectorized simulator that plays many games in lockstep with NumPy
+
+Every game is one entry of the batch arrays and uses the same bitboard layout as Position.
+All games move on the same ply, so red moves on even plies for every game at once.
+Finished games stay in the arrays and are skipped by later moves.
+
+Requires NumPy, which the bot itself doesn't need. Run a simulation from the Connect_Four_Bot folder with:
+    python -m engine.batch --games 100000 --red heuristic --yellow random
+"""
+import argparse
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .bitboard import NUM_ROWS, NUM_COLS, NUM_CELLS, COL_HEIGHT
+from .search import Negamax_Engine, CENTER_ORDER
+
+ONGOING = 0
+RED_WIN = 1
+YELLOW_WIN = 2
+TIE = 3
+
+CENTER_WEIGHTS = [1, 2, 3, 4, 3, 2, 1]  # Preference for central columns used by the heuristic policy
+
+def is_win(bits):
+    """
+    Checks every game of a batch for four in a row using the same shift-and-mask tests as the bitboard engine
+    Parameters: bits of one player's pieces of type numpy array of uint64
+    Returns: numpy array of bool, True for each game where the pieces connect four
+    """
+    won = np.zeros(bits.shape, dtype = bool)
+    for shift in (1, COL_HEIGHT, COL_HEIGHT - 1, COL_HEIGHT + 1):
+        pairs = bits & (bits >> np.uint64(shift))
+        won |= (pairs & (pairs >> np.uint64(2 * shift))) != 0
+    return won
+
+class Batch_Simulator:
+    """
+    Class contains a batch of games stored as NumPy arrays
+    Attributes:
+        num_games: Number of games in the batch
+        red: Bits of the red pieces of each game
+        yellow: Bits of the yellow pieces of each game
+        heights: Number of pieces in each column of each game
+        winner: Result of each game, ONGOING until it ends
+        lengths: Number of moves each game lasted
+        ply: Number of moves played by games that haven't ended
+        rng: Random generator shared by the policies
+    """
+    def __init__(self, num_games, seed = None):
+        """
+        Initializes a batch of empty boards
+        Parameters: self, num_games of type int, seed of type int
+        Returns: None
+        """
+        if np is None:
+            raise ImportError("The batch simulator requires NumPy, install it with 'pip install numpy'")
+        self.num_games = num_games
+        self.red = np.zeros(num_games, dtype = np.uint64)
+        self.yellow = np.zeros(num_games, dtype = np.uint64)
+        self.heights = np.zeros((num_games, NUM_COLS), dtype = np.int64)
+        self.winner = np.zeros(num_games, dtype = np.int8)
+        self.lengths = np.zeros(num_games, dtype = np.int8)
+        self.ply = 0
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_positions(cls, positions, repeats = 1, seed = None):
+        """
+        Initializes a batch that continues from given positions, every position is played out repeats times
+        Parameters: cls, positions of type list of Position with the same number of moves, repeats of type int, seed of type int or numpy Generator
+        Returns: Batch_Simulator
+        """
+        ply = len(positions[0].moves)
+        if any(len(position.moves) != ply for position in positions):
+            raise ValueError("Every position of a batch must have the same number of moves")
+        simulator = cls(len(positions) * repeats, seed)
+        simulator.red[:] = np.repeat(np.array([position.red for position in positions], dtype = np.uint64), repeats)
+        simulator.yellow[:] = np.repeat(np.array([position.yellow for position in positions], dtype = np.uint64), repeats)
+        simulator.heights[:] = np.repeat(np.array([position.heights for position in positions], dtype = np.int64), repeats, axis = 0)
+        simulator.ply = ply
+        simulator.lengths[:] = ply
+        return simulator
+
+    @property
+    def red_turn(self):
+        """
+        Checks if red moves next in every unfinished game
+        Parameters: self
+        Returns: True or False based on the ply
+        """
+        return self.ply % 2 == 0
+
+    def current(self):
+        """
+        Gets the pieces of the player to move
+        Parameters: self
+        Returns: numpy array of uint64
+        """
+        return self.red if self.red_turn else self.yellow
+
+    def opponent(self):
+        """
+        Gets the pieces of the player who just moved
+        Parameters: self
+        Returns: numpy array of uint64
+        """
+        return self.yellow if self.red_turn else self.red
+
+    def active(self):
+        """
+        Finds the games that haven't ended
+        Parameters: self
+        Returns: numpy array of bool
+        """
+        return self.winner == ONGOING
+
+    def legal_moves(self):
+        """
+        Finds the columns that still have room in each game
+        Parameters: self
+        Returns: numpy array of bool with one row per game and one column per board column
+        """
+        return self.heights < NUM_ROWS
+
+    def move_bits(self, column):
+        """
+        Gets the cell a piece dropped in a column would land in for each game
+        Parameters: self, column index of type int
+        Returns: numpy array of uint64, 0 where the column is full
+        """
+        heights = self.heights[:, column]
+        bits = np.uint64(1) << (column * COL_HEIGHT + heights).astype(np.uint64)
+        return np.where(heights < NUM_ROWS, bits, np.uint64(0))
+
+    def step(self, columns):
+        """
+        Plays one move in every unfinished game
+        Parameters: self, columns of type numpy array of int with one entry per game
+        Returns: None
+        """
+        games = np.nonzero(self.active())[0]
+        chosen = columns[games]
+        heights = self.heights[games, chosen]
+        if np.any(heights >= NUM_ROWS):
+            raise ValueError("A policy chose a full column")
+        bits = np.uint64(1) << (chosen * COL_HEIGHT + heights).astype(np.uint64)
+        pieces = self.current()
+        pieces[games] |= bits
+        self.heights[games, chosen] += 1
+        self.ply += 1
+        self.lengths[games] = self.ply
+
+        won = is_win(pieces[games])
+        self.winner[games[won]] = RED_WIN if self.ply % 2 == 1 else YELLOW_WIN
+        if self.ply == NUM_CELLS:
+            self.winner[games[~won]] = TIE
+
+    def run(self, red_policy, yellow_policy = None):
+        """
+        Plays every game of the batch to the end
+        Parameters: self, policy for red, policy for yellow (red's policy if None)
+        Returns: Dict with the number of red wins, yellow wins and ties
+        """
+        yellow_policy = yellow_policy or red_policy
+        while self.ply < NUM_CELLS and self.active().any():
+            policy = red_policy if self.red_turn else yellow_policy
+            self.step(policy(self))
+        return self.results()
+
+    def results(self):
+        """
+        Counts the results of the batch
+        Parameters: self
+        Returns: Dict with the number of red wins, yellow wins and ties
+        """
+        counts = np.bincount(self.winner, minlength = 4)
+        return {"red": int(counts[RED_WIN]), "yellow": int(counts[YELLOW_WIN]), "tie": int(counts[TIE])}
+
+def random_policy(simulator):
+    """
+    Picks a random legal column in every game
+    Parameters: simulator of type Batch_Simulator
+    Returns: numpy array of columns
+    """
+    scores = simulator.rng.random((simulator.num_games, NUM_COLS))
+    scores[~simulator.legal_moves()] = -1
+    return scores.argmax(axis = 1)
+
+def heuristic_policy(simulator):
+    """
+    Wins when possible, otherwise blocks the opponent's winning cell, otherwise prefers central columns with some randomness
+    Parameters: simulator of type Batch_Simulator
+    Returns: numpy array of columns
+    """
+    current = simulator.current()
+    opponent = simulator.opponent()
+    scores = simulator.rng.random((simulator.num_games, NUM_COLS)) + np.array(CENTER_WEIGHTS)
+    for column in range(NUM_COLS):  # Loops over columns, every game is handled at once
+        bits = simulator.move_bits(column)
+        scores[:, column] += 1000 * is_win(current | bits) + 100 * is_win(opponent | bits)
+    scores[~simulator.legal_moves()] = -1
+    return scores.argmax(axis = 1)
+
+def make_engine_policy(depth, time_limit = None):
+    """
+    Creates a policy that asks the negamax engine for each game's move
+    The search itself can't be vectorized, so this policy loops over the unfinished games
+    Parameters: depth of type int, time limit per move in seconds of type float
+    Returns: policy function
+    """
+    engine = Negamax_Engine()
+
+    def engine_policy(simulator):
+        columns = np.full(simulator.num_games, CENTER_ORDER[0], dtype = np.int64)
+        mask = simulator.red | simulator.yellow
+        current = simulator.current()
+        for game in np.nonzero(simulator.active())[0]:
+            column, _, _ = engine.search(int(current[game]), int(mask[game]), simulator.ply, depth, time_limit)
+            columns[game] = column
+        return columns
+
+    return engine_policy
+
+POLICIES = {
+    "random": lambda: random_policy,
+    "heuristic": lambda: heuristic_policy,
+    "engine": lambda: make_engine_policy(4),
+}
+
+def main():
+    parser = argparse.ArgumentParser(description = "Simulate many games at once to compare move policies")
+    parser.add_argument("--games", type = int, default = 100000, help = "number of games to play")
+    parser.add_argument("--red", choices = POLICIES, default = "random", help = "policy playing red")
+    parser.add_argument("--yellow", choices = POLICIES, default = "random", help = "policy playing yellow")
+    parser.add_argument("--seed", type = int, default = None, help = "random seed")
+    args = parser.parse_args()
+
+    simulator = Batch_Simulator(args.games, args.seed)
+    start = time.perf_counter()
+    results = simulator.run(POLICIES[args.red](), POLICIES[args.yellow]())
+    elapsed = time.perf_counter() - start
+    print(f"{args.red} (red) vs {args.yellow} (yellow): {results}")
+    print(f"{args.games} games in {elapsed:.2f}s ({args.games / elapsed:.0f} games/s, average length {simulator.lengths.mean():.1f} moves)")
+
+if __name__ == "__main__":
+    main()
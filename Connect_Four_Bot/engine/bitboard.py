@@ -0,0 +1,263 @@
+"""
+Bitboard representation of a Connect Four position
+
+Each column uses 7 bits: 6 playable rows plus a sentinel bit on top so that shifting
+a line of pieces never wraps into the next column. Bit (column * 7 + height) is the cell
+in that column at that height, where height 0 is the bottom row.
+"""
+
+NUM_ROWS = 6
+NUM_COLS = 7
+COL_HEIGHT = NUM_ROWS + 1  # Playable rows plus the sentinel bit
+NUM_CELLS = NUM_ROWS * NUM_COLS
+
+BOTTOM_MASK = sum(1 << (col * COL_HEIGHT) for col in range(NUM_COLS))
+BOARD_MASK = BOTTOM_MASK * ((1 << NUM_ROWS) - 1)
+COLUMN_BITS = (1 << COL_HEIGHT) - 1
+
+def bottom_mask(column):
+    """
+    Gets the bit of the bottom cell of a column
+    Parameters: column index of type int
+    Returns: bitmask of type int
+    """
+    return 1 << (column * COL_HEIGHT)
+
+def top_mask(column):
+    """
+    Gets the bit of the top playable cell of a column
+    Parameters: column index of type int
+    Returns: bitmask of type int
+    """
+    return 1 << (NUM_ROWS - 1 + column * COL_HEIGHT)
+
+def column_mask(column):
+    """
+    Gets the bits of every playable cell in a column
+    Parameters: column index of type int
+    Returns: bitmask of type int
+    """
+    return ((1 << NUM_ROWS) - 1) << (column * COL_HEIGHT)
+
+def is_win(bits):
+    """
+    Checks if a set of pieces contains four in a row using shift-and-mask tests
+    Parameters: bits of one player's pieces of type int
+    Returns: True or False based on if there is a connected four
+    """
+    # Vertical
+    pairs = bits & (bits >> 1)
+    if pairs & (pairs >> 2):
+        return True
+    # Horizontal
+    pairs = bits & (bits >> COL_HEIGHT)
+    if pairs & (pairs >> (2 * COL_HEIGHT)):
+        return True
+    # Slash diagonal
+    pairs = bits & (bits >> (COL_HEIGHT - 1))
+    if pairs & (pairs >> (2 * (COL_HEIGHT - 1))):
+        return True
+    # Backslash diagonal
+    pairs = bits & (bits >> (COL_HEIGHT + 1))
+    if pairs & (pairs >> (2 * (COL_HEIGHT + 1))):
+        return True
+    return False
+
+def mirror(bits):
+    """
+    Flips a bitboard or position key left to right
+    Parameters: bits of type int
+    Returns: mirrored bits of type int
+    """
+    mirrored = 0
+    for column in range(NUM_COLS):
+        mirrored |= ((bits >> (column * COL_HEIGHT)) & COLUMN_BITS) << ((NUM_COLS - 1 - column) * COL_HEIGHT)
+    return mirrored
+
+class Position:
+    """
+    Class contains a Connect Four position stored as bitboards
+    Attributes:
+        red: Bits of the red pieces
+        yellow: Bits of the yellow pieces
+        heights: List with the number of pieces in each column
+        moves: List of columns played so far, red always moves first
+    """
+    __slots__ = ("red", "yellow", "heights", "moves")
+
+    def __init__(self):
+        """
+        Initializes an empty position
+        Parameters: self
+        Returns: None
+        """
+        self.red = 0
+        self.yellow = 0
+        self.heights = [0] * NUM_COLS
+        self.moves = []
+
+    @classmethod
+    def from_moves(cls, moves):
+        """
+        Builds a position by playing a sequence of columns from the empty board
+        Parameters: cls, moves of type iterable of int
+        Returns: Position
+        """
+        position = cls()
+        for column in moves:
+            position.play(column)
+        return position
+
+    def serialize(self):
+        """
+        Packs the position into one byte per move, small enough to send to worker processes
+        Parameters: self
+        Returns: bytes of the columns played, rebuilt with Position.from_moves
+        """
+        return bytes(self.moves)
+
+    def copy(self):
+        """
+        Creates an independent copy of the position
+        Parameters: self
+        Returns: Position
+        """
+        position = Position.__new__(Position)
+        position.red = self.red
+        position.yellow = self.yellow
+        position.heights = self.heights[:]
+        position.moves = self.moves[:]
+        return position
+
+    @property
+    def red_turn(self):
+        """
+        Checks if red is the player to move
+        Parameters: self
+        Returns: True or False based on the number of moves played
+        """
+        return len(self.moves) % 2 == 0
+
+    @property
+    def mask(self):
+        """
+        Gets the bits of every occupied cell
+        Parameters: self
+        Returns: bitmask of type int
+        """
+        return self.red | self.yellow
+
+    def can_play(self, column):
+        """
+        Checks if a column still has room for a piece
+        Parameters: self, column index of type int
+        Returns: True or False based on if the column is full
+        """
+        return self.heights[column] < NUM_ROWS
+
+    def next_row(self, column):
+        """
+        Gets the row a piece dropped in a column would land in, counting rows from the top like the list boards
+        Parameters: self, column index of type int
+        Returns: row index of type int, -1 if the column is full
+        """
+        return NUM_ROWS - 1 - self.heights[column]
+
+    def play(self, column):
+        """
+        Drops a piece for the player to move
+        Parameters: self, column index of type int
+        Returns: row index the piece landed in of type int
+        """
+        height = self.heights[column]
+        bit = 1 << (column * COL_HEIGHT + height)
+        if len(self.moves) % 2 == 0:
+            self.red |= bit
+        else:
+            self.yellow |= bit
+        self.heights[column] = height + 1
+        self.moves.append(column)
+        return NUM_ROWS - 1 - height
+
+    def undo(self):
+        """
+        Removes the most recently played piece
+        Parameters: self
+        Returns: column index of the removed piece of type int
+        """
+        column = self.moves.pop()
+        self.heights[column] -= 1
+        bit = 1 << (column * COL_HEIGHT + self.heights[column])
+        if len(self.moves) % 2 == 0:
+            self.red &= ~bit
+        else:
+            self.yellow &= ~bit
+        return column
+
+    def is_winning_move(self, column):
+        """
+        Checks if the player to move would connect four by playing a column
+        Parameters: self, column index of type int
+        Returns: True or False based on if the move wins
+        """
+        bit = 1 << (column * COL_HEIGHT + self.heights[column])
+        pieces = self.red if len(self.moves) % 2 == 0 else self.yellow
+        return is_win(pieces | bit)
+
+    def has_won(self, color):
+        """
+        Checks if a color has connected four
+        Parameters: self, color of type str
+        Returns: True or False based on if the color has won
+        """
+        return is_win(self.red if color.lower()[0] == "r" else self.yellow)
+
+    def is_full(self):
+        """
+        Checks if every cell is occupied
+        Parameters: self
+        Returns: True or False based on if the board is full
+        """
+        return len(self.moves) == NUM_CELLS
+
+    def key(self):
+        """
+        Gets an integer that uniquely identifies the position
+        Parameters: self
+        Returns: key of type int
+        """
+        # Per column, occupied bits plus red bits never carry past the sentinel and never collide
+        return (self.red | self.yellow) + self.red
+
+    def canonical_key(self):
+        """
+        Gets a key shared by the position and its mirror image, since both have the same mirrored best moves
+        Parameters: self
+        Returns: Tuple of (smaller of the key and mirrored key, True if the mirrored key was smaller)
+        """
+        key = self.key()
+        mirrored = mirror(key)
+        if mirrored < key:
+            return mirrored, True
+        return key, False
+
+    def cell(self, row, column):
+        """
+        Gets the character of a cell, using the same characters as the list boards
+        Parameters: self, row index counted from the top of type int, column index of type int
+        Returns: "r", "y" or "*" of type str
+        """
+        bit = 1 << (column * COL_HEIGHT + NUM_ROWS - 1 - row)
+        if self.red & bit:
+            return "r"
+        if self.yellow & bit:
+            return "y"
+        return "*"
+
+    def to_board(self):
+        """
+        Converts the position to the 6 x 7 list of strings used by the original board functions
+        Parameters: self
+        Returns: 2D list representing the board
+        """
+        return [[self.cell(row, column) for column in range(NUM_COLS)] for row in range(NUM_ROWS)]
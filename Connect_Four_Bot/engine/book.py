@@ -0,0 +1,178 @@
+"""
+Opening book of solved early positions, stored as a sorted binary file and read through mmap
+
+File layout: a header followed by fixed size records sorted by canonical position key.
+Mirrored positions share one record, stored in the orientation of the smaller key.
+Each position is searched to the end of the game unless the time limit runs out first. Records keep the
+depth their search reached, and a lookup only returns records searched as deep as the caller would search.
+
+Generate a book from the Connect_Four_Bot folder with:
+    python -m engine.book --ply 8 --time-limit 10
+"""
+import argparse
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .bitboard import Position, NUM_COLS, NUM_CELLS
+from .search import get_worker_engine, MIN_WIN_SCORE
+
+MAGIC = b"C4BK"
+HEADER = struct.Struct("<4sBBxxI")  # Magic, version, max ply, padding, number of records
+RECORD = struct.Struct("<QBhB")  # Canonical key, best column, score, depth searched
+KEY = struct.Struct("<Q")
+VERSION = 2
+DEFAULT_PATH = "opening_book.bin"
+
+class Opening_Book:
+    """
+    Class contains a read-only opening book mapped into memory, lookups binary search the file without loading it
+    Attributes:
+        file: Open book file
+        data: Memory map of the file
+        max_ply: Deepest number of moves stored in the book
+        count: Number of records
+    """
+    def __init__(self, path):
+        """
+        Opens and maps a book file
+        Parameters: self, path of type str
+        Returns: None
+        """
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, version, self.max_ply, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+
+    @classmethod
+    def open_if_exists(cls, path = DEFAULT_PATH):
+        """
+        Opens a book file if it has been generated
+        Parameters: cls, path of type str
+        Returns: Opening_Book, None if the file doesn't exist or was written in another version
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except ValueError as error:
+            print(f"Not using the opening book: {error}")
+            return None
+
+    def lookup(self, position, depth = NUM_CELLS):
+        """
+        Finds the stored move for a position if it was searched at least as deep as asked
+        Parameters: self, position of type Position, depth the caller would search to of type int
+        Returns: Tuple of (best column, score), None if the position isn't in the book or its record is too shallow
+        """
+        if len(position.moves) > self.max_ply:
+            return None
+        key, mirrored = position.canonical_key()
+        low = 0
+        high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            offset = HEADER.size + middle * RECORD.size
+            middle_key = KEY.unpack_from(self.data, offset)[0]
+            if middle_key < key:
+                low = middle + 1
+            elif middle_key > key:
+                high = middle
+            else:
+                _, column, score, searched = RECORD.unpack_from(self.data, offset)
+                if searched < min(depth, NUM_CELLS - len(position.moves)):
+                    return None
+                return (NUM_COLS - 1 - column if mirrored else column), score
+        return None
+
+    def close(self):
+        """
+        Unmaps and closes the book file
+        Parameters: self
+        Returns: None
+        """
+        self.data.close()
+        self.file.close()
+
+def enumerate_positions(max_ply):
+    """
+    Finds every distinct position up to a number of moves that can still be played on, folding mirror images together
+    Parameters: max_ply of type int
+    Returns: List of move sequences of type bytes
+    """
+    found = []
+    seen = {Position().canonical_key()[0]}
+    frontier = [Position()]
+    for ply in range(max_ply + 1):
+        next_frontier = []
+        for position in frontier:
+            found.append(position.serialize())
+            if ply == max_ply:
+                continue
+            for column in range(NUM_COLS):
+                # Positions after a winning move are over, so no book move is needed
+                if not position.can_play(column) or position.is_winning_move(column):
+                    continue
+                child = position.copy()
+                child.play(column)
+                key = child.canonical_key()[0]
+                if key not in seen:
+                    seen.add(key)
+                    next_frontier.append(child)
+        frontier = next_frontier
+    return found
+
+def solve_position(moves, depth, time_limit):
+    """
+    Searches one book position inside a worker process, the worker's transposition table carries over between positions
+    Parameters: moves of type bytes, maximum depth of type int, time limit in seconds of type float
+    Returns: Tuple of (packed record of type bytes, True or False based on if the score is exact)
+    """
+    position = Position.from_moves(moves)
+    column, score, reached = get_worker_engine().best_move(position, depth, time_limit)
+    remaining = NUM_CELLS - len(position.moves)
+    solved = reached >= remaining or abs(score) >= MIN_WIN_SCORE  # A forced win or loss is exact at any depth
+    key, mirrored = position.canonical_key()
+    if mirrored:
+        column = NUM_COLS - 1 - column  # Store the move as it's played in the canonical orientation
+    return RECORD.pack(key, column, score, remaining if solved else reached), solved
+
+def generate_book(path, max_ply, depth, time_limit = None, workers = None):
+    """
+    Searches every position up to max_ply and writes the results as a sorted book file
+    Parameters: path of type str, max_ply of type int, search depth of type int, time limit per position of type float, number of worker processes of type int
+    Returns: Number of records written of type int
+    """
+    positions = enumerate_positions(max_ply)
+    print(f"Searching {len(positions)} positions up to ply {max_ply} at depth {depth}")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        results = list(executor.map(solve_position, positions, [depth] * len(positions), [time_limit] * len(positions), chunksize = 64))
+    records = [record for record, _ in results]
+    print(f"Solved {sum(solved for _, solved in results)} of {len(results)} positions to the end, the rest keep the depth they reached")
+    records.sort(key = lambda record: KEY.unpack_from(record)[0])  # Keys are little endian, so sort by value rather than by raw bytes
+
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, max_ply, len(records)))
+        file.writelines(records)
+    os.replace(temporary_path, path)  # Never leave a half written book where the bot loads it
+    print(f"Wrote {len(records)} records to {path} in {time.perf_counter() - start:.1f}s")
+    return len(records)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Generate the opening book used by the computer player")
+    parser.add_argument("--output", default = DEFAULT_PATH, help = "book file to write")
+    parser.add_argument("--ply", type = int, default = 8, help = "store every position with up to this many moves")
+    parser.add_argument("--depth", type = int, default = NUM_CELLS, help = "search depth for each position, defaults to solving it")
+    parser.add_argument("--time-limit", type = float, default = 10.0, help = "seconds to search each position, positions not solved in time keep the depth they reached")
+    parser.add_argument("--workers", type = int, default = None, help = "worker processes, defaults to the CPU count")
+    args = parser.parse_args()
+    generate_book(args.output, args.ply, args.depth, args.time_limit, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Least recently used cache of search results shared by every game in a process
+
+Players in different games keep reaching the same positions, and a position and its mirror image
+have the same best move mirrored, so results are stored under the position's canonical key.
+"""
+from collections import OrderedDict
+
+from .bitboard import NUM_COLS, NUM_CELLS
+from .search import MIN_WIN_SCORE
+
+class Evaluation_Cache:
+    """
+    Class contains search results keyed by canonical position key, oldest used first
+    A result is only reused for the depth it was searched to, so a difficulty level never plays another level's moves.
+    Forced results and results searched to the end of the game are the same at every depth and are reused for any depth
+    Attributes:
+        entries: Ordered dict with canonical keys as keys, values contain a dict with the depths asked for as keys and (best column of the canonical position, score, depth reached) as values
+        max_entries: Most positions kept before the least recently used is evicted
+        hits: Number of lookups answered from the cache
+        misses: Number of lookups that needed a search
+    """
+    def __init__(self, max_entries = 1 << 16):
+        """
+        Initializes an empty cache
+        Parameters: self, max_entries of type int
+        Returns: None
+        """
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, position, depth):
+        """
+        Finds a result of a search to the given depth, or a result that holds for any depth
+        Parameters: self, position of type Position, depth the caller would search to of type int
+        Returns: Tuple of (best column, score, depth reached), None if no result can be reused
+        """
+        key, mirrored = position.canonical_key()
+        results = self.entries.get(key)
+        result = None
+        if results is not None:
+            result = results.get(depth)
+            if result is None:
+                remaining = NUM_CELLS - len(position.moves)
+                result = next((result for result in results.values() if abs(result[1]) >= MIN_WIN_SCORE or result[2] >= remaining), None)
+        if result is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        column, score, reached = result
+        return (NUM_COLS - 1 - column if mirrored else column), score, reached
+
+    def put(self, position, depth, result):
+        """
+        Stores the result of a search to the given depth
+        Parameters: self, position of type Position, depth the search was asked for of type int, result tuple of (best column, score, depth reached)
+        Returns: None
+        """
+        key, mirrored = position.canonical_key()
+        column, score, reached = result
+        self.entries.setdefault(key, {})[depth] = (NUM_COLS - 1 - column if mirrored else column), score, reached
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last = False)
+
+evaluation_cache = Evaluation_Cache()  # Shared by every game in the bot process
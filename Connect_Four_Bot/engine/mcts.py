@@ -0,0 +1,232 @@
+"""
+Monte Carlo tree search player
+
+Every round walks the tree with UCT to several new positions and scores all of them with playouts run
+at once by the NumPy batch simulator instead of one Python playout at a time. The search runs for
+as long as its time budget allows, so its strength scales smoothly with time. Trees are kept between
+moves and picked up again when the same game comes back after the opponent's reply.
+
+Requires NumPy through the batch simulator.
+"""
+import math
+import time
+from collections import OrderedDict
+
+from .batch import Batch_Simulator, heuristic_policy, np, RED_WIN, YELLOW_WIN, TIE
+from .bitboard import Position, NUM_COLS, NUM_CELLS
+
+AVAILABLE = np is not None  # False when NumPy isn't installed
+
+WORKER_MAX_TREES = 32  # Trees kept by each worker process, shared by every game pinned to the worker
+worker_engine = None  # Engine of the current worker process, created by the first job it runs
+
+class Node:
+    """
+    Class contains one position of the search tree
+    Attributes:
+        column: Column played to reach the position, None for the root
+        parent: Node before the move, None for the root
+        children: List of expanded child nodes
+        untried: List of playable columns that don't have a child yet
+        visits: Number of playouts through the node
+        value: Playouts won by the player who moved into the node, ties count half
+        result: Value of one playout if the game is over in this position, None otherwise
+    """
+    __slots__ = ("column", "parent", "children", "untried", "visits", "value", "result")
+
+    def __init__(self, column, parent, position, won = False):
+        """
+        Initializes an unvisited node
+        Parameters: self, column of type int or None, parent of type Node or None, position reached of type Position, won of type bool if the move connected four
+        Returns: None
+        """
+        self.column = column
+        self.parent = parent
+        self.children = []
+        self.visits = 0
+        self.value = 0.0
+        if won:
+            self.result = 1.0
+        elif len(position.moves) == NUM_CELLS:
+            self.result = 0.5
+        else:
+            self.result = None
+        self.untried = [] if self.result is not None else [column for column in range(NUM_COLS) if position.can_play(column)]
+
+    def select(self, exploration):
+        """
+        Picks the child with the highest upper confidence bound
+        Parameters: self, exploration constant of type float
+        Returns: Node
+        """
+        log_visits = math.log(self.visits)
+        return max(self.children, key = lambda child: child.value / child.visits + exploration * math.sqrt(log_visits / child.visits))
+
+class Mcts_Engine:
+    """
+    Class contains a UCT search with batched playouts
+    Each round selects several new positions before playing any of them out. Positions waiting for their
+    playouts already count as lost for the player who moved into them, so the round spreads over the tree
+    Attributes:
+        exploration: UCT exploration constant
+        leaves_per_round: New positions selected before their playouts are run together
+        playouts_per_leaf: Playouts run for each new position
+        policy: Batch simulator policy used for the playouts
+        max_trees: Most trees kept for reuse, one per game the engine has recently played
+        trees: Ordered dict with the moves of a searched position as keys, values contain its root node
+        rng: NumPy random generator shared by the playouts
+        playouts: Number of playouts run by the last search
+    """
+    def __init__(self, exploration = 1.4, leaves_per_round = 16, playouts_per_leaf = 16, policy = heuristic_policy, max_trees = 16, seed = None):
+        """
+        Initializes the engine without any trees
+        Parameters: self, exploration of type float, leaves_per_round of type int, playouts_per_leaf of type int, policy function, max_trees of type int, seed of type int
+        Returns: None
+        """
+        if np is None:
+            raise ImportError("The MCTS engine requires NumPy, install it with 'pip install numpy'")
+        self.exploration = exploration
+        self.leaves_per_round = leaves_per_round
+        self.playouts_per_leaf = playouts_per_leaf
+        self.policy = policy
+        self.max_trees = max_trees
+        self.trees = OrderedDict()
+        self.rng = np.random.default_rng(seed)
+        self.playouts = 0
+
+    def find_tree(self, position):
+        """
+        Finds a kept tree for the position, the engine's last search of the same game is up to two moves back
+        Parameters: self, position of type Position
+        Returns: Root node for the position, None if no tree reaches it
+        """
+        moves = position.moves
+        for back in range(min(2, len(moves)) + 1):
+            node = self.trees.pop(bytes(moves[:len(moves) - back]), None)
+            if node is None:
+                continue
+            for column in moves[len(moves) - back:]:
+                node = next((child for child in node.children if child.column == column), None)
+                if node is None:
+                    return None
+            node.parent = None  # Let the rest of the old tree be freed
+            return node
+        return None
+
+    def best_move(self, position, time_limit, max_rounds = None):
+        """
+        Searches until the time limit or round count is reached and picks the most visited move
+        Parameters: self, position of type Position, time limit in seconds of type float, max_rounds of type int or None
+        Returns: Tuple of (best column, share of playouts the move won, playouts run)
+        """
+        self.playouts = 0
+        playable = [column for column in range(NUM_COLS) if position.can_play(column)]
+        for column in playable:
+            if position.is_winning_move(column):
+                return column, 1.0, 0
+        if len(playable) == 1:
+            return playable[0], 0.5, 0
+
+        root = self.find_tree(position) or Node(None, None, position)
+        deadline = time.perf_counter() + time_limit
+        rounds = 0
+        while time.perf_counter() < deadline and (max_rounds is None or rounds < max_rounds):
+            self.search_round(root, position)
+            rounds += 1
+
+        self.trees[bytes(position.moves)] = root
+        if len(self.trees) > self.max_trees:
+            self.trees.popitem(last = False)
+        if not root.children:
+            return playable[0], 0.5, self.playouts
+        best = max(root.children, key = lambda child: child.visits)
+        return best.column, best.value / best.visits, self.playouts
+
+    def select_leaf(self, root, position):
+        """
+        Walks down the tree with UCT and adds one untried move below the node it stops at
+        Parameters: self, root of type Node, position of the root of type Position
+        Returns: Tuple of (new or finished node, its position)
+        """
+        node = root
+        position = position.copy()
+        while not node.untried and node.children:
+            node = node.select(self.exploration)
+            position.play(node.column)
+        if node.untried:
+            column = node.untried.pop(int(self.rng.integers(len(node.untried))))
+            won = position.is_winning_move(column)
+            position.play(column)
+            child = Node(column, node, position, won)
+            node.children.append(child)
+            node = child
+        return node, position
+
+    def search_round(self, root, position):
+        """
+        Selects new positions, plays all of them out in one batch per number of moves and backpropagates the results
+        Parameters: self, root of type Node, position of the root of type Position
+        Returns: None
+        """
+        count = self.playouts_per_leaf
+        waiting = {}  # Number of moves played as keys, values contain lists of (node, position)
+        for _ in range(self.leaves_per_round):
+            node, leaf = self.select_leaf(root, position)
+            add_visits(node, count)
+            if node.result is not None:
+                add_value(node, node.result * count, count)  # The game is over, every playout ends the same way
+            else:
+                waiting.setdefault(len(leaf.moves), []).append((node, leaf))
+        self.playouts += count * self.leaves_per_round
+
+        # The batch simulator moves every game on the same ply, so leaves are grouped by their number of moves
+        for leaves in waiting.values():
+            simulator = Batch_Simulator.from_positions([leaf for _, leaf in leaves], count, self.rng)
+            simulator.run(self.policy)
+            winners = simulator.winner.reshape(len(leaves), count)
+            for (node, leaf), results in zip(leaves, winners):
+                won = np.count_nonzero(results == (YELLOW_WIN if leaf.red_turn else RED_WIN))  # Whoever moved into the node
+                add_value(node, won + 0.5 * np.count_nonzero(results == TIE), count)
+
+def add_visits(node, count):
+    """
+    Counts playouts through a node and every node above it before their results are known
+    Parameters: node of type Node, count of type int
+    Returns: None
+    """
+    while node is not None:
+        node.visits += count
+        node = node.parent
+
+def add_value(node, value, count):
+    """
+    Adds the result of playouts through a node to it and every node above it, alternating between the players
+    Parameters: node of type Node, value won by the player who moved into the node of type float, count of playouts of type int
+    Returns: None
+    """
+    while node is not None:
+        node.value += value
+        value = count - value  # The parent's mover is the other player
+        node = node.parent
+
+def get_worker_engine():
+    """
+    Gets the MCTS engine of the current worker process so its trees are reused between jobs
+    Trees are only found again when a game's jobs keep running in the same worker, see Engine_Pool.submit's pinned
+    Parameters: None
+    Returns: Mcts_Engine
+    """
+    global worker_engine
+    if worker_engine is None:
+        worker_engine = Mcts_Engine(max_trees = WORKER_MAX_TREES)
+    return worker_engine
+
+def mcts_job(moves, deadline):
+    """
+    Runs an MCTS search inside a worker process
+    Parameters: moves of type bytes from Position.serialize, deadline of type float from time.time()
+    Returns: Tuple of (best column, share of playouts the move won, playouts run)
+    """
+    # The job may have waited in the queue, only search for the time that is left
+    time_limit = max(deadline - time.time(), 0.01)
+    return get_worker_engine().best_move(Position.from_moves(moves), time_limit)
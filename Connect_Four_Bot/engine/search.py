@@ -0,0 +1,355 @@
+"""
+Negamax alpha-beta search for computer players
+
+The search works on raw bitboards: current holds the pieces of the player to move and
+mask holds every occupied cell. Scores are from the point of view of the player to move,
+wins are worth WIN_SCORE minus the number of moves it takes to reach them.
+"""
+import time
+
+from .bitboard import Position, NUM_CELLS, COL_HEIGHT, BOTTOM_MASK, BOARD_MASK, bottom_mask, column_mask, top_mask, is_win
+from .tablebase import Endgame_Table
+
+WIN_SCORE = 1000
+MIN_WIN_SCORE = WIN_SCORE - NUM_CELLS  # Any score at least this large is a forced result
+CENTER_ORDER = [3, 2, 4, 1, 5, 0, 6]  # Central columns take part in the most lines, so search them first
+CENTER_COLUMN_MASK = column_mask(3)
+
+# Difficulty levels exposed to players, every limit stays far below the 60 second turn timer
+# Levels with "book" play early moves from the opening book instead of searching, if the book searched them at least as deep
+# Levels with "engine" set to "mcts" use Monte Carlo tree search for their whole time limit instead of negamax
+DIFFICULTIES = {
+    "easy": {"depth": 2, "time_limit": 0.5, "book": False},
+    "medium": {"depth": 6, "time_limit": 2.0, "book": False},
+    "hard": {"depth": 12, "time_limit": 5.0, "book": True},
+    "expert": {"depth": NUM_CELLS, "time_limit": 15.0, "book": True},
+    "mcts": {"time_limit": 3.0, "book": False, "engine": "mcts"},
+}
+
+WORKER_TABLE_SIZE = 1 << 18
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+worker_engine = None  # Engine of the current worker process, created by the first job it runs
+
+class Search_Timeout(Exception):
+    """
+    Raised inside the search when the time budget for a move runs out
+    """
+
+def popcount(bits):
+    """
+    Counts the set bits of a bitboard
+    Parameters: bits of type int
+    Returns: number of set bits of type int
+    """
+    return bin(bits).count("1")
+
+def winning_cells(current, mask):
+    """
+    Finds every empty cell that would complete four in a row for a set of pieces
+    Parameters: current of type int, mask of type int
+    Returns: bitmask of winning cells of type int
+    """
+    # Vertical
+    cells = (current << 1) & (current << 2) & (current << 3)
+    for shift in (COL_HEIGHT, COL_HEIGHT - 1, COL_HEIGHT + 1):
+        # Empty cell to the right of (or above) three pieces, or inside a broken line
+        pair = (current << shift) & (current << (2 * shift))
+        cells |= pair & (current << (3 * shift))
+        cells |= pair & (current >> shift)
+        # Empty cell to the left of (or below) three pieces, or inside a broken line
+        pair = (current >> shift) & (current >> (2 * shift))
+        cells |= pair & (current << shift)
+        cells |= pair & (current >> (3 * shift))
+    return cells & (BOARD_MASK ^ mask)
+
+def table_score(result, num_moves):
+    """
+    Converts a result from the endgame table to a search score
+    Parameters: result of type int, number of moves played of type int
+    Returns: score for the player to move of type int
+    """
+    if result == 0:
+        return 0
+    score = WIN_SCORE - num_moves - abs(result)
+    return score if result > 0 else -score
+
+def evaluate(current, mask):
+    """
+    Scores a position that the search does not look past
+    Parameters: current of type int, mask of type int
+    Returns: score for the player to move of type int
+    """
+    opponent = current ^ mask
+    threats = popcount(winning_cells(current, mask)) - popcount(winning_cells(opponent, mask))
+    center = popcount(current & CENTER_COLUMN_MASK) - popcount(opponent & CENTER_COLUMN_MASK)
+    return 4 * threats + center
+
+class Transposition_Table:
+    """
+    Class contains a fixed size hash table of search results
+    New entries replace the slot they hash to unless it holds a deeper result from the current search,
+    so results from earlier moves are evicted first
+    Attributes:
+        size: Number of slots
+        keys: Position key stored in each slot
+        values: Tuple of (depth, flag, score, column, generation) stored in each slot
+        generation: Counter increased for every new search
+    """
+    def __init__(self, size = 1 << 16):
+        """
+        Initializes an empty table
+        Parameters: self, number of slots of type int
+        Returns: None
+        """
+        self.size = size
+        self.keys = [0] * size
+        self.values = [None] * size
+        self.generation = 0
+
+    def new_search(self):
+        """
+        Marks every stored entry as belonging to an older search
+        Parameters: self
+        Returns: None
+        """
+        self.generation += 1
+
+    def get(self, key):
+        """
+        Looks up a stored result
+        Parameters: self, position key of type int
+        Returns: Tuple of (depth, flag, score, column, generation), None if missing
+        """
+        index = key % self.size
+        if self.keys[index] == key:
+            return self.values[index]
+        return None
+
+    def put(self, key, depth, flag, score, column):
+        """
+        Stores a result, evicting an old or shallower entry in the same slot
+        Parameters: self, position key of type int, depth of type int, flag of type int, score of type int, best column of type int
+        Returns: None
+        """
+        index = key % self.size
+        stored = self.values[index]
+        if stored is not None and stored[4] == self.generation and stored[0] > depth and self.keys[index] != key:
+            return  # Keep the deeper result from this search
+        self.keys[index] = key
+        self.values[index] = (depth, flag, score, column, self.generation)
+
+class Negamax_Engine:
+    """
+    Class contains an iterative deepening negamax search with alpha-beta pruning
+    Attributes:
+        table: Transposition table reused between moves
+        nodes: Number of positions visited by the last search
+        deadline: perf_counter time the current search must stop at
+        tablebase: Endgame_Table probed before searching late positions, None to always search
+    """
+    def __init__(self, table_size = 1 << 16, tablebase = None):
+        """
+        Initializes the engine with an empty transposition table
+        Parameters: self, number of table slots of type int, tablebase of type Endgame_Table or None
+        Returns: None
+        """
+        self.table = Transposition_Table(table_size)
+        self.tablebase = tablebase
+        self.nodes = 0
+        self.deadline = None
+
+    def best_move(self, position, depth = NUM_CELLS, time_limit = None):
+        """
+        Searches deeper and deeper until the depth or time limit is reached
+        Parameters: self, position of type Position, maximum depth of type int, time limit in seconds of type float
+        Returns: Tuple of (best column, score, depth reached)
+        """
+        red_turn = position.red_turn
+        current = position.red if red_turn else position.yellow
+        return self.search(current, position.mask, len(position.moves), depth, time_limit)
+
+    def search(self, current, mask, num_moves, depth = NUM_CELLS, time_limit = None):
+        """
+        Runs the iterative deepening loop on raw bitboards
+        Parameters: self, current of type int, mask of type int, number of moves played of type int, maximum depth of type int, time limit in seconds of type float
+        Returns: Tuple of (best column, score, depth reached)
+        """
+        self.nodes = 0
+        self.deadline = time.perf_counter() + time_limit if time_limit else None
+        self.table.new_search()
+
+        playable = [column for column in CENTER_ORDER if not mask & top_mask(column)]
+        # Take an immediate win without searching
+        for column in playable:
+            if is_win(current | ((mask + bottom_mask(column)) & column_mask(column))):
+                return column, WIN_SCORE - num_moves - 1, 1
+        if len(playable) == 1:
+            return playable[0], 0, 0
+        # Solved endgames need no search
+        entry = self.tablebase.probe(current, mask, num_moves) if self.tablebase else None
+        if entry is not None:
+            return entry[0], table_score(entry[1], num_moves), NUM_CELLS - num_moves
+
+        best_column = playable[0]
+        best_score = 0
+        reached = 0
+        max_depth = min(depth, NUM_CELLS - num_moves)
+        for current_depth in range(1, max_depth + 1):
+            try:
+                column, score = self.search_root(current, mask, num_moves, current_depth, playable)
+            except Search_Timeout:
+                break  # Keep the result of the last finished depth
+            best_column = column
+            best_score = score
+            reached = current_depth
+            # The result is forced, deeper searches won't change it unless it came from the endgame table
+            # through a longer line than a deeper search could find, the leaves see up to two moves past the depth
+            if abs(score) >= MIN_WIN_SCORE and WIN_SCORE - abs(score) - num_moves <= current_depth + 2:
+                break
+        return best_column, best_score, reached
+
+    def search_root(self, current, mask, num_moves, depth, playable):
+        """
+        Searches every move from the root and picks the best one
+        Parameters: self, current of type int, mask of type int, number of moves played of type int, depth of type int, list of playable columns
+        Returns: Tuple of (best column, score)
+        """
+        alpha = -WIN_SCORE
+        beta = WIN_SCORE
+        entry = self.table.get(current + mask)
+        ordered = playable
+        if entry is not None and entry[3] in playable:
+            ordered = [entry[3]] + [column for column in playable if column != entry[3]]
+
+        best_column = ordered[0]
+        for column in ordered:
+            new_mask = mask | (mask + bottom_mask(column))
+            score = -self.negamax(current ^ mask, new_mask, num_moves + 1, depth - 1, -beta, -alpha)
+            if score > alpha:
+                alpha = score
+                best_column = column
+        self.table.put(current + mask, depth, EXACT, alpha, best_column)
+        return best_column, alpha
+
+    def negamax(self, current, mask, num_moves, depth, alpha, beta):
+        """
+        Scores a position with alpha-beta pruning
+        Parameters: self, current of type int, mask of type int, number of moves played of type int, remaining depth of type int, alpha of type int, beta of type int
+        Returns: score for the player to move of type int
+        """
+        self.nodes += 1
+        if self.deadline is not None and self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+            raise Search_Timeout()
+        if num_moves == NUM_CELLS:
+            return 0  # Tie
+
+        possible = (mask + BOTTOM_MASK) & BOARD_MASK
+        own_wins = winning_cells(current, mask)
+        if possible & own_wins:
+            return WIN_SCORE - num_moves - 1
+
+        opponent_wins = winning_cells(current ^ mask, mask)
+        forced = possible & opponent_wins
+        if forced:
+            if forced & (forced - 1):
+                return -(WIN_SCORE - num_moves - 2)  # Two threats at once can't both be blocked
+            possible = forced
+        possible &= ~(opponent_wins >> 1)  # Don't play directly below an opponent threat
+        if not possible:
+            return -(WIN_SCORE - num_moves - 2)
+        if self.tablebase and NUM_CELLS - num_moves == self.tablebase.max_empty:
+            entry = self.tablebase.probe(current, mask, num_moves)
+            if entry is not None:
+                return table_score(entry[1], num_moves)
+        if depth <= 0:
+            return evaluate(current, mask)
+
+        original_alpha = alpha
+        key = current + mask
+        entry = self.table.get(key)
+        hash_column = None
+        if entry is not None:
+            hash_column = entry[3]
+            if entry[0] >= depth:
+                if entry[1] == EXACT:
+                    return entry[2]
+                if entry[1] == LOWER:
+                    alpha = max(alpha, entry[2])
+                else:
+                    beta = min(beta, entry[2])
+                if alpha >= beta:
+                    return entry[2]
+
+        ordered = CENTER_ORDER
+        if hash_column is not None:
+            ordered = [hash_column] + [column for column in CENTER_ORDER if column != hash_column]
+
+        best_score = -WIN_SCORE
+        best_column = None
+        opponent = current ^ mask
+        for column in ordered:
+            move = possible & column_mask(column)
+            if not move:
+                continue
+            score = -self.negamax(opponent, mask | move, num_moves + 1, depth - 1, -beta, -alpha)
+            if score > best_score:
+                best_score = score
+                best_column = column
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.put(key, depth, flag, best_score, best_column)
+        return best_score
+
+def get_worker_engine():
+    """
+    Gets the engine of the current worker process so its transposition table is reused between jobs
+    Parameters: None
+    Returns: Negamax_Engine
+    """
+    global worker_engine
+    if worker_engine is None:
+        worker_engine = Negamax_Engine(WORKER_TABLE_SIZE, Endgame_Table.open_if_exists())
+    return worker_engine
+
+def search_job(moves, depth, deadline):
+    """
+    Runs a search inside a worker process
+    Parameters: moves of type bytes from Position.serialize, maximum depth of type int, deadline of type float from time.time()
+    Returns: Tuple of (best column, score, depth reached)
+    """
+    # The job may have waited in the queue, only search for the time that is left
+    time_limit = max(deadline - time.time(), 0.01)
+    return get_worker_engine().best_move(Position.from_moves(moves), depth, time_limit)
+
+def rank_moves_job(moves, depth):
+    """
+    Orders the moves of a position from best to worst for the player to move with a shallow search inside a worker process
+    Parameters: moves of type bytes from Position.serialize, depth of type int
+    Returns: List of playable columns, central columns first among equal scores
+    """
+    position = Position.from_moves(moves)
+    engine = get_worker_engine()
+    scores = {}
+    for column in CENTER_ORDER:
+        if not position.can_play(column):
+            continue
+        if position.is_winning_move(column):
+            scores[column] = WIN_SCORE
+            continue
+        position.play(column)
+        scores[column] = -engine.best_move(position, depth)[1]
+        position.undo()
+    return sorted(scores, key = lambda column: -scores[column])  # Sorting is stable, so ties keep the center order
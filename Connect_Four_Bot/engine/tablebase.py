@@ -0,0 +1,246 @@
+"""
+Endgame table of exactly solved positions with few empty cells, stored as an open addressing hash table
+in a binary file and read through mmap
+
+File layout: a header followed by a power of two number of fixed size slots. A record lives in the slot its
+canonical position key hashes to, or the next free slot after it. Empty slots have key 0, the key of the
+empty board, which never has few enough empty cells to be stored. Each record holds the best column in the
+canonical orientation and the result for the player to move: 0 for a tie, otherwise the number of moves until
+the game ends, positive for a win and negative for a loss.
+
+Every position with up to K empty cells is far too many to store, so the generator plays random games that
+avoid immediate blunders down to K empty cells and solves every position reachable from there. Positions
+whose best move wins immediately aren't stored since the search finds those without a probe.
+
+Generate a table from the Connect_Four_Bot folder with:
+    python -m engine.tablebase --empty 12 --samples 1000
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .bitboard import Position, NUM_COLS, NUM_CELLS, BOTTOM_MASK, BOARD_MASK, column_mask, is_win, mirror
+
+MAGIC = b"C4EG"
+HEADER = struct.Struct("<4sBBxxII")  # Magic, version, most empty cells, padding, number of slots, number of records
+RECORD = struct.Struct("<QBb")  # Canonical key, best column, result
+KEY = struct.Struct("<Q")
+VERSION = 1
+DEFAULT_PATH = "endgame_table.bin"
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15  # Spreads nearby keys over the whole table
+
+def slot_index(key, bits):
+    """
+    Finds the slot a key is stored in or probed from first
+    Parameters: key of type int, bits of the slot count of type int
+    Returns: slot index of type int
+    """
+    return ((key * HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> (64 - bits)
+
+def canonical(current, mask, num_moves):
+    """
+    Gets the canonical key of raw bitboards, like Position.canonical_key
+    Parameters: current of type int, mask of type int, number of moves played of type int
+    Returns: Tuple of (canonical key, True if the mirrored key was smaller)
+    """
+    red = current if num_moves % 2 == 0 else current ^ mask
+    key = mask + red
+    mirrored = mirror(key)
+    if mirrored < key:
+        return mirrored, True
+    return key, False
+
+class Endgame_Table:
+    """
+    Class contains a read-only endgame table, the file is only mapped into memory when it's first probed
+    Attributes:
+        path: Path of the table file
+        max_empty: Most empty cells a stored position has
+        bits: Number of slots as a power of two
+        count: Number of records
+        file: Open table file, None until the first probe
+        data: Memory map of the file, None until the first probe
+    """
+    def __init__(self, path):
+        """
+        Reads the header of a table file
+        Parameters: self, path of type str
+        Returns: None
+        """
+        self.path = path
+        self.file = None
+        self.data = None
+        with open(path, "rb") as file:
+            magic, version, self.max_empty, slots, self.count = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} endgame table")
+        self.bits = slots.bit_length() - 1
+
+    @classmethod
+    def open_if_exists(cls, path = DEFAULT_PATH):
+        """
+        Opens a table file if it has been generated
+        Parameters: cls, path of type str
+        Returns: Endgame_Table, None if the file doesn't exist
+        """
+        if not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def probe(self, current, mask, num_moves):
+        """
+        Finds the exact result of a position
+        Parameters: self, current of type int, mask of type int, number of moves played of type int
+        Returns: Tuple of (best column, result for the player to move), None if the position isn't stored
+        """
+        if NUM_CELLS - num_moves > self.max_empty:
+            return None
+        if self.data is None:
+            self.file = open(self.path, "rb")
+            self.data = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+        key, mirrored = canonical(current, mask, num_moves)
+        index = slot_index(key, self.bits)
+        last = (1 << self.bits) - 1
+        while True:
+            stored_key, column, result = RECORD.unpack_from(self.data, HEADER.size + index * RECORD.size)
+            if stored_key == key:
+                return (NUM_COLS - 1 - column if mirrored else column), result
+            if stored_key == 0:
+                return None
+            index = (index + 1) & last
+
+    def close(self):
+        """
+        Unmaps and closes the table file if it was probed
+        Parameters: self
+        Returns: None
+        """
+        if self.data is not None:
+            self.data.close()
+            self.file.close()
+            self.data = None
+
+def solve(current, mask, num_moves, solved, records):
+    """
+    Solves a position and every position reachable from it, recording the ones a probe can answer
+    Parameters: current of type int, mask of type int, number of moves played of type int, solved dict of scores by position key, records dict of results by canonical key
+    Returns: score for the player to move, NUM_CELLS + 1 minus the number of moves played when a win ends the game
+    """
+    key = current + mask
+    score = solved.get(key)
+    if score is not None:
+        return score
+    if num_moves == NUM_CELLS:
+        return 0  # Tie
+
+    possible = (mask + BOTTOM_MASK) & BOARD_MASK
+    for column in range(NUM_COLS):
+        if is_win(current | (possible & column_mask(column))):
+            solved[key] = NUM_CELLS - num_moves
+            return NUM_CELLS - num_moves  # Wins right away, the search finds these without a probe
+
+    best_score = None
+    best_column = None
+    for column in range(NUM_COLS):
+        move = possible & column_mask(column)
+        if not move:
+            continue
+        score = -solve(current ^ mask, mask | move, num_moves + 1, solved, records)
+        if best_score is None or score > best_score:
+            best_score = score
+            best_column = column
+    solved[key] = best_score
+
+    canonical_key, mirrored = canonical(current, mask, num_moves)
+    if mirrored:
+        best_column = NUM_COLS - 1 - best_column  # Store the move as it's played in the canonical orientation
+    distance = NUM_CELLS + 1 - abs(best_score) - num_moves
+    records[canonical_key] = (best_column, 0 if best_score == 0 else (distance if best_score > 0 else -distance))
+    return best_score
+
+def sample_position(max_empty, rng):
+    """
+    Plays random moves from the empty board until a position with max_empty empty cells is reached
+    Players never leave the opponent an immediate win, so samples look like real endgames rather than
+    positions a blunder already decided
+    Parameters: max_empty of type int, rng of type random.Random
+    Returns: Moves of the position of type bytes
+    """
+    while True:
+        position = Position()
+        while NUM_CELLS - len(position.moves) > max_empty:
+            playable = [column for column in range(NUM_COLS) if position.can_play(column)]
+            if any(position.is_winning_move(column) for column in playable):
+                break  # The game would end here, start another one
+            safe = []
+            for column in playable:
+                child = position.copy()
+                child.play(column)
+                if not any(child.can_play(reply) and child.is_winning_move(reply) for reply in range(NUM_COLS)):
+                    safe.append(column)
+            if not safe:
+                break
+            position.play(rng.choice(safe))
+        else:
+            return position.serialize()
+
+def solve_sample(moves):
+    """
+    Solves every position reachable from a sampled position inside a worker process
+    Parameters: moves of type bytes
+    Returns: Dict of (best column, result) by canonical key
+    """
+    position = Position.from_moves(moves)
+    current = position.red if position.red_turn else position.yellow
+    records = {}
+    solve(current, position.mask, len(position.moves), {}, records)
+    return records
+
+def generate_table(path, max_empty, samples, seed = None, workers = None):
+    """
+    Solves the positions reachable from random positions with max_empty empty cells and writes them as a table file
+    Parameters: path of type str, max_empty of type int, number of sampled positions of type int, random seed of type int, number of worker processes of type int
+    Returns: Number of records written of type int
+    """
+    rng = random.Random(seed)
+    positions = list({sample_position(max_empty, rng) for _ in range(samples)})
+    print(f"Solving {len(positions)} sampled positions with {max_empty} empty cells")
+    start = time.perf_counter()
+    records = {}
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        for sample_records in executor.map(solve_sample, positions, chunksize = 4):
+            records.update(sample_records)
+
+    bits = max(1, (2 * len(records) - 1).bit_length())  # At most half of the slots are used so probes stay short
+    last = (1 << bits) - 1
+    table = bytearray((1 << bits) * RECORD.size)
+    for key, (column, result) in records.items():
+        index = slot_index(key, bits)
+        while KEY.unpack_from(table, index * RECORD.size)[0]:
+            index = (index + 1) & last
+        RECORD.pack_into(table, index * RECORD.size, key, column, result)
+
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, max_empty, 1 << bits, len(records)))
+        file.write(table)
+    os.replace(temporary_path, path)  # Never leave a half written table where the engine loads it
+    print(f"Wrote {len(records)} records to {path} in {time.perf_counter() - start:.1f}s")
+    return len(records)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Generate the endgame table probed by the computer player")
+    parser.add_argument("--output", default = DEFAULT_PATH, help = "table file to write")
+    parser.add_argument("--empty", type = int, default = 12, help = "solve positions with up to this many empty cells")
+    parser.add_argument("--samples", type = int, default = 1000, help = "random positions to solve the endgames of")
+    parser.add_argument("--seed", type = int, default = None, help = "random seed")
+    parser.add_argument("--workers", type = int, default = None, help = "worker processes, defaults to the CPU count")
+    args = parser.parse_args()
+    generate_table(args.output, args.empty, args.samples, args.seed, args.workers)
+
+if __name__ == "__main__":
+    main()
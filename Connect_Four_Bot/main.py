@@ -2,8 +2,22 @@ import discord
 from discord.ext import commands
 import os
 import asyncio
+from utils.metrics import metrics
+from utils.loop_watchdog import loop_watchdog
 
-client = commands.Bot(command_prefix = "=", intents = discord.Intents.all())
+metrics_port = 9100  # Local port the Prometheus metrics are served on
+lean_mode = True  # Only request the events and caches the cogs use, so memory doesn't grow with guild membership
+max_cached_messages = 100  # Messages kept in lean mode, moves are looked up by ID so the cache is rarely needed
+
+if lean_mode:
+    intents = discord.Intents.none()
+    intents.guilds = True  # Channels the games are played in
+    intents.guild_messages = True  # Commands
+    intents.message_content = True  # Reading the command prefix
+    intents.guild_reactions = True  # Moves and accepted invites
+    client = commands.Bot(command_prefix = "=", intents = intents, member_cache_flags = discord.MemberCacheFlags.none(), max_messages = max_cached_messages, chunk_guilds_at_startup = False)
+else:
+    client = commands.Bot(command_prefix = "=", intents = discord.Intents.all())
 
 # Get token from external txt file
 with open("important_codes.txt") as file:
@@ -23,6 +37,12 @@ async def load_cogs():
 async def main():
     async with client:
         await load_cogs()
-        await client.start(token)
+        metrics_server = await metrics.start_server(port = metrics_port)
+        try:
+            loop_watchdog.start()  # Reports handlers that block the event loop
+            await client.start(token)
+        finally:
+            metrics_server.close()  # Stop serving metrics once the bot stops
+            await metrics_server.wait_closed()
 
 asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""
+Shared services used by the cogs, kept out of the cogs folder so they aren't loaded as extensions
+"""
@@ -0,0 +1,103 @@
+import asyncio
+import itertools
+import time
+from engine.bitboard import NUM_COLS
+from engine.cache import evaluation_cache
+from engine.search import search_job
+from utils.engine_pool import Engine_Pool_Full
+
+class Analysis_Queue:
+    """
+    Class contains a priority queue of positions waiting to be evaluated for post-game analysis
+    A few worker tasks take the most urgent position and search it in the shared engine pool, but only while
+    the pool has a free worker, so live games never wait behind an analysis. Results go into the shared
+    evaluation cache, and a position that's already cached or being searched, in either orientation, isn't
+    searched again
+    Attributes:
+        engine_pool: Engine_Pool the searches run in
+        depth: Depth each position is searched to
+        time_limit: Seconds each search may take
+        max_workers: Most positions searched at once
+        poll_interval: Seconds a worker waits before checking again for a free engine worker
+        queue: asyncio.PriorityQueue of (priority, order, position, future)
+        searching: Dict with canonical position keys as keys, values contain the future of the position's result
+        order: Counter keeping positions of the same priority in the order they were queued
+        workers: List of worker tasks, empty until started
+    """
+    def __init__(self, engine_pool, depth, time_limit, max_workers = 2, poll_interval = 0.05):
+        """
+        Initializes an empty queue
+        Parameters: self, engine_pool of type Engine_Pool, depth of type int, time_limit in seconds of type float, max_workers of type int, poll_interval in seconds of type float
+        Returns: None
+        """
+        self.engine_pool = engine_pool
+        self.depth = depth
+        self.time_limit = time_limit
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.queue = asyncio.PriorityQueue()
+        self.searching = {}
+        self.order = itertools.count()
+        self.workers = []
+
+    def start(self):
+        """
+        Starts the worker tasks
+        Parameters: self
+        Returns: None
+        """
+        if not self.workers:
+            self.workers = [asyncio.create_task(self.run()) for _ in range(self.max_workers)]
+
+    async def evaluate(self, position, priority):
+        """
+        Gets the best move and score of a position, queueing a search unless the result is cached or already being searched
+        Parameters: self, position of type Position that stays unchanged, priority of type tuple where smaller is more urgent
+        Returns: Tuple of (best column, score, depth reached)
+        """
+        result = evaluation_cache.get(position, self.depth)
+        if result:
+            return result
+        key, mirrored = position.canonical_key()
+        future = self.searching.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.searching[key] = future
+            self.queue.put_nowait((priority, next(self.order), position, future))
+        column, score, reached = await asyncio.shield(future)  # Other analyses may be waiting on the same search
+        return (NUM_COLS - 1 - column if mirrored else column), score, reached
+
+    async def run(self):
+        """
+        Searches queued positions one at a time whenever the engine pool has a free worker
+        Parameters: self
+        Returns: None
+        """
+        while True:
+            priority, order, position, future = await self.queue.get()
+            while not self.engine_pool.has_idle_worker():
+                await asyncio.sleep(self.poll_interval)  # Live games go first
+            key, mirrored = position.canonical_key()
+            try:
+                result = await self.engine_pool.submit(self, search_job, position.serialize(), self.depth, time.time() + self.time_limit, timeout = self.time_limit + 2)
+            except (Engine_Pool_Full, asyncio.TimeoutError):
+                result = None
+            if result is None:
+                self.queue.put_nowait((priority, order, position, future))  # Try again once the pool has room
+                await asyncio.sleep(self.poll_interval)
+                continue
+            evaluation_cache.put(position, self.depth, result)
+            column, score, reached = result
+            self.searching.pop(key, None)
+            future.set_result(((NUM_COLS - 1 - column if mirrored else column), score, reached))  # Stored in the canonical orientation
+
+    def stop(self):
+        """
+        Stops the worker tasks and the searches they started
+        Parameters: self
+        Returns: None
+        """
+        for worker in self.workers:
+            worker.cancel()
+        self.workers = []
+        self.engine_pool.cancel(self)
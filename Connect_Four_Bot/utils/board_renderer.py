@@ -0,0 +1,75 @@
+from collections import OrderedDict
+from engine.bitboard import NUM_ROWS, NUM_COLS, COL_HEIGHT, BOTTOM_MASK
+
+class Board_Renderer:
+    """
+    Class contains a board to text renderer that caches rendered rows and whole boards
+    Attributes:
+        symbols: Dict with board characters as keys, values contain the emoji for that cell
+        adjust_factor: Width each emoji is padded to
+        rows: Dict with (red row bits, yellow row bits) as keys, values contain the rendered row
+        boards: Ordered dict with position keys as keys, values contain the rendered board, oldest first
+        max_boards: Most boards kept before the least recently used is evicted
+    """
+    def __init__(self, symbols, adjust_factor = 5, max_boards = 4096):
+        """
+        Initializes the renderer with empty caches
+        Parameters: self, symbols of type dict, adjust_factor of type int, max_boards of type int
+        Returns: None
+        """
+        self.symbols = symbols
+        self.adjust_factor = adjust_factor
+        self.rows = {}
+        self.boards = OrderedDict()
+        self.max_boards = max_boards
+
+    def render_row(self, board, row):
+        """
+        Renders one row of the board, reusing the text of any row with the same pieces
+        Parameters: self, board of type Position, row index counted from the top of type int
+        Returns: String representing the row
+        """
+        height = NUM_ROWS - 1 - row
+        # Shifting the row down to height 0 leaves one bit per column at column * COL_HEIGHT
+        row_key = ((board.red >> height) & BOTTOM_MASK, (board.yellow >> height) & BOTTOM_MASK)
+        text = self.rows.get(row_key)
+        if text is None:
+            red_bits, yellow_bits = row_key
+            text = ""
+            for column in range(NUM_COLS):
+                bit = 1 << (column * COL_HEIGHT)
+                if red_bits & bit:
+                    element = self.symbols["r"]
+                elif yellow_bits & bit:
+                    element = self.symbols["y"]
+                else:
+                    element = self.symbols["*"]
+                text += element.rjust(self.adjust_factor)
+            text += "\n"  # Create a new line
+            self.rows[row_key] = text  # At most 3 ** 7 different rows exist, so this cache needs no limit
+        return text
+
+    def render_rows(self, board):
+        """
+        Renders every row of the board
+        Parameters: self, board of type Position
+        Returns: List of strings, one per row from the top
+        """
+        return [self.render_row(board, row) for row in range(NUM_ROWS)]
+
+    def render(self, board, rows = None):
+        """
+        Renders the whole board, reusing the text of a board already rendered by any game
+        Parameters: self, board of type Position, list of already rendered rows of type list of str (rendered here if missing)
+        Returns: String representing the board
+        """
+        key = board.key()
+        text = self.boards.get(key)
+        if text is not None:
+            self.boards.move_to_end(key)
+            return text
+        text = "".join(rows if rows is not None else self.render_rows(board))
+        self.boards[key] = text
+        if len(self.boards) > self.max_boards:
+            self.boards.popitem(last = False)
+        return text
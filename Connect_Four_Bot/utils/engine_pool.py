@@ -0,0 +1,95 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+class Engine_Pool_Full(Exception):
+    """
+    Raised when too many engine jobs are already waiting for a worker
+    """
+
+class Engine_Pool:
+    """
+    Class contains a pool of worker processes for CPU-heavy engine work so the event loop stays responsive
+    Every worker process has its own executor, so jobs that keep state in their worker between calls can be
+    sent to the same worker every time
+    Attributes:
+        executors: List of single process pools, one per worker
+        workers: Number of worker processes
+        loads: List with the number of jobs queued or running on each worker
+        max_pending: Largest number of jobs allowed to be queued or running at once
+        pending: Number of jobs queued or running
+        jobs: Dict with game IDs as keys, values contain the set of that game's unfinished jobs
+        cancelled: Set of jobs cancelled with cancel() whose callers haven't been told yet
+    """
+    def __init__(self, max_workers = None, max_pending = 64):
+        """
+        Initializes the worker processes
+        Parameters: self, number of worker processes of type int (defaults to the CPU count), queue depth cap of type int
+        Returns: None
+        """
+        self.workers = max_workers or os.cpu_count()
+        self.executors = [ProcessPoolExecutor(max_workers = 1) for _ in range(self.workers)]
+        self.loads = [0] * self.workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.jobs = {}
+        self.cancelled = set()
+
+    async def submit(self, game_id, function, *args, timeout = None, pinned = False):
+        """
+        Runs a function in a worker process and waits for its result without blocking the event loop
+        Parameters: self, unique game_id of type UUID, module level function, arguments of the function, seconds to wait of type float, pinned of type bool to always run the game's jobs on the same worker
+        Returns: Result of the function, None if the job was cancelled with cancel()
+        """
+        if self.pending >= self.max_pending:
+            raise Engine_Pool_Full()
+        if pinned:
+            worker = hash(game_id) % self.workers  # The worker keeps what the game's earlier jobs left behind
+        else:
+            worker = min(range(self.workers), key = self.loads.__getitem__)  # Least busy worker
+        job = self.executors[worker].submit(function, *args)
+        self.pending += 1
+        self.loads[worker] += 1
+        self.jobs.setdefault(game_id, set()).add(job)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(job), timeout)  # Raises asyncio.TimeoutError past the deadline
+        except asyncio.CancelledError:
+            if job in self.cancelled:
+                return None  # Cancelled because the game ended
+            raise  # The caller itself was cancelled, which also cancels a job that hasn't started
+        finally:
+            self.cancelled.discard(job)
+            self.pending -= 1
+            self.loads[worker] -= 1
+            game_jobs = self.jobs.get(game_id)
+            if game_jobs is not None:
+                game_jobs.discard(job)
+                if not game_jobs:
+                    self.jobs.pop(game_id)
+
+    def has_idle_worker(self):
+        """
+        Checks if a new job would start right away instead of waiting behind other jobs
+        Parameters: self
+        Returns: True or False based on if fewer jobs than workers are running
+        """
+        return self.pending < self.workers
+
+    def cancel(self, game_id):
+        """
+        Cancels every unfinished job of a game, jobs already running finish at their own deadline and are ignored
+        Parameters: self, unique game_id of type UUID
+        Returns: None
+        """
+        for job in self.jobs.pop(game_id, ()):
+            if job.cancel():
+                self.cancelled.add(job)
+
+    def shutdown(self):
+        """
+        Stops the worker processes, dropping queued jobs
+        Parameters: self
+        Returns: None
+        """
+        for executor in self.executors:
+            executor.shutdown(wait = False, cancel_futures = True)
@@ -0,0 +1,411 @@
+import asyncio
+import itertools
+import time
+
+snowflakes = itertools.count(1000)  # IDs handed out to every fake user, channel and message
+
+class Fake_User:
+    """
+    Class contains a stand-in for a Discord user
+    Attributes:
+        id: Unique user ID
+        display_name: Name shown in embeds
+        bot: Boolean indicating if the user is a bot
+    """
+    def __init__(self, display_name, bot = False):
+        """
+        Initializes the user with a new ID
+        Parameters: self, display_name of type str, bot of type bool
+        Returns: None
+        """
+        self.id = next(snowflakes)
+        self.display_name = display_name
+        self.bot = bot
+
+class Fake_Message:
+    """
+    Class contains a stand-in for a Discord message that records when its reactions and button presses were answered by an edit
+    Attributes:
+        id: Unique message ID
+        channel: Fake_Channel the message was sent in
+        embed: Latest embed of the message
+        view: discord.ui.View attached to the message, None if it has no components
+        client: Fake_Client the message belongs to
+        reactions: List of emojis added to the message
+        deleted: Boolean indicating if the message was deleted
+        edits: Number of times the message was edited
+        waiting: List of times reactions were added or buttons pressed that no edit has answered yet
+        edited: Event set on every edit, cleared by whoever waits for the next one
+    """
+    def __init__(self, channel, embed, view, client):
+        """
+        Initializes the message
+        Parameters: self, channel of type Fake_Channel, embed of type discord.Embed, view of type discord.ui.View, client of type Fake_Client
+        Returns: None
+        """
+        self.id = next(snowflakes)
+        self.channel = channel
+        self.embed = embed
+        self.view = view
+        self.client = client
+        self.reactions = []
+        self.deleted = False
+        self.edits = 0
+        self.waiting = []
+        self.edited = asyncio.Event()
+
+    async def edit(self, embed = None, **kwargs):
+        """
+        Replaces the embed and view, answering every reaction and button press since the last edit
+        Parameters: self, embed of type discord.Embed, view of type discord.ui.View or None
+        Returns: None
+        """
+        await self.client.api_call()
+        self.apply_edit(embed, kwargs)
+
+    def apply_edit(self, embed, changes):
+        """
+        Records an edit that reached the fake API
+        Parameters: self, embed of type discord.Embed, changes of type dict
+        Returns: None
+        """
+        self.embed = embed
+        if "view" in changes:
+            self.view = changes["view"]
+        self.edits += 1
+        now = time.perf_counter()
+        self.client.latencies.extend(now - added for added in self.waiting)
+        self.waiting = []
+        self.edited.set()
+
+    async def add_reaction(self, emoji):
+        """
+        Adds a reaction as the bot
+        Parameters: self, emoji of type str
+        Returns: None
+        """
+        await self.client.api_call()
+        self.reactions.append(emoji)
+
+    async def delete(self):
+        """
+        Deletes the message
+        Parameters: self
+        Returns: None
+        """
+        await self.client.api_call()
+        self.deleted = True
+
+    async def wait_for_edit(self):
+        """
+        Waits until the message is edited again
+        Parameters: self
+        Returns: None
+        """
+        await self.edited.wait()
+        self.edited.clear()
+
+class Fake_Reaction_Payload:
+    """
+    Class contains a stand-in for the payload of a raw reaction event, which only carries IDs
+    Attributes:
+        message_id: ID of the message reacted to
+        channel_id: ID of the channel of the message
+        user_id: ID of the user who reacted
+        emoji: Emoji of the reaction
+        member: Fake_User who reacted, sent along for reactions in guilds
+    """
+    def __init__(self, message, emoji, user):
+        """
+        Initializes the payload
+        Parameters: self, message of type Fake_Message, emoji of type str, user of type Fake_User
+        Returns: None
+        """
+        self.message_id = message.id
+        self.channel_id = message.channel.id
+        self.user_id = user.id
+        self.emoji = emoji
+        self.member = user
+
+class Fake_Interaction_Response:
+    """
+    Class contains a stand-in for the response of an interaction, which can only be sent once
+    Attributes:
+        interaction: Fake_Interaction being answered
+        done: Boolean indicating if the interaction has been answered
+        ephemeral: List of contents of messages only the user could see
+    """
+    def __init__(self, interaction):
+        """
+        Initializes an unanswered response
+        Parameters: self, interaction of type Fake_Interaction
+        Returns: None
+        """
+        self.interaction = interaction
+        self.done = False
+        self.ephemeral = []
+
+    def is_done(self):
+        """
+        Checks if the interaction has been answered
+        Parameters: self
+        Returns: True or False based on if a response was sent
+        """
+        return self.done
+
+    async def edit_message(self, embed = None, **kwargs):
+        """
+        Answers the interaction by editing the message the button is on
+        Parameters: self, embed of type discord.Embed, view of type discord.ui.View or None
+        Returns: None
+        """
+        self.done = True
+        message = self.interaction.message
+        await message.client.api_call()
+        message.apply_edit(embed, kwargs)
+
+    async def defer(self):
+        """
+        Acknowledges the interaction without changing anything
+        Parameters: self
+        Returns: None
+        """
+        self.done = True
+        await self.interaction.message.client.api_call()
+
+    async def send_message(self, content = None, ephemeral = False, **kwargs):
+        """
+        Answers the interaction with a new message
+        Parameters: self, content of type str, ephemeral of type bool
+        Returns: None
+        """
+        self.done = True
+        await self.interaction.message.client.api_call()
+        self.ephemeral.append(content)
+
+class Fake_Interaction:
+    """
+    Class contains a stand-in for a button press
+    Attributes:
+        user: Fake_User who pressed the button
+        message: Fake_Message the button is on
+        response: Fake_Interaction_Response for answering the press
+    """
+    def __init__(self, message, user):
+        """
+        Initializes the interaction
+        Parameters: self, message of type Fake_Message, user of type Fake_User
+        Returns: None
+        """
+        self.user = user
+        self.message = message
+        self.response = Fake_Interaction_Response(self)
+
+class Fake_Channel:
+    """
+    Class contains a stand-in for a text channel
+    Attributes:
+        id: Unique channel ID
+        client: Fake_Client the channel belongs to
+        messages: List of messages sent in the channel, oldest first
+        message_sent: Event set on every message sent, cleared by wait_for_message
+    """
+    def __init__(self, client):
+        """
+        Initializes an empty channel
+        Parameters: self, client of type Fake_Client
+        Returns: None
+        """
+        self.id = next(snowflakes)
+        self.client = client
+        self.messages = []
+        self.message_sent = asyncio.Event()
+
+    async def send(self, embed = None, view = None, **kwargs):
+        """
+        Sends a message with an embed
+        Parameters: self, embed of type discord.Embed, view of type discord.ui.View
+        Returns: Fake_Message that was sent
+        """
+        await self.client.api_call()
+        message = Fake_Message(self, embed, view, self.client)
+        self.messages.append(message)
+        self.message_sent.set()
+        return message
+
+    async def fetch_message(self, message_id):
+        """
+        Gets a message sent in the channel
+        Parameters: self, message_id of type int
+        Returns: Fake_Message
+        """
+        await self.client.api_call()
+        for message in self.messages:
+            if message.id == message_id:
+                return message
+        raise LookupError(f"Unknown message {message_id}")
+
+    async def wait_for_message(self, count):
+        """
+        Waits until more than count messages have been sent in the channel
+        Parameters: self, count of type int
+        Returns: The newest Fake_Message
+        """
+        while len(self.messages) <= count:
+            await self.message_sent.wait()
+            self.message_sent.clear()
+        return self.messages[-1]
+
+class Fake_Context:
+    """
+    Class contains a stand-in for the context a command is invoked with
+    Attributes:
+        channel: Fake_Channel the command was sent in
+        author: Fake_User who sent the command
+    """
+    def __init__(self, channel, author):
+        """
+        Initializes the context
+        Parameters: self, channel of type Fake_Channel, author of type Fake_User
+        Returns: None
+        """
+        self.channel = channel
+        self.author = author
+
+class Fake_Client:
+    """
+    Class contains a stand-in for the bot client that delivers events to cog listeners without a gateway connection
+    Attributes:
+        user: Fake_User of the bot itself
+        cogs: List of cogs added to the client
+        channels: Dict with channel IDs as keys, values contain the Fake_Channel
+        api_latency: Seconds every fake API call takes
+        latencies: List of seconds between a reaction and the edit answering it
+        tasks: Set of listener tasks that haven't finished
+    """
+    def __init__(self, api_latency = 0.0):
+        """
+        Initializes the client without cogs
+        Parameters: self, api_latency in seconds of type float
+        Returns: None
+        """
+        self.user = Fake_User("Connect Four Bot", bot = True)
+        self.cogs = []
+        self.channels = {}
+        self.api_latency = api_latency
+        self.latencies = []
+        self.tasks = set()
+
+    async def add_cog(self, cog):
+        """
+        Adds a cog so its listeners receive events, running its cog_load hook like discord.py does
+        Parameters: self, cog of type commands.Cog
+        Returns: None
+        """
+        self.cogs.append(cog)
+        await cog.cog_load()
+
+    async def close(self):
+        """
+        Unloads every cog and waits for listeners still running
+        Parameters: self
+        Returns: None
+        """
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions = True)
+        for cog in self.cogs:
+            await cog.cog_unload()
+
+    async def api_call(self):
+        """
+        Waits as long as one request to Discord would take
+        Parameters: self
+        Returns: None
+        """
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+
+    def create_channel(self):
+        """
+        Creates a new text channel
+        Parameters: self
+        Returns: Fake_Channel
+        """
+        channel = Fake_Channel(self)
+        self.channels[channel.id] = channel
+        return channel
+
+    def get_channel(self, channel_id):
+        """
+        Gets a channel from the cache
+        Parameters: self, channel_id of type int
+        Returns: Fake_Channel, None if it doesn't exist
+        """
+        return self.channels.get(channel_id)
+
+    async def fetch_channel(self, channel_id):
+        """
+        Gets a channel from the API
+        Parameters: self, channel_id of type int
+        Returns: Fake_Channel
+        """
+        await self.api_call()
+        return self.channels[channel_id]
+
+    def add_view(self, view, message_id = None):
+        """
+        Accepts a persistent view, the fake messages hold their views directly so nothing needs to be stored
+        Parameters: self, view of type discord.ui.View, message_id of type int
+        Returns: None
+        """
+
+    def dispatch(self, event, *args):
+        """
+        Schedules every cog listener of an event as its own task, like discord.py does
+        Parameters: self, event name without the on_ prefix of type str, arguments of the event
+        Returns: None
+        """
+        for cog in self.cogs:
+            for name, listener in cog.get_listeners():
+                if name == f"on_{event}":
+                    self.run_listener(listener(*args))
+
+    def run_listener(self, coroutine):
+        """
+        Runs an event handler as its own task
+        Parameters: self, coroutine of the handler
+        Returns: None
+        """
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.listener_done)
+
+    def listener_done(self, task):
+        """
+        Forgets a finished listener task and reports its error
+        Parameters: self, task of type asyncio.Task
+        Returns: None
+        """
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"Listener failed: {task.exception()!r}")
+
+    def add_reaction(self, message, emoji, user):
+        """
+        Adds a reaction as a user and delivers the raw_reaction_add event
+        Parameters: self, message of type Fake_Message, emoji of type str, user of type Fake_User
+        Returns: None
+        """
+        message.reactions.append(emoji)
+        message.waiting.append(time.perf_counter())
+        self.dispatch("raw_reaction_add", Fake_Reaction_Payload(message, emoji, user))
+
+    def press_button(self, message, custom_id, user):
+        """
+        Presses a button on a message as a user and delivers the interaction to the button's callback
+        Parameters: self, message of type Fake_Message, custom_id of the button of type str, user of type Fake_User
+        Returns: None
+        """
+        button = next(item for item in message.view.children if item.custom_id == custom_id)
+        message.waiting.append(time.perf_counter())
+        self.run_listener(button.callback(Fake_Interaction(message, user)))
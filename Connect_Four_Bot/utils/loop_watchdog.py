@@ -0,0 +1,171 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from utils.metrics import loop_lag
+
+COGS_FOLDER = os.sep + "cogs" + os.sep  # Frames from files in a cogs folder belong to a cog handler
+
+def describe(frame):
+    """
+    Names the function a frame is running
+    Parameters: frame
+    Returns: String like "Game.move (game_functionality.py:300)"
+    """
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def find_handler(frame):
+    """
+    Finds the innermost frame of a stack that runs cog code
+    Parameters: innermost frame of the stack
+    Returns: Frame from a cog, the innermost frame if no cog code is on the stack
+    """
+    innermost = frame
+    while frame is not None:
+        if COGS_FOLDER in frame.f_code.co_filename:
+            return frame
+        frame = frame.f_back
+    return innermost
+
+class Loop_Watchdog:
+    """
+    Class contains a monitor for the event loop and a sampling profiler
+    A task on the loop records a heartbeat every interval. A thread checks the heartbeat and, when the loop has been
+    stuck for longer than threshold, samples the loop thread's stack to show which handler is blocking it
+    Attributes:
+        interval: Seconds between heartbeats
+        threshold: Seconds of lag before a stall is reported
+        heartbeat: Monotonic time of the last heartbeat
+        loop_thread: Thread ID of the event loop
+        stall_started: Monotonic time the current stall started at, None while the loop is responsive
+        heart: Task recording heartbeats, None until started
+        watcher: Thread checking the heartbeat, None until started
+        profiling: Event that stops the running profile, None if no profile is running
+    """
+    def __init__(self, interval = 0.1, threshold = 0.25):
+        """
+        Initializes a watchdog that isn't running yet
+        Parameters: self, interval in seconds of type float, threshold in seconds of type float
+        Returns: None
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.heartbeat = None
+        self.loop_thread = None
+        self.stall_started = None
+        self.heart = None
+        self.watcher = None
+        self.profiling = None
+
+    def start(self):
+        """
+        Starts the heartbeat task and the watcher thread, must be called from the event loop
+        Parameters: self
+        Returns: None
+        """
+        self.loop_thread = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self.heart = asyncio.create_task(self.beat())
+        self.watcher = threading.Thread(target = self.watch, name = "loop-watchdog", daemon = True)
+        self.watcher.start()
+
+    async def beat(self):
+        """
+        Records a heartbeat and the loop lag every interval
+        Parameters: self
+        Returns: None
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            loop_lag.observe(max(0.0, loop.time() - start - self.interval))
+            self.heartbeat = time.monotonic()
+
+    def watch(self):
+        """
+        Reports the start and end of every stall, runs in the watcher thread
+        Parameters: self
+        Returns: None
+        """
+        while True:
+            time.sleep(self.interval)
+            blocked = time.monotonic() - self.heartbeat - self.interval
+            if blocked > self.threshold and self.stall_started is None:
+                self.stall_started = time.monotonic() - blocked
+                self.report_stall(blocked)
+            elif blocked <= self.threshold and self.stall_started is not None:
+                print(f"Event loop recovered after {self.heartbeat - self.stall_started:.2f}s")
+                self.stall_started = None
+
+    def report_stall(self, blocked):
+        """
+        Prints the handler blocking the loop and the loop thread's stack
+        Parameters: self, seconds the loop has been blocked for of type float
+        Returns: None
+        """
+        frame = sys._current_frames().get(self.loop_thread)
+        if frame is None:
+            return
+        print(f"Event loop blocked for {blocked:.2f}s in {describe(find_handler(frame))}")
+        print("".join(traceback.format_stack(frame)), end = "")
+
+    def sample(self, seconds, interval, stop):
+        """
+        Samples the loop thread's stack until the time is up or the profile is stopped, runs in a worker thread
+        Each sample is weighted by the time since the previous one, the sampler waits longer for the GIL while
+        the loop runs Python code than while it waits for events, so counting samples would favour idle time
+        Parameters: self, seconds of type float, interval between samples in seconds of type float, stop of type threading.Event
+        Returns: Tuple of (number of samples, Counter of seconds per function on top of the stack, Counter of seconds per function anywhere on the stack, seconds sampled)
+        """
+        own = Counter()
+        total = Counter()
+        samples = 0
+        start = last = time.monotonic()
+        end = start + seconds
+        while last < end and not stop.wait(interval):
+            frame = sys._current_frames().get(self.loop_thread)
+            now = time.monotonic()
+            weight = now - last
+            last = now
+            if frame is None:
+                continue
+            samples += 1
+            own[describe(frame)] += weight
+            seen = set()  # Recursive functions count once per sample
+            while frame is not None:
+                name = describe(frame)
+                if name not in seen:
+                    seen.add(name)
+                    total[name] += weight
+                frame = frame.f_back
+        return samples, own, total, last - start
+
+    async def profile(self, seconds, interval = 0.005):
+        """
+        Runs the sampling profiler without blocking the loop it samples
+        Parameters: self, seconds of type float, interval between samples in seconds of type float
+        Returns: Tuple of (number of samples, Counter of seconds per function on top of the stack, Counter of seconds per function anywhere on the stack, seconds sampled)
+        """
+        self.profiling = threading.Event()
+        try:
+            return await asyncio.to_thread(self.sample, seconds, interval, self.profiling)
+        finally:
+            self.profiling = None
+
+    def stop_profile(self):
+        """
+        Stops the running profile early
+        Parameters: self
+        Returns: True or False based on if a profile was running
+        """
+        if self.profiling is None:
+            return False
+        self.profiling.set()
+        return True
+
+loop_watchdog = Loop_Watchdog()  # Single watchdog for the bot's event loop
@@ -0,0 +1,39 @@
+class Message_Registry:
+    """
+    Class contains a lookup from message IDs to the game or invite shown in that message, shared by every cog
+    Attributes:
+        entries: Dict with message IDs as keys, values contain the game or invite instance
+    """
+    def __init__(self):
+        """
+        Initializes an empty registry
+        Parameters: self
+        Returns: None
+        """
+        self.entries = {}
+
+    def add(self, message_id, entry):
+        """
+        Starts routing reactions on a message to a game or invite
+        Parameters: self, message_id of type int, game or invite instance
+        Returns: None
+        """
+        self.entries[message_id] = entry
+
+    def remove(self, message_id):
+        """
+        Stops routing reactions on a message, does nothing if the message isn't tracked
+        Parameters: self, message_id of type int
+        Returns: None
+        """
+        self.entries.pop(message_id, None)
+
+    def get(self, message_id):
+        """
+        Finds the game or invite shown in a message
+        Parameters: self, message_id of type int
+        Returns: Game or invite instance, None if the message isn't tracked
+        """
+        return self.entries.get(message_id)
+
+message_registry = Message_Registry()  # Single registry shared by the game and invite cogs
@@ -0,0 +1,251 @@
+import asyncio
+import bisect
+import functools
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Seconds
+
+def format_labels(label_names, label_values, extra = ""):
+    """
+    Formats label pairs in the Prometheus text format
+    Parameters: label_names of type tuple, label_values of type tuple, extra label pair already formatted of type str
+    Returns: String like {handler="move"}, empty if there are no labels
+    """
+    pairs = [f'{name}="{value}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """
+    Class contains what every metric type shares
+    Attributes:
+        name: Metric name
+        description: Help text
+        label_names: Tuple of label names, empty for a metric without labels
+        children: Dict with tuples of label values as keys, values contain the metric's value for those labels
+    """
+    kind = "untyped"
+
+    def __init__(self, name, description, label_names = ()):
+        """
+        Initializes a metric without any values
+        Parameters: self, name of type str, description of type str, label_names of type tuple
+        Returns: None
+        """
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.children = {}
+
+    def render(self):
+        """
+        Formats the metric in the Prometheus text format
+        Parameters: self
+        Returns: List of lines of type str
+        """
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for label_values, value in self.children.items():
+            lines.extend(self.render_child(label_values, value))
+        return lines
+
+    def render_child(self, label_values, value):
+        """
+        Formats the value of one set of labels
+        Parameters: self, label_values of type tuple, value
+        Returns: List of lines of type str
+        """
+        return [f"{self.name}{format_labels(self.label_names, label_values)} {value}"]
+
+class Counter(Metric):
+    """
+    Class contains a value that only goes up
+    """
+    kind = "counter"
+
+    def inc(self, *label_values, amount = 1):
+        """
+        Increases the counter
+        Parameters: self, label values in the order of label_names, amount of type float
+        Returns: None
+        """
+        self.children[label_values] = self.children.get(label_values, 0) + amount
+
+class Gauge(Metric):
+    """
+    Class contains a value read from a function every time the metrics are collected
+    Attributes:
+        function: Function returning the current value, None until set
+    """
+    kind = "gauge"
+
+    def __init__(self, name, description):
+        """
+        Initializes a gauge without a function
+        Parameters: self, name of type str, description of type str
+        Returns: None
+        """
+        super().__init__(name, description)
+        self.function = None
+
+    def set_function(self, function):
+        """
+        Sets the function read on every collection
+        Parameters: self, function returning a number
+        Returns: None
+        """
+        self.function = function
+
+    def render(self):
+        """
+        Formats the gauge after reading its function
+        Parameters: self
+        Returns: List of lines of type str
+        """
+        if self.function is not None:
+            self.children[()] = self.function()
+        return super().render()
+
+class Histogram(Metric):
+    """
+    Class contains counts of observed values in buckets, stored per bucket and summed up when rendered
+    Attributes:
+        buckets: Sorted tuple of bucket upper bounds
+    """
+    kind = "histogram"
+
+    def __init__(self, name, description, label_names = (), buckets = DEFAULT_BUCKETS):
+        """
+        Initializes a histogram without observations
+        Parameters: self, name of type str, description of type str, label_names of type tuple, buckets of type tuple
+        Returns: None
+        """
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        """
+        Records one observed value
+        Parameters: self, value of type float, label values in the order of label_names
+        Returns: None
+        """
+        child = self.children.get(label_values)
+        if child is None:
+            child = self.children[label_values] = [[0] * (len(self.buckets) + 1), 0.0]  # Count per bucket with +Inf last, sum
+        child[0][bisect.bisect_left(self.buckets, value)] += 1
+        child[1] += value
+
+    def render_child(self, label_values, value):
+        """
+        Formats the cumulative buckets, sum and count of one set of labels
+        Parameters: self, label_values of type tuple, value of type list
+        Returns: List of lines of type str
+        """
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            cumulative += count
+            bound_label = f'le="{bound}"'
+            lines.append(f"{self.name}_bucket{format_labels(self.label_names, label_values, bound_label)} {cumulative}")
+        labels = format_labels(self.label_names, label_values)
+        lines.append(f"{self.name}_sum{labels} {total}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def time(self, *label_values):
+        """
+        Creates a decorator that observes how long each call of a coroutine function takes
+        Parameters: self, label values in the order of label_names
+        Returns: decorator
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            async def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, *label_values)
+            return timed
+        return decorator
+
+class Metrics_Registry:
+    """
+    Class contains every metric of the bot and renders them for Prometheus
+    Attributes:
+        metrics: List of metrics in the order they were created
+    """
+    def __init__(self):
+        """
+        Initializes an empty registry
+        Parameters: self
+        Returns: None
+        """
+        self.metrics = []
+
+    def add(self, metric):
+        """
+        Adds a metric to the registry
+        Parameters: self, metric of type Metric
+        Returns: The same metric
+        """
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        Formats every metric in the Prometheus text format
+        Parameters: self
+        Returns: String of the whole exposition
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    async def handle_request(self, reader, writer):
+        """
+        Answers one HTTP request, GET /metrics returns the metrics and anything else returns 404
+        Parameters: self, reader of type asyncio.StreamReader, writer of type asyncio.StreamWriter
+        Returns: None
+        """
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass  # Headers aren't needed
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status = "200 OK"
+                body = self.render().encode()
+            else:
+                status = "404 Not Found"
+                body = b"Not found\n"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start_server(self, host = "127.0.0.1", port = 9100):
+        """
+        Starts serving the metrics over HTTP on the event loop
+        Parameters: self, host of type str, port of type int
+        Returns: asyncio.Server
+        """
+        server = await asyncio.start_server(self.handle_request, host, port)
+        print(f"Serving metrics on http://{host}:{port}/metrics")
+        return server
+
+metrics = Metrics_Registry()  # Single registry shared by every cog
+
+handler_latency = metrics.add(Histogram("connect4_handler_seconds", "Time spent in each event handler", ("handler",)))
+render_delay = metrics.add(Histogram("connect4_render_delay_seconds", "Time from an embed change to the edit reaching Discord"))
+moves_played = metrics.add(Counter("connect4_moves_total", "Moves played", ("player",)))
+games_finished = metrics.add(Counter("connect4_games_finished_total", "Games finished by how they ended", ("result",)))
+invites_resolved = metrics.add(Counter("connect4_invites_total", "Invites by how they were resolved", ("result",)))
+live_games = metrics.add(Gauge("connect4_live_games", "Games in progress"))
+live_invites = metrics.add(Gauge("connect4_live_invites", "Invites waiting for an opponent"))
+pending_timers = metrics.add(Gauge("connect4_pending_timers", "Timers waiting on the shared timing wheel"))
+loop_lag = metrics.add(Histogram("connect4_loop_lag_seconds", "How late the event loop ran a task that slept for a fixed interval"))
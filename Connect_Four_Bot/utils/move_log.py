@@ -0,0 +1,239 @@
+import asyncio
+import json
+import os
+import time
+
+END_OF_GAME = 0xFF  # Move marking a finished game, real moves are columns 0 to 6
+SNAPSHOT_FILE = "snapshot.json"
+SEGMENT_FILE = "segment.{}.log"  # Formatted with the generation
+
+class Move_Log:
+    """
+    Class contains a crash-safe log of every live game's moves
+    Every game's records go to one append-only segment file per generation, one line per new game or move.
+    Every flush_interval seconds the records since the last batch are appended with a single write and a
+    single fsync, however many games are running. Every snapshot_interval seconds the live games are written
+    to one snapshot file, the generation moves on and older segments are deleted
+    Record lines, a crash can only cut off the last one:
+        <game ID> meta <time> <meta data as JSON>
+        <game ID> <ply> <time> <column or END_OF_GAME>
+    Attributes:
+        directory: Folder holding the segment and snapshot files
+        flush_interval: Seconds between batched writes
+        snapshot_interval: Seconds between snapshots
+        generation: Generation of the segment new records are appended to
+        games: Dict with game IDs as keys, values contain the game's meta data, moves and turn start time
+        pending: List of record lines not written yet
+        writer: Task writing batches, None until started
+    """
+    def __init__(self, directory = "game_logs", flush_interval = 0.2, snapshot_interval = 300):
+        """
+        Initializes the log, call load() before recording new games
+        Parameters: self, directory of type str, flush_interval in seconds of type float, snapshot_interval in seconds of type float
+        Returns: None
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+        self.generation = 0
+        self.games = {}
+        self.pending = []
+        self.writer = None
+
+    def path(self, name):
+        """
+        Gets the path of a file in the log folder
+        Parameters: self, file name of type str
+        Returns: path of type str
+        """
+        return os.path.join(self.directory, name)
+
+    def load(self):
+        """
+        Replays the snapshot and the segments written after it
+        Parameters: self
+        Returns: Dict with game IDs of type str as keys, values contain dicts with "meta", "moves" and "turn_started"
+        """
+        os.makedirs(self.directory, exist_ok = True)
+        snapshot_generation = -1
+        if os.path.exists(self.path(SNAPSHOT_FILE)):
+            with open(self.path(SNAPSHOT_FILE)) as file:
+                snapshot = json.load(file)
+            snapshot_generation = snapshot["generation"]
+            for game_id, game in snapshot["games"].items():
+                self.games[game_id] = {"meta": game["meta"], "moves": bytearray(int(column) for column in game["moves"]), "turn_started": game["turn_started"]}
+
+        segments = []
+        for name in os.listdir(self.directory):
+            parts = name.split(".")
+            if parts[0] == "segment" and parts[-1] == "log" and int(parts[1]) > snapshot_generation:
+                segments.append((int(parts[1]), name))  # Segments from before the snapshot are already in it
+
+        # New records go to a segment of their own, never after a record a crash cut off
+        self.generation = snapshot_generation + 1
+        for generation, name in sorted(segments):
+            self.generation = max(self.generation, generation + 1)
+            with open(self.path(name), "rb") as file:
+                lines = file.read().split(b"\n")
+            for line in lines[:-1]:  # The last piece is empty unless a crash cut off the record
+                self.replay_record(line)
+
+        for game_id in [game_id for game_id, game in self.games.items() if END_OF_GAME in game["moves"]]:
+            self.games.pop(game_id)
+        return {game_id: dict(game) for game_id, game in self.games.items()}
+
+    def replay_record(self, line):
+        """
+        Applies one record line read back from a segment, records that don't fit the game so far are skipped
+        Parameters: self, line of type bytes without its newline
+        Returns: None
+        """
+        try:
+            game_id, kind, logged_at, value = line.decode().split(" ", 3)
+            if kind == "meta":
+                if game_id not in self.games:
+                    self.games[game_id] = {"meta": json.loads(value), "moves": bytearray(), "turn_started": float(logged_at)}
+                return
+            ply, logged_at, column = int(kind), float(logged_at), int(value)
+        except ValueError:
+            return  # Only a record cut off by a crash can be malformed
+        game = self.games.get(game_id)
+        if game is None or ply != len(game["moves"]):
+            return  # The meta data never made it to disk, or the move is already in the snapshot
+        game["moves"].append(column)
+        game["turn_started"] = logged_at
+
+    def start(self):
+        """
+        Starts the task writing batches and snapshots
+        Parameters: self
+        Returns: None
+        """
+        if self.writer is None:
+            self.writer = asyncio.create_task(self.run())
+
+    def start_game(self, game_id, meta):
+        """
+        Records a new game
+        Parameters: self, unique game_id of type UUID or str, meta of type dict with everything needed to rebuild the game
+        Returns: None
+        """
+        game_id = str(game_id)
+        started = time.time()
+        self.games[game_id] = {"meta": meta, "moves": bytearray(), "turn_started": started}
+        self.pending.append(f"{game_id} meta {started:.3f} {json.dumps(meta)}\n")
+
+    def record_move(self, game_id, column):
+        """
+        Records one move
+        Parameters: self, unique game_id of type UUID or str, column index of type int
+        Returns: None
+        """
+        game_id = str(game_id)
+        game = self.games.get(game_id)
+        if game is None:
+            return
+        game["turn_started"] = time.time()
+        self.pending.append(f"{game_id} {len(game['moves'])} {game['turn_started']:.3f} {column}\n")
+        game["moves"].append(column)
+
+    def end_game(self, game_id):
+        """
+        Records that a game finished so it isn't rebuilt after a restart
+        Parameters: self, unique game_id of type UUID or str
+        Returns: None
+        """
+        game_id = str(game_id)
+        game = self.games.pop(game_id, None)
+        if game is not None:
+            self.pending.append(f"{game_id} {len(game['moves'])} {time.time():.3f} {END_OF_GAME}\n")
+
+    async def run(self):
+        """
+        Writes a batch every flush_interval seconds and a snapshot every snapshot_interval seconds
+        Parameters: self
+        Returns: None
+        """
+        last_snapshot = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if time.monotonic() - last_snapshot >= self.snapshot_interval:
+                await self.snapshot()
+                last_snapshot = time.monotonic()
+
+    async def flush(self):
+        """
+        Writes every pending record in one batch off the event loop
+        Parameters: self
+        Returns: None
+        """
+        if not self.pending:
+            return
+        batch = "".join(self.pending).encode()
+        self.pending = []  # Moves made while this batch is written go in the next one
+        await asyncio.to_thread(self.write_batch, batch, self.generation)
+
+    def write_batch(self, batch, generation):
+        """
+        Appends a batch to the generation's segment with one write and one fsync, runs in a worker thread
+        Parameters: self, batch of record lines of type bytes, generation of type int
+        Returns: None
+        """
+        file_descriptor = os.open(self.path(SEGMENT_FILE.format(generation)), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            while batch:
+                batch = batch[os.write(file_descriptor, batch):]  # Large writes can be partial
+            os.fsync(file_descriptor)
+        finally:
+            os.close(file_descriptor)
+
+    async def snapshot(self):
+        """
+        Writes every live game to the snapshot file and deletes the files it replaces
+        Parameters: self
+        Returns: None
+        """
+        await self.flush()
+        state = {
+            "generation": self.generation,
+            "games": {game_id: {"meta": game["meta"], "moves": "".join(str(column) for column in game["moves"]), "turn_started": game["turn_started"]} for game_id, game in self.games.items()},
+        }
+        self.generation += 1  # Moves made from now on are only in segments newer than the snapshot
+        await asyncio.to_thread(self.write_snapshot, state)
+
+    def write_snapshot(self, state):
+        """
+        Atomically replaces the snapshot file and deletes the segments it covers, runs in a worker thread
+        Parameters: self, state of type dict
+        Returns: None
+        """
+        write_file(self.path(SNAPSHOT_FILE), json.dumps(state).encode())
+        for name in os.listdir(self.directory):
+            parts = name.split(".")
+            if parts[0] == "segment" and parts[-1] == "log" and int(parts[1]) <= state["generation"]:
+                os.remove(self.path(name))
+
+    async def close(self):
+        """
+        Stops the writer task and writes anything still pending
+        Parameters: self
+        Returns: None
+        """
+        if self.writer is not None:
+            self.writer.cancel()
+            self.writer = None
+        await self.flush()
+
+def write_file(path, data):
+    """
+    Writes a whole file so it's either fully replaced or left untouched by a crash
+    Parameters: path of type str, data of type bytes
+    Returns: None
+    """
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
@@ -0,0 +1,142 @@
+import asyncio
+import time
+import discord
+from utils.metrics import render_delay
+
+class Rate_Limit_Bucket:
+    """
+    Class contains a token bucket matching Discord's per-channel limit on message edits
+    Attributes:
+        capacity: Most edits allowed in one burst
+        period: Seconds it takes an empty bucket to refill
+        tokens: Edits currently allowed
+        updated: Loop time the tokens were last refilled at
+    """
+    def __init__(self, capacity, period):
+        """
+        Initializes a full bucket
+        Parameters: self, capacity of type int, period in seconds of type float
+        Returns: None
+        """
+        self.capacity = capacity
+        self.period = period
+        self.tokens = capacity
+        self.updated = asyncio.get_running_loop().time()
+
+    def refill(self):
+        """
+        Adds the tokens earned since the last refill
+        Parameters: self
+        Returns: None
+        """
+        now = asyncio.get_running_loop().time()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / self.period)
+        self.updated = now
+
+    async def acquire(self):
+        """
+        Waits until an edit is allowed and uses it up
+        Parameters: self
+        Returns: None
+        """
+        self.refill()
+        while self.tokens < 1:
+            await asyncio.sleep((1 - self.tokens) * self.period / self.capacity)
+            self.refill()
+        self.tokens -= 1
+
+    def time_until_full(self):
+        """
+        Gets how long until the bucket is full again
+        Parameters: self
+        Returns: seconds of type float
+        """
+        self.refill()
+        return (self.capacity - self.tokens) * self.period / self.capacity
+
+class Render_Queue:
+    """
+    Class contains a queue of embed edits that keeps only the newest embed for each message
+    One writer task per channel sends the edits, so bursts of moves collapse into a single edit
+    Attributes:
+        capacity: Edits allowed per channel in one burst
+        period: Seconds for a channel's edit allowance to refill
+        pending: Dict with channel IDs as keys, values contain a dict of message ID to (message, edit keyword arguments, time the oldest unsent change was submitted)
+        writers: Dict with channel IDs as keys, values contain the channel's writer task
+        wakeups: Dict with channel IDs as keys, values contain the event that wakes an idle writer
+    """
+    def __init__(self, capacity = 5, period = 5.0):
+        """
+        Initializes an empty queue
+        Parameters: self, capacity of type int, period in seconds of type float
+        Returns: None
+        """
+        self.capacity = capacity
+        self.period = period
+        self.pending = {}
+        self.writers = {}
+        self.wakeups = {}
+
+    def submit(self, message, embed, **changes):
+        """
+        Queues the newest embed for a message, replacing any embed still waiting to be sent
+        Parameters: self, message to edit, embed of type discord.Embed, other changes to the message such as view
+        Returns: None
+        """
+        channel_id = message.channel.id
+        pending = self.pending.setdefault(channel_id, {})
+        queued = pending.get(message.id)
+        submitted = queued[2] if queued else time.perf_counter()  # The delay counts from the first change the edit shows
+        edit = dict(queued[1]) if queued else {}  # Keep earlier changes like a removed view
+        edit.update(changes, embed = embed)
+        pending[message.id] = (message, edit, submitted)  # Replacing a key keeps its place in line
+        if channel_id in self.writers:
+            self.wakeups[channel_id].set()
+        else:
+            self.wakeups[channel_id] = asyncio.Event()
+            self.writers[channel_id] = asyncio.create_task(self.write_channel(channel_id))
+
+    async def write_channel(self, channel_id):
+        """
+        Sends the queued edits of one channel within its rate limit
+        Parameters: self, channel_id of type int
+        Returns: None
+        """
+        pending = self.pending[channel_id]
+        wakeup = self.wakeups[channel_id]
+        bucket = Rate_Limit_Bucket(self.capacity, self.period)
+        try:
+            while True:
+                while pending:
+                    await bucket.acquire()
+                    message_id = next(iter(pending))
+                    message, edit, submitted = pending.pop(message_id)
+                    try:
+                        await message.edit(**edit)
+                        render_delay.observe(time.perf_counter() - submitted)
+                    except discord.RateLimited as error:
+                        queued = pending.get(message_id)
+                        pending[message_id] = (message, dict(edit, **queued[1]) if queued else edit, submitted)  # Retry with the newest changes
+                        await asyncio.sleep(error.retry_after)
+                    except discord.HTTPException as error:
+                        print(f"Failed to edit message {message_id}: {error}")
+                # Stay around until the bucket refills so a new burst can't go over the limit
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), bucket.time_until_full())
+                except asyncio.TimeoutError:
+                    if not pending:
+                        break
+        finally:
+            self.writers.pop(channel_id, None)
+            self.wakeups.pop(channel_id, None)
+            self.pending.pop(channel_id, None)
+
+    async def drain(self):
+        """
+        Waits for every queued edit to be sent
+        Parameters: self
+        Returns: None
+        """
+        while self.writers:
+            await asyncio.gather(*self.writers.values(), return_exceptions = True)
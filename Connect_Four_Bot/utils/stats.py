@@ -0,0 +1,202 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+OUTCOMES = ("win", "loss", "tie", "timeout")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    red_id INTEGER NOT NULL,
+    yellow_id INTEGER NOT NULL,
+    red_outcome TEXT NOT NULL,
+    yellow_outcome TEXT NOT NULL,
+    moves INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    ai_level TEXT,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_by_red ON games (red_id, finished_at);
+CREATE INDEX IF NOT EXISTS games_by_yellow ON games (yellow_id, finished_at);
+CREATE TABLE IF NOT EXISTS players (
+    player_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    games INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    ties INTEGER NOT NULL DEFAULT 0,
+    timeouts INTEGER NOT NULL DEFAULT 0,
+    moves INTEGER NOT NULL DEFAULT 0,
+    duration REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS players_by_wins ON players (wins DESC, games);
+"""
+
+# Adds one game to a player's totals, the outcome columns get 1 for the player's outcome and 0 otherwise
+UPDATE_PLAYER = """
+INSERT INTO players (player_id, name, games, wins, losses, ties, timeouts, moves, duration) VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (player_id) DO UPDATE SET
+    name = excluded.name,
+    games = games + 1,
+    wins = wins + excluded.wins,
+    losses = losses + excluded.losses,
+    ties = ties + excluded.ties,
+    timeouts = timeouts + excluded.timeouts,
+    moves = moves + excluded.moves,
+    duration = duration + excluded.duration
+"""
+
+class Stats_Store:
+    """
+    Class contains every player's game record in a SQLite database
+    Results are queued when games end and committed in one transaction every flush_interval seconds by a
+    worker thread, so the event loop never waits on the disk. Each player's totals are kept up to date in
+    their own table with an index on wins, so records and the leaderboard are single indexed lookups.
+    Query results are cached until the next batch is committed or cache_time seconds pass
+    Attributes:
+        path: Path of the database file
+        flush_interval: Seconds between batched writes
+        cache_time: Seconds a query result is reused for
+        pending: List of finished games not written yet
+        cache: Dict with queries as keys, values contain (time the result was read, result)
+        connection: SQLite connection shared by the worker threads
+        lock: Lock letting one worker thread use the connection at a time
+        writer: Task writing batches, None until started
+    """
+    def __init__(self, path = "stats.db", flush_interval = 2, cache_time = 30):
+        """
+        Opens the database in write-ahead log mode and creates its tables
+        Parameters: self, path of type str, flush_interval in seconds of type float, cache_time in seconds of type float
+        Returns: None
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.cache_time = cache_time
+        self.pending = []
+        self.cache = {}
+        self.connection = sqlite3.connect(path, check_same_thread = False)
+        self.connection.execute("PRAGMA journal_mode = WAL")  # Reads don't wait for a batch being written
+        self.connection.execute("PRAGMA synchronous = NORMAL")  # WAL stays consistent after a crash without an fsync per commit
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.writer = None
+
+    def start(self):
+        """
+        Starts the task writing batches
+        Parameters: self
+        Returns: None
+        """
+        if self.writer is None:
+            self.writer = asyncio.create_task(self.run())
+
+    def record_game(self, game_id, players, moves, duration, ai_level = None):
+        """
+        Queues a finished game to be written with the next batch
+        Parameters: self, unique game_id of type UUID or str, players of type dict with "red" and "yellow" keys, values contain (name, ID, outcome), number of moves of type int, duration in seconds of type float, difficulty of the computer player of type str or None
+        Returns: None
+        """
+        self.pending.append((str(game_id), players["red"], players["yellow"], moves, duration, ai_level, time.time()))
+
+    async def run(self):
+        """
+        Writes a batch every flush_interval seconds
+        Parameters: self
+        Returns: None
+        """
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except sqlite3.Error as error:
+                print(f"Could not write game results: {error!r}")
+
+    async def flush(self):
+        """
+        Writes every pending game in one transaction off the event loop
+        Parameters: self
+        Returns: None
+        """
+        if not self.pending:
+            return
+        batch = self.pending
+        self.pending = []  # Games ending while this batch is written go in the next one
+        await asyncio.to_thread(self.write_batch, batch)
+        self.cache.clear()
+
+    def write_batch(self, batch):
+        """
+        Inserts a batch of games and adds them to the players' totals, runs in a worker thread
+        Parameters: self, batch of type list of queued games
+        Returns: None
+        """
+        with self.lock, self.connection:  # One transaction for the whole batch
+            for game_id, red, yellow, moves, duration, ai_level, finished_at in batch:
+                self.connection.execute("INSERT OR IGNORE INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (game_id, red[1], yellow[1], red[2], yellow[2], moves, duration, ai_level, finished_at))
+                for name, player_id, outcome in (red, yellow) if ai_level is None else (red,):  # The computer player gets no record
+                    counts = [int(outcome == kind) for kind in OUTCOMES]
+                    self.connection.execute(UPDATE_PLAYER, (player_id, name, *counts, moves, duration))
+
+    async def query(self, key, function, *args):
+        """
+        Runs a read query in a worker thread unless a recent enough result is cached
+        Parameters: self, key of the query of type tuple, function running the query, arguments of the function
+        Returns: Result of the function
+        """
+        cached = self.cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.cache_time:
+            return cached[1]
+        result = await asyncio.to_thread(function, *args)
+        self.cache[key] = time.monotonic(), result
+        return result
+
+    async def player_record(self, player_id):
+        """
+        Gets a player's totals and their place on the leaderboard
+        Parameters: self, player_id of type int
+        Returns: Dict with the player's name, games, wins, losses, ties, timeouts, moves, duration and rank, None if they haven't finished a game
+        """
+        return await self.query(("record", player_id), self.read_record, player_id)
+
+    def read_record(self, player_id):
+        """
+        Reads a player's totals, runs in a worker thread
+        Parameters: self, player_id of type int
+        Returns: Dict of the player's totals, None if they haven't finished a game
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT name, games, wins, losses, ties, timeouts, moves, duration FROM players WHERE player_id = ?", (player_id,)).fetchone()
+            if row is None:
+                return None
+            rank = self.connection.execute("SELECT COUNT(*) FROM players WHERE wins > ?", (row[2],)).fetchone()[0] + 1
+        return dict(zip(("name", "games", "wins", "losses", "ties", "timeouts", "moves", "duration"), row), rank = rank)
+
+    async def leaderboard(self, limit = 10):
+        """
+        Gets the players with the most wins, fewer games played breaks ties
+        Parameters: self, limit of type int
+        Returns: List of (name, games, wins, losses, ties) tuples
+        """
+        return await self.query(("leaderboard", limit), self.read_leaderboard, limit)
+
+    def read_leaderboard(self, limit):
+        """
+        Reads the top of the leaderboard from the wins index, runs in a worker thread
+        Parameters: self, limit of type int
+        Returns: List of (name, games, wins, losses, ties) tuples
+        """
+        with self.lock:
+            return self.connection.execute("SELECT name, games, wins, losses, ties FROM players ORDER BY wins DESC, games LIMIT ?", (limit,)).fetchall()
+
+    async def close(self):
+        """
+        Stops the writer task, writes anything still pending and closes the database
+        Parameters: self
+        Returns: None
+        """
+        if self.writer is not None:
+            self.writer.cancel()
+            self.writer = None
+        await self.flush()
+        self.connection.close()
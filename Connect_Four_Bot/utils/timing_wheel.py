@@ -0,0 +1,213 @@
+import asyncio
+import math
+
+class Timer:
+    """
+    Class contains one deadline scheduled on a timing wheel
+    Attributes:
+        expires: Tick the timer fires at
+        callback: Function or coroutine function called when the timer fires
+        args: Arguments passed to the callback
+        slot: Set of the wheel slot holding the timer, None once it has fired or been cancelled
+    """
+    __slots__ = ("expires", "callback", "args", "slot")
+
+    def __init__(self, expires, callback, args):
+        """
+        Initializes a timer that isn't in a slot yet
+        Parameters: self, expires of type int, callback, args of type tuple
+        Returns: None
+        """
+        self.expires = expires
+        self.callback = callback
+        self.args = args
+        self.slot = None
+
+class Timing_Wheel:
+    """
+    Class contains a hierarchical timing wheel driven by a single ticker task
+    Each level has wheel_size slots, a slot on level n covers wheel_size ** n ticks. Timers move down a level
+    when the lower wheel comes around to their slot, so scheduling and cancelling never search for a timer
+    Attributes:
+        tick: Seconds per tick
+        wheel_size: Slots per level
+        wheels: List of levels, each a list of slots holding sets of timers
+        current_tick: Last tick that has been processed
+        origin: Loop time of tick 0
+        count: Number of timers waiting to fire
+        ticker: Task advancing the wheel, None while no timers are waiting
+    """
+    def __init__(self, tick = 0.5, wheel_size = 64, levels = 3):
+        """
+        Initializes an empty wheel
+        Parameters: self, tick in seconds of type float, slots per level of type int, number of levels of type int
+        Returns: None
+        """
+        self.tick = tick
+        self.wheel_size = wheel_size
+        self.wheels = [[set() for _ in range(wheel_size)] for _ in range(levels)]
+        self.current_tick = 0
+        self.origin = None
+        self.count = 0
+        self.ticker = None
+
+    def wall_tick(self):
+        """
+        Gets the tick matching the current loop time
+        Parameters: self
+        Returns: tick of type int
+        """
+        return int((asyncio.get_running_loop().time() - self.origin) / self.tick)
+
+    def schedule(self, delay, callback, *args):
+        """
+        Calls a function or coroutine function after a delay
+        Parameters: self, delay in seconds of type float, callback, arguments of the callback
+        Returns: Timer that can be cancelled or rescheduled
+        """
+        if self.ticker is None:
+            self.start()
+        timer = Timer(0, callback, args)
+        self.set_deadline(timer, delay)
+        return timer
+
+    def reschedule(self, timer, delay, *args):
+        """
+        Moves a timer to a new deadline, replacing its callback arguments if any are given
+        Parameters: self, timer of type Timer, delay in seconds of type float, arguments of the callback
+        Returns: The same timer
+        """
+        self.cancel(timer)
+        if args:
+            timer.args = args
+        if self.ticker is None:
+            self.start()
+        self.set_deadline(timer, delay)
+        return timer
+
+    def cancel(self, timer):
+        """
+        Stops a timer from firing, does nothing if it already fired or was cancelled
+        Parameters: self, timer of type Timer
+        Returns: None
+        """
+        if timer.slot is not None:
+            timer.slot.discard(timer)
+            timer.slot = None
+            self.count -= 1
+
+    def set_deadline(self, timer, delay):
+        """
+        Places a timer so it fires at least delay seconds from now
+        Parameters: self, timer of type Timer, delay in seconds of type float
+        Returns: None
+        """
+        target = asyncio.get_running_loop().time() - self.origin + delay
+        timer.expires = max(self.current_tick + 1, math.ceil(target / self.tick))
+        self.insert(timer)
+        self.count += 1
+
+    def insert(self, timer):
+        """
+        Puts a timer in the slot of the lowest level that reaches its deadline
+        Parameters: self, timer of type Timer
+        Returns: None
+        """
+        remaining = timer.expires - self.current_tick
+        span = 1
+        for level, wheel in enumerate(self.wheels):
+            if remaining < span * self.wheel_size or level == len(self.wheels) - 1:
+                # Deadlines past the top level wait in its furthest slot and get placed again when it comes around
+                expires = min(timer.expires, self.current_tick + span * (self.wheel_size - 1))
+                slot = wheel[(expires // span) % self.wheel_size]
+                break
+            span *= self.wheel_size
+        slot.add(timer)
+        timer.slot = slot
+
+    def advance(self):
+        """
+        Processes the next tick, moving timers down from higher levels and collecting the ones that fire
+        Parameters: self
+        Returns: List of timers that fired
+        """
+        self.current_tick += 1
+        # Cascade from the top level down so timers can fall more than one level in one tick
+        span = self.wheel_size ** (len(self.wheels) - 1)
+        for level in range(len(self.wheels) - 1, 0, -1):
+            if self.current_tick % span == 0:
+                index = (self.current_tick // span) % self.wheel_size
+                timers = self.wheels[level][index]
+                self.wheels[level][index] = set()
+                for timer in timers:
+                    self.insert(timer)
+            span //= self.wheel_size
+
+        index = self.current_tick % self.wheel_size
+        fired = [timer for timer in self.wheels[0][index] if timer.expires <= self.current_tick]
+        for timer in fired:
+            self.wheels[0][index].discard(timer)
+            timer.slot = None
+        self.count -= len(fired)
+        return fired
+
+    def start(self):
+        """
+        Starts the ticker task, skipping ahead over the ticks that passed while it was idle
+        Parameters: self
+        Returns: None
+        """
+        if self.origin is None:
+            self.origin = asyncio.get_running_loop().time()
+        self.current_tick = self.wall_tick()
+        self.ticker = asyncio.create_task(self.run())
+
+    async def run(self):
+        """
+        Advances the wheel once per tick until no timers are left, catching up on ticks missed while the loop was busy
+        Parameters: self
+        Returns: None
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            while self.count:
+                next_tick = self.origin + (self.current_tick + 1) * self.tick
+                await asyncio.sleep(max(0, next_tick - loop.time()))
+                fired = []
+                while self.current_tick < self.wall_tick():
+                    fired.extend(self.advance())
+                if fired:
+                    self.fire(fired)
+        finally:
+            self.ticker = None
+
+    def fire(self, timers):
+        """
+        Calls the callbacks of every timer that fired in one batch
+        Parameters: self, list of timers
+        Returns: None
+        """
+        coroutines = []
+        for timer in timers:
+            try:
+                result = timer.callback(*timer.args)
+            except Exception as error:
+                print(f"Timer callback {timer.callback.__qualname__} failed: {error!r}")
+                continue
+            if asyncio.iscoroutine(result):
+                coroutines.append(result)
+        if coroutines:
+            asyncio.create_task(self.run_batch(coroutines))  # One task for the whole batch instead of one per timer
+
+    async def run_batch(self, coroutines):
+        """
+        Runs the coroutines of a batch of fired timers and reports failures
+        Parameters: self, list of coroutines
+        Returns: None
+        """
+        results = await asyncio.gather(*coroutines, return_exceptions = True)
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Timer callback failed: {result!r}")
+
+timing_wheel = Timing_Wheel()  # Single wheel shared by every game and invite
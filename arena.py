@@ -0,0 +1,341 @@
+"""
+Plays round robin tournaments between engine configurations and rates them with Elo
+
+Every pair of players meets the same number of times. Each opening, a few random moves from the empty
+board, is played twice with the colors swapped so neither player gets the better side of it. Games run
+in parallel on every core and each result is written to a JSONL or CSV file as soon as it finishes, so
+a long tournament can be followed with tail -f and nothing is lost if it's stopped.
+
+Players are written as kind:option=value,option=value:
+    negamax:depth=6            negamax search to a fixed depth
+    negamax:depth=42,time=0.5  negamax search with a time limit per move
+    mcts:time=0.5              Monte Carlo tree search with a time limit per move (needs NumPy)
+    greedy                     wins, blocks and avoids handing over wins, otherwise prefers the center
+    random                     random legal moves
+    medium                     any difficulty level the bot offers
+
+    python arena.py negamax:depth=2 negamax:depth=4 mcts:time=0.2 --games 20 --output results.jsonl
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Connect_Four_Bot"))  # The bot imports its modules from its own folder
+
+from engine.bitboard import Position, NUM_COLS, NUM_CELLS, COL_HEIGHT
+from engine.search import Negamax_Engine, DIFFICULTIES, winning_cells
+
+FIELDS = ["red", "yellow", "result", "moves", "red_ms_per_move", "yellow_ms_per_move", "opening"]
+CENTER_WEIGHTS = [1, 2, 3, 4, 3, 2, 1]  # Preference for central columns used by the greedy player
+
+def parse_player(spec):
+    """
+    Reads a player written on the command line
+    Parameters: spec of type str like "negamax:depth=6,time=0.5" or a difficulty name
+    Returns: Dict with the player's name, kind and options
+    """
+    if spec in DIFFICULTIES:
+        limits = DIFFICULTIES[spec]
+        if limits.get("engine") == "mcts":
+            return {"name": spec, "kind": "mcts", "time": limits["time_limit"]}
+        return {"name": spec, "kind": "negamax", "depth": limits["depth"], "time": limits["time_limit"]}
+    kind, _, options = spec.partition(":")
+    if kind not in PLAYERS:
+        raise argparse.ArgumentTypeError(f"unknown player {spec!r}, choose from {', '.join(dict.fromkeys(list(PLAYERS) + list(DIFFICULTIES)))}")
+    player = {"name": spec, "kind": kind}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        player[key] = float(value) if "." in value else int(value)
+    return player
+
+def negamax_player(options, rng):
+    """
+    Creates a player that searches with the negamax engine
+    Parameters: options dict with depth and time, rng of type random.Random
+    Returns: Function from a Position to a column
+    """
+    engine = Negamax_Engine()
+    depth = int(options.get("depth", NUM_CELLS))
+    time_limit = options.get("time")
+    return lambda position: engine.best_move(position, depth, time_limit)[0]
+
+def mcts_player(options, rng):
+    """
+    Creates a player that searches with Monte Carlo tree search
+    Parameters: options dict with time, rng of type random.Random
+    Returns: Function from a Position to a column
+    """
+    from engine.mcts import Mcts_Engine  # Needs NumPy, which the other players don't
+    engine = Mcts_Engine(seed = rng.randrange(2 ** 32))
+    time_limit = options.get("time", 1.0)
+    return lambda position: engine.best_move(position, time_limit)[0]
+
+def greedy_player(options, rng):
+    """
+    Creates a player that wins when it can, blocks when it must and otherwise avoids moves that hand over a win
+    Parameters: options dict (unused), rng of type random.Random
+    Returns: Function from a Position to a column
+    """
+    def play(position):
+        current, opponent = (position.red, position.yellow) if position.red_turn else (position.yellow, position.red)
+        mask = position.mask
+        playable = [column for column in range(NUM_COLS) if position.can_play(column)]
+        moves = {column: 1 << (column * COL_HEIGHT + position.heights[column]) for column in playable}
+        own_wins = winning_cells(current, mask)
+        opponent_wins = winning_cells(opponent, mask)
+        for column in playable:
+            if moves[column] & own_wins:
+                return column
+        for column in playable:
+            if moves[column] & opponent_wins:
+                return column  # Block
+        safe = [column for column in playable if not (moves[column] << 1) & opponent_wins]  # The cell above isn't given away
+        return max(safe or playable, key = lambda column: CENTER_WEIGHTS[column] + rng.random())
+    return play
+
+def random_player(options, rng):
+    """
+    Creates a player that picks random legal moves
+    Parameters: options dict (unused), rng of type random.Random
+    Returns: Function from a Position to a column
+    """
+    return lambda position: rng.choice([column for column in range(NUM_COLS) if position.can_play(column)])
+
+PLAYERS = {
+    "negamax": negamax_player,
+    "mcts": mcts_player,
+    "greedy": greedy_player,
+    "random": random_player,
+}
+
+def make_player(player, rng):
+    """
+    Creates the move function of a player from its parsed options
+    Parameters: player dict from parse_player, rng of type random.Random
+    Returns: Function from a Position to a column
+    """
+    return PLAYERS[player["kind"]](player, rng)
+
+def random_opening(plies, rng):
+    """
+    Plays random moves from the empty board that don't end the game
+    Parameters: plies of type int, rng of type random.Random
+    Returns: Moves of the opening of type bytes
+    """
+    position = Position()
+    while len(position.moves) < plies:
+        playable = [column for column in range(NUM_COLS) if position.can_play(column) and not position.is_winning_move(column)]
+        position.play(rng.choice(playable))
+    return position.serialize()
+
+def play_game(red, yellow, opening, seed):
+    """
+    Plays one game between two players inside a worker process, every game gets new engines so results don't depend on which games a worker ran before
+    Parameters: red and yellow player dicts from parse_player, opening moves of type bytes, seed of type int
+    Returns: Dict with the players, the result for red (1 for a win, 0.5 for a tie, 0 for a loss), the number of moves, each player's milliseconds per move and the opening
+    """
+    rng = random.Random(seed)
+    players = [make_player(red, rng), make_player(yellow, rng)]
+    thinking = [0.0, 0.0]
+    moves = [0, 0]
+    position = Position.from_moves(opening)
+    result = 0.5
+    while len(position.moves) < NUM_CELLS:
+        side = len(position.moves) % 2
+        start = time.perf_counter()
+        column = players[side](position)
+        thinking[side] += time.perf_counter() - start
+        moves[side] += 1
+        won = position.is_winning_move(column)
+        position.play(column)
+        if won:
+            result = 1.0 if side == 0 else 0.0
+            break
+    return {
+        "red": red["name"],
+        "yellow": yellow["name"],
+        "result": result,
+        "moves": len(position.moves),
+        "red_ms_per_move": round(1000 * thinking[0] / max(moves[0], 1), 3),
+        "yellow_ms_per_move": round(1000 * thinking[1] / max(moves[1], 1), 3),
+        "opening": "".join(str(column) for column in opening),
+    }
+
+def schedule(players, games, opening_plies, rng):
+    """
+    Lists the games of a round robin, each opening is played twice with the colors swapped
+    Parameters: players of type list of player dicts, games per pairing of type int, opening_plies of type int, rng of type random.Random
+    Returns: List of (red, yellow, opening, seed) tuples
+    """
+    jobs = []
+    for first in range(len(players)):
+        for second in range(first + 1, len(players)):
+            for game in range(games):
+                if game % 2 == 0:
+                    opening = random_opening(opening_plies, rng)
+                    red, yellow = players[first], players[second]
+                else:
+                    red, yellow = players[second], players[first]
+                jobs.append((red, yellow, opening, rng.randrange(2 ** 32)))
+    return jobs
+
+class Result_Sink:
+    """
+    Class contains the file game results are written to as they finish
+    Attributes:
+        file: Open output file, None if results aren't saved
+        writer: csv.DictWriter for CSV output, None for JSONL
+    """
+    def __init__(self, path, file_format = None):
+        """
+        Opens the output file, the format comes from the file extension unless it's given
+        Parameters: self, path of type str or None, file_format of type str ("csv" or "jsonl") or None
+        Returns: None
+        """
+        self.file = None
+        self.writer = None
+        if path is None:
+            return
+        file_format = file_format or ("csv" if path.lower().endswith(".csv") else "jsonl")
+        self.file = open(path, "w", newline = "")
+        if file_format == "csv":
+            self.writer = csv.DictWriter(self.file, fieldnames = FIELDS)
+            self.writer.writeheader()
+
+    def write(self, record):
+        """
+        Writes one game and flushes it so the file can be followed while the tournament runs
+        Parameters: self, record dict from play_game
+        Returns: None
+        """
+        if self.file is None:
+            return
+        if self.writer is not None:
+            self.writer.writerow(record)
+        else:
+            self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        """
+        Closes the output file
+        Parameters: self
+        Returns: None
+        """
+        if self.file is not None:
+            self.file.close()
+
+def fit_ratings(names, records, iterations = 500):
+    """
+    Fits Bradley-Terry strengths with the minorization-maximization algorithm and converts them to Elo
+    A tie counts as half a win for each player. Every player also gets one virtual tie against a player
+    rated 0, so a player who won or lost every game still has a finite rating
+    Parameters: names of type list of str, records of type list of dicts from play_game, iterations of type int
+    Returns: Dict with player names as keys, values contain Elo ratings averaging 0
+    """
+    index = {name: number for number, name in enumerate(names)}
+    count = len(names)
+    scores = [0.5] * count  # Virtual tie
+    pairings = [[0] * count for _ in range(count)]
+    for record in records:
+        red, yellow = index[record["red"]], index[record["yellow"]]
+        scores[red] += record["result"]
+        scores[yellow] += 1 - record["result"]
+        pairings[red][yellow] += 1
+        pairings[yellow][red] += 1
+
+    strengths = [1.0] * count
+    for _ in range(iterations):
+        updated = []
+        for player in range(count):
+            games = 1 / (strengths[player] + 1)  # Virtual opponent with strength 1
+            games += sum(pairings[player][other] / (strengths[player] + strengths[other]) for other in range(count) if pairings[player][other])
+            updated.append(scores[player] / games)
+        done = max(abs(new - old) for new, old in zip(updated, strengths)) < 1e-9
+        strengths = updated
+        if done:
+            break
+    mean = sum(math.log10(strength) for strength in strengths) / count
+    return {name: 400 * (math.log10(strengths[index[name]]) - mean) for name in names}
+
+def confidence_intervals(names, records, resamples, rng):
+    """
+    Estimates 95% confidence intervals of the ratings by refitting them on games drawn with replacement
+    Parameters: names of type list of str, records of type list of dicts from play_game, resamples of type int, rng of type random.Random
+    Returns: Dict with player names as keys, values contain (low, high) Elo
+    """
+    samples = {name: [] for name in names}
+    for _ in range(resamples):
+        ratings = fit_ratings(names, rng.choices(records, k = len(records)))
+        for name in names:
+            samples[name].append(ratings[name])
+    intervals = {}
+    for name, ratings in samples.items():
+        ratings.sort()
+        intervals[name] = ratings[int(0.025 * (resamples - 1))], ratings[int(0.975 * (resamples - 1))]
+    return intervals
+
+def print_report(names, records, resamples, rng):
+    """
+    Prints every player's score, Elo with its confidence interval and average thinking time
+    Parameters: names of type list of str, records of type list of dicts from play_game, resamples of type int, rng of type random.Random
+    Returns: None
+    """
+    ratings = fit_ratings(names, records)
+    intervals = confidence_intervals(names, records, resamples, rng) if resamples else None
+    width = max(len(name) for name in names + ["player"])
+    print(f"\n{'player':<{width}}  games   score      elo         95% ci   ms/move")
+    for name in sorted(names, key = ratings.get, reverse = True):
+        games = [record for record in records if name in (record["red"], record["yellow"])]
+        score = sum(record["result"] if record["red"] == name else 1 - record["result"] for record in games)
+        thinking = [record["red_ms_per_move"] if record["red"] == name else record["yellow_ms_per_move"] for record in games]
+        interval = f"[{intervals[name][0]:+.0f}, {intervals[name][1]:+.0f}]" if intervals else ""
+        print(f"{name:<{width}}  {len(games):>5}  {100 * score / max(len(games), 1):5.1f}%  {ratings[name]:+7.0f}  {interval:>14}  {sum(thinking) / max(len(thinking), 1):8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description = "Play round robin tournaments between engine configurations and rate them with Elo")
+    parser.add_argument("players", nargs = "+", type = parse_player, help = "players like negamax:depth=6, mcts:time=0.5, greedy, random or a difficulty level")
+    parser.add_argument("--games", type = int, default = 10, help = "games per pairing, each opening is played with both colors")
+    parser.add_argument("--opening-plies", type = int, default = 2, help = "random moves played before the players take over")
+    parser.add_argument("--output", default = None, help = "file each game's result is written to as it finishes")
+    parser.add_argument("--format", choices = ("jsonl", "csv"), default = None, help = "output format, defaults to the output file's extension")
+    parser.add_argument("--workers", type = int, default = None, help = "worker processes, defaults to the CPU count")
+    parser.add_argument("--bootstrap", type = int, default = 200, help = "resamples used for the confidence intervals, 0 to skip them")
+    parser.add_argument("--seed", type = int, default = None, help = "random seed")
+    args = parser.parse_args()
+
+    names = [player["name"] for player in args.players]
+    if len(set(names)) != len(names) or len(names) < 2:
+        parser.error("give at least two different players")
+    rng = random.Random(args.seed)
+    jobs = schedule(args.players, args.games, args.opening_plies, rng)
+    print(f"Playing {len(jobs)} games between {len(names)} players")
+
+    sink = Result_Sink(args.output, args.format)
+    records = []
+    start = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers = args.workers)
+    try:
+        futures = [executor.submit(play_game, *job) for job in jobs]
+        for future in as_completed(futures):
+            record = future.result()
+            records.append(record)
+            sink.write(record)
+            print(f"\r{len(records)}/{len(jobs)} games", end = "", flush = True)
+    except KeyboardInterrupt:
+        print("\nStopped, rating the games that finished")
+    finally:
+        executor.shutdown(wait = False, cancel_futures = True)
+        sink.close()
+    print(f"\n{len(records)} games in {time.perf_counter() - start:.1f}s")
+    if records:
+        print_report(names, records, args.bootstrap, rng)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Benchmarks the game rule functions that run on every move
+
+Times connect4.py's list board functions, the Game methods from the bot's game cog and the bitboard engine
+on fixed position corpora, then writes ops/sec and peak bytes allocated per call to a JSON file.
+Pass --compare with an earlier results file to see the change between commits.
+
+    python benchmark.py --output benchmark_results.json --compare old_results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Connect_Four_Bot"))  # The bot imports its modules from its own folder
+
+import connect4
+from engine.bitboard import Position, NUM_ROWS, NUM_COLS, COL_HEIGHT, is_win
+from engine.search import winning_cells
+
+try:
+    from cogs.game_functionality import Game
+except ImportError:
+    Game = None  # discord.py isn't installed
+
+try:
+    import numpy as np
+    from engine.batch import is_win as batch_is_win
+except ImportError:
+    np = None
+
+LINES = [(0, 1), (1, 0), (1, 1), (1, -1)]  # (row step, column step) of horizontal, vertical and both diagonal lines
+
+def random_positions(count, min_moves, max_moves, seed):
+    """
+    Plays seeded random games and keeps positions where nobody has won yet
+    Parameters: count of type int, min_moves of type int, max_moves of type int, seed of type int
+    Returns: List of Position
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        position = Position()
+        target = rng.randint(min_moves, max_moves)
+        while len(position.moves) < target:
+            columns = [column for column in range(NUM_COLS) if position.can_play(column) and not position.is_winning_move(column)]
+            if not columns:
+                break
+            position.play(rng.choice(columns))
+        if len(position.moves) == target:
+            positions.append(position)
+    return positions
+
+def winning_positions():
+    """
+    Builds a board for every four in a row on the board, for both colors
+    Parameters: None
+    Returns: List of tuples of (Position, color of type str, row of type int, column of type int)
+    """
+    positions = []
+    for color in ("red", "yellow"):
+        for row in range(NUM_ROWS):
+            for column in range(NUM_COLS):
+                for row_step, column_step in LINES:
+                    cells = [(row + i * row_step, column + i * column_step) for i in range(4)]
+                    if not all(0 <= r < NUM_ROWS and 0 <= c < NUM_COLS for r, c in cells):
+                        continue
+                    position = Position()
+                    bits = 0
+                    for r, c in cells:
+                        bits |= 1 << (c * COL_HEIGHT + NUM_ROWS - 1 - r)
+                    if color == "red":
+                        position.red = bits
+                    else:
+                        position.yellow = bits
+                    positions.append((position, color, row, column))  # The first cell acts as the last piece played
+    return positions
+
+def build_corpora():
+    """
+    Builds the fixed position corpora, each item holds a position, its list board and the last piece played
+    Parameters: None
+    Returns: Dict with corpus names as keys, values contain lists of (Position, list board, color, row, column)
+    """
+    corpora = {"empty": [(Position(), connect4.create_board(), None, None, None)]}
+    for name, low, high, seed in (("mid_game", 16, 24, 1), ("near_full", 36, 41, 2)):
+        items = []
+        for position in random_positions(200, low, high, seed):
+            column = position.moves[-1]
+            row = position.next_row(column) + 1
+            color = "yellow" if position.red_turn else "red"
+            items.append((position, position.to_board(), color, row, column))
+        corpora[name] = items
+    corpora["winning"] = [(position, position.to_board(), color, row, column) for position, color, row, column in winning_positions()]
+    return corpora
+
+def measure(function, calls, min_time):
+    """
+    Times a function over a list of argument tuples and records the average peak memory allocated by one call
+    Parameters: function, calls of type list of tuples, minimum seconds to run of type float
+    Returns: Tuple of (ops per second of type float, peak bytes allocated per call of type float)
+    """
+    if not calls:
+        return None, None
+    # Warm up once so caches filled by the first pass don't count as allocations of every call
+    for args in calls:
+        function(*args)
+    tracemalloc.start()
+    total_peak = 0
+    for args in calls:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        function(*args)
+        total_peak += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    operations = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        for args in calls:
+            function(*args)
+        operations += len(calls)
+        elapsed = time.perf_counter() - start
+    return operations / elapsed, total_peak / len(calls)
+
+def quiet(function):
+    """
+    Wraps a function that prints so its output is discarded during timing
+    Parameters: function
+    Returns: wrapped function
+    """
+    def wrapped(*args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            function(*args)
+    return wrapped
+
+def list_board_cases(items):
+    """
+    Builds the connect4.py cases for one corpus
+    Parameters: items of one corpus
+    Returns: List of (function name, function, calls)
+    """
+    moved = [item for item in items if item[2] is not None]
+    adjacent = [(board, color[0], row, column) for _, board, color, row, column in moved]
+    directions = [(connect4.find_adjacent(board, char, row, column), row, column) for board, char, row, column in adjacent]
+    wins = []
+    for (_, board, color, row, column), (coords, _, _) in zip(moved, directions):
+        for direction in connect4.find_directions(coords, row, column):
+            wins.append((board, color, row, column, direction))
+    return [
+        ("check_below", connect4.check_below, [(column, board) for _, board, _, _, _ in items for column in range(NUM_COLS)]),
+        ("find_adjacent", connect4.find_adjacent, adjacent),
+        ("find_directions", connect4.find_directions, directions),
+        ("check_win", connect4.check_win, wins),
+        ("check_tie", connect4.check_tie, [(board,) for _, board, _, _, _ in items]),
+        ("display_board", quiet(connect4.display_board), [(board,) for _, board, _, _, _ in items]),
+    ]
+
+def game_cases(items):
+    """
+    Builds the cases for the Game methods of the bot for one corpus
+    Parameters: items of one corpus
+    Returns: List of (function name, function, calls)
+    """
+    # Only the board methods are timed, they don't touch the client, channel or manager
+    game = Game(None, {"red": ["Red", 1], "yellow": ["Yellow", 2]}, None, None, None)
+    moved = [item for item in items if item[2] is not None]
+    return [
+        ("check_below", game.check_below, [(position, column) for position, _, _, _, _ in items for column in range(NUM_COLS)]),
+        ("check_win", game.check_win, [(position, color) for position, _, color, _, _ in moved]),
+        ("check_tie", game.check_tie, [(position,) for position, _, _, _, _ in items]),
+        ("display_board (warm cache)", game.display_board, [(position,) for position, _, _, _, _ in items]),
+    ]
+
+def bitboard_cases(items):
+    """
+    Builds the cases for the bitboard engine for one corpus
+    Parameters: items of one corpus
+    Returns: List of (function name, function, calls)
+    """
+    moved = [item for item in items if item[2] is not None]
+    return [
+        ("next_row", Position.next_row, [(position, column) for position, _, _, _, _ in items for column in range(NUM_COLS)]),
+        ("is_win", is_win, [(position.red if color == "red" else position.yellow,) for position, _, color, _, _ in moved]),
+        ("is_full", Position.is_full, [(position,) for position, _, _, _, _ in items]),
+        ("canonical_key", Position.canonical_key, [(position,) for position, _, _, _, _ in items]),
+        ("winning_cells", winning_cells, [(position.red, position.mask) for position, _, _, _, _ in items]),
+        ("to_board", Position.to_board, [(position,) for position, _, _, _, _ in items]),
+    ]
+
+def batch_cases(items):
+    """
+    Builds the case for the NumPy batch win check, one op is one board checked
+    Parameters: items of one corpus
+    Returns: List of (function name, function, calls)
+    """
+    # The pieces of the player who just moved, the same input is_win gets in the engine
+    bits = np.array([position.red if color == "red" else position.yellow for position, _, color, _, _ in items if color is not None] * 64, dtype = np.uint64)
+    if not len(bits):
+        return [], 1  # Nobody has moved in this corpus, e.g. the empty board
+    return [("is_win (per board)", lambda: batch_is_win(bits), [()])], len(bits)
+
+def git_commit():
+    """
+    Gets the commit being benchmarked
+    Parameters: None
+    Returns: commit hash of type str, None outside a git checkout
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output = True, text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(min_time):
+    """
+    Runs every case on every corpus
+    Parameters: minimum seconds per case of type float
+    Returns: List of result dicts
+    """
+    results = []
+    for corpus, items in build_corpora().items():
+        groups = [("connect4.py", list_board_cases(items), 1), ("bitboard", bitboard_cases(items), 1)]
+        if Game is not None:
+            groups.append(("Game", game_cases(items), 1))
+        if np is not None:
+            cases, boards = batch_cases(items)
+            groups.append(("batch", cases, boards))
+        for implementation, cases, scale in groups:
+            for function_name, function, calls in cases:
+                ops, peak = measure(function, calls, min_time)
+                if ops is None:
+                    continue  # Nothing to time on this corpus, e.g. win checks on the empty board
+                results.append({
+                    "implementation": implementation,
+                    "function": function_name,
+                    "corpus": corpus,
+                    "ops_per_sec": round(ops * scale, 1),
+                    "peak_bytes_per_call": round(peak / scale, 1),
+                })
+                print(f"{implementation:12} {function_name:28} {corpus:10} {ops * scale:14,.0f} ops/s {peak / scale:10.1f} B/call")
+    return results
+
+def compare(results, path):
+    """
+    Prints the speed change of each case against an earlier results file
+    Parameters: results of type list of dict, path of type str
+    Returns: None
+    """
+    with open(path) as file:
+        previous = json.load(file)
+    old = {(r["implementation"], r["function"], r["corpus"]): r["ops_per_sec"] for r in previous["results"]}
+    print(f"\nCompared with {previous.get('commit')}:")
+    for result in results:
+        key = (result["implementation"], result["function"], result["corpus"])
+        if key in old and old[key]:
+            change = result["ops_per_sec"] / old[key] - 1
+            print(f"{key[0]:12} {key[1]:28} {key[2]:10} {change:+8.1%}")
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark the game rule hot paths")
+    parser.add_argument("--output", default = "benchmark_results.json", help = "JSON file to write results to")
+    parser.add_argument("--compare", default = None, help = "earlier results file to compare against")
+    parser.add_argument("--min-time", type = float, default = 0.2, help = "seconds to run each case")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.min_time)
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent = 2)
+    print(f"Wrote {len(results)} results to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
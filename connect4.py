@@ -1,3 +1,5 @@
+from Connect_Four_Bot.engine.bitboard import Position
+
 border = '🟦'
 empty = '⚪'
 red = '🔴'
@@ -17,24 +19,14 @@ def create_board() -> list:
 
 def display_board(board): 
     # Display emojis depending on the character of {board} plus a surrounding border
+    # The board is built in one buffer and printed at once instead of one print per cell
     margin = 1
-    print(border*(len(board[0]) + margin*2))
-    
-    for i in range(len(board)):
-        print(border,end='')
-        for j in range(len(board[0])):
-            if board[i][j] == '*':
-                print(f'{empty}', end='')
-            elif board[i][j] == 'r':
-                print(f'{red}',end='')
-            else:
-                print(f'{yellow}',end='') 
-        print(border)
-
-    print(border,end='')
-    for i in range (len(board[0])):
-        print(f' {i}',end='')
-    print(border)
+    symbols = {'*': empty, 'r': red}
+    lines = [border*(len(board[0]) + margin*2)]
+    for row in board:
+        lines.append(border + ''.join(symbols.get(cell, yellow) for cell in row) + border)
+    lines.append(border + ''.join(f' {i}' for i in range(len(board[0]))) + border)
+    print('\n'.join(lines))
 
 def get_column():
     # Gets user input
@@ -187,8 +179,9 @@ def check_tie(board):
 
 def main():
     print('WELCOME TO CONNECT 4')
-    board = create_board()
-    display_board(board)
+    # The game itself runs on a bitboard, the list board is only built for display
+    board = Position()
+    display_board(board.to_board())
     tie = False
     win = False
     forfeit = False
@@ -200,26 +193,20 @@ def main():
             forfeit = True
             break
 
-        row = check_below(column,board)
+        row = board.next_row(column)
         while row == -1:
             print('Column full.')
             column = get_column()
-            row = check_below(column,board)
+            row = board.next_row(column)
 
-        place_piece(board,'red',row,column)
-        display_board(board)
-        coords = find_adjacent(board,'r',row,column)
-        directions = find_directions(coords,row,column)
-        print(directions)
-        for direction in directions.keys():
-            win = check_win(board, 'Red', row, column, direction)
-            if win:
-                winner = 'Red'
-                break
+        board.play(column)
+        display_board(board.to_board())
+        win = board.has_won('Red')
         # escape the while loop once we encounter a tie or win
         if win:
+            winner = 'Red'
             break
-        tie = check_tie(board)
+        tie = board.is_full()
         if tie:
             break
 
@@ -228,26 +215,20 @@ def main():
         if column == None:
             forfeit = True
             break
-        row = check_below(column,board)
+        row = board.next_row(column)
         while row == -1:
             print('Column full.')
             column = get_column()
-            row = check_below(column,board)
-        place_piece(board,'yellow',row,column)
-        display_board(board)
-        coords = find_adjacent(board,'y',row,column)
-        directions = find_directions(coords,row,column)
-        print(directions)
-        for direction in directions.keys():
-            win = check_win(board, 'Yellow', row, column, direction)
-            if win:
-                winner = 'Yellow'
-                break
+            row = board.next_row(column)
+        board.play(column)
+        display_board(board.to_board())
+        win = board.has_won('Yellow')
         
         # escape the while loop once we encounter a tie or win
         if win:
+            winner = 'Yellow'
             break
-        tie = check_tie(board)
+        tie = board.is_full()
         if tie:
             break
 
@@ -0,0 +1,170 @@
+"""
+Load tests the invite and game cogs against a fake Discord gateway
+
+Every simulated game gets its own channel and two fake players. Red sends the play command and yellow accepts
+the invite after a random delay. The player whose turn it is then presses the button of a random legal column,
+or reacts with --reactions, once they have seen the last move. The bot's real cogs handle every event, including
+the render queue, the timing wheel and the move log. Nothing leaves the process.
+
+Reports the latency from a button press or reaction to the edit that answers it, throughput, event loop lag and peak memory.
+It runs in a temporary folder so the move log doesn't touch the bot's own files.
+
+    python load_test.py --games 2000 --ramp 10 --think-time 1.0 --api-latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Connect_Four_Bot"))  # The bot imports its modules from its own folder
+
+from cogs.game_functionality import Game_Manager, moves
+from cogs.invite_game import Invite_Manager
+from engine.bitboard import NUM_COLS
+from utils.fake_gateway import Fake_Client, Fake_Context, Fake_User
+from utils.message_registry import message_registry
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Not available on Windows
+
+def percentile(values, fraction):
+    """
+    Gets a percentile of a list of numbers
+    Parameters: values of type list, fraction between 0 and 1 of type float
+    Returns: value of type float, None if the list is empty
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+async def watch_loop_lag(lags, interval = 0.05):
+    """
+    Measures how late the event loop wakes up a task that sleeps for a fixed interval
+    Parameters: lags list the measurements are added to, interval in seconds of type float
+    Returns: None
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - start - interval)
+
+async def play_game(client, invite_manager, number, args, rng, stats):
+    """
+    Plays one game from the play command to the end
+    Parameters: client of type Fake_Client, invite_manager of type Invite_Manager, number of the game of type int, args from the command line, rng of type random.Random, stats of type dict
+    Returns: None
+    """
+    await asyncio.sleep(rng.uniform(0, args.ramp))  # Spread the start of the games over the ramp up
+    channel = client.create_channel()
+    red = Fake_User(f"Red {number}")
+    yellow = Fake_User(f"Yellow {number}")
+    context = Fake_Context(channel, red)
+    if args.ai:
+        await invite_manager.play.callback(invite_manager, context, "ai", args.ai)
+    else:
+        await invite_manager.play.callback(invite_manager, context)
+        await asyncio.sleep(rng.expovariate(1 / args.accept_time))
+        client.add_reaction(channel.messages[-1], "✅", yellow)
+    message = await channel.wait_for_message(len(channel.messages) if args.ai else 1)
+    game = message_registry.get(message.id)
+    stats["started"] += 1
+
+    while not game.game_over:
+        if args.ai and not game.red_turn:
+            await message.wait_for_edit()  # Wait for the computer's move to show up
+            continue
+        await asyncio.sleep(rng.expovariate(1 / args.think_time))
+        if game.game_over:
+            break  # Timed out while thinking
+        player = red if game.red_turn else yellow
+        column = rng.choice([column for column in range(NUM_COLS) if game.board.can_play(column)])
+        if args.reactions:
+            client.add_reaction(message, moves[column], player)
+        else:
+            client.press_button(message, message.view.children[column].custom_id, player)
+        stats["moves"] += 1
+        while message.waiting:
+            await message.wait_for_edit()  # Players only move again once they see the board change
+    stats["finished"] += 1
+
+async def run_load_test(args):
+    """
+    Runs every simulated game and collects the measurements
+    Parameters: args from the command line
+    Returns: Dict of measurements
+    """
+    client = Fake_Client(args.api_latency)
+    game_manager = Game_Manager(client)
+    invite_manager = Invite_Manager(client)
+    await client.add_cog(game_manager)
+    await client.add_cog(invite_manager)
+
+    lags = []
+    watcher = asyncio.create_task(watch_loop_lag(lags))
+    rng = random.Random(args.seed)
+    stats = {"started": 0, "finished": 0, "moves": 0}
+    start = time.perf_counter()
+    results = await asyncio.gather(*(play_game(client, invite_manager, number, args, rng, stats) for number in range(args.games)), return_exceptions = True)
+    elapsed = time.perf_counter() - start
+    await game_manager.render_queue.drain()
+    watcher.cancel()
+    await client.close()
+
+    failures = [result for result in results if isinstance(result, Exception)]
+    for failure in failures[:5]:
+        print(f"Game failed: {failure!r}")
+    latencies = client.latencies
+    return {
+        "games": args.games,
+        "finished": stats["finished"],
+        "failed": len(failures),
+        "moves": stats["moves"],
+        "seconds": elapsed,
+        "moves_per_sec": stats["moves"] / elapsed,
+        "latency": {name: percentile(latencies, fraction) for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))},
+        "loop_lag": {name: percentile(lags, fraction) for name, fraction in (("p50", 0.5), ("p99", 0.99), ("max", 1.0))},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description = "Load test the bot's cogs with fake Discord users")
+    parser.add_argument("--games", type = int, default = 1000, help = "number of games to play at once")
+    parser.add_argument("--ramp", type = float, default = 5.0, help = "seconds over which the games start")
+    parser.add_argument("--think-time", type = float, default = 1.0, help = "average seconds a player takes to react")
+    parser.add_argument("--accept-time", type = float, default = 1.0, help = "average seconds before an invite is accepted")
+    parser.add_argument("--api-latency", type = float, default = 0.0, help = "seconds every fake Discord request takes")
+    parser.add_argument("--reactions", action = "store_true", help = "move with reactions instead of the column buttons")
+    parser.add_argument("--ai", default = None, help = "play every game against the computer at this difficulty")
+    parser.add_argument("--trace-memory", action = "store_true", help = "measure peak Python allocations with tracemalloc (slower)")
+    parser.add_argument("--seed", type = int, default = None, help = "random seed")
+    args = parser.parse_args()
+
+    if args.trace_memory:
+        tracemalloc.start()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)  # The game manager writes its move log to the working folder
+        report = asyncio.run(run_load_test(args))
+
+    print(f"{report['finished']}/{report['games']} games finished ({report['failed']} failed) in {report['seconds']:.1f}s")
+    print(f"{report['moves']} moves, {report['moves_per_sec']:.0f} moves/s")
+    latency = report["latency"]
+    if latency["p50"] is not None:
+        print(f"Move to edit latency: p50 {latency['p50'] * 1000:.1f} ms, p90 {latency['p90'] * 1000:.1f} ms, p99 {latency['p99'] * 1000:.1f} ms, max {latency['max'] * 1000:.1f} ms")
+    lag = report["loop_lag"]
+    if lag["p50"] is not None:
+        print(f"Event loop lag: p50 {lag['p50'] * 1000:.1f} ms, p99 {lag['p99'] * 1000:.1f} ms, max {lag['max'] * 1000:.1f} ms")
+    if args.trace_memory:
+        print(f"Peak Python allocations: {tracemalloc.get_traced_memory()[1] / 2 ** 20:.1f} MiB")
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"Peak resident memory: {peak / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10):.1f} MiB")  # macOS reports bytes, Linux kilobytes
+
+if __name__ == "__main__":
+    main()
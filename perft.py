@@ -0,0 +1,309 @@
+"""
+Enumerates every position reachable from the empty board up to a number of moves, perft style
+
+Counts the positions, wins and draws at each ply and reports nodes per second, which makes it a fixed
+workload for timing move generation and win detection. A game ends at the first four in a row, so positions
+after a win aren't expanded. Three detectors can drive the enumeration:
+    bitboard  the engine's Position, the default
+    legacy    connect4.py's list board and its find_adjacent, find_directions and check_win chain
+    check     both at once, reporting every move where they disagree about a win
+
+check_win counts exactly four in a line, so from ply 9 on it misses moves that fill the gap between two
+lines and make five or more in a row. Those moves show up as disagreements.
+
+--dedupe counts each distinct position once per ply instead of once per move order, expanding the tree one
+ply at a time. Otherwise the subtrees below --split-ply are walked depth first by separate worker processes.
+
+    python perft.py --depth 8
+    python perft.py --depth 9 --dedupe --detector check
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Connect_Four_Bot"))  # The bot imports its modules from its own folder
+
+import connect4
+from engine.bitboard import Position, NUM_COLS, NUM_CELLS
+
+DETECTORS = ("bitboard", "legacy", "check")
+MAX_EXAMPLES = 5  # Disagreements listed by --detector check, every one is counted
+COLORS = ("Red", "Yellow")
+
+class Perft_Counts:
+    """
+    Class contains the counts of an enumeration, one entry per ply
+    Attributes:
+        positions: Positions reached at each ply, including the ones a win or draw ended
+        wins: Positions at each ply where the last move connected four
+        draws: Positions at each ply where the board filled up without a win
+        mismatches: Moves at each ply where the two detectors disagreed
+        examples: List of (moves, bitboard result, legacy result) for the first disagreements found
+    """
+    def __init__(self, depth):
+        """
+        Initializes empty counts
+        Parameters: self, depth of type int
+        Returns: None
+        """
+        self.positions = [0] * (depth + 1)
+        self.wins = [0] * (depth + 1)
+        self.draws = [0] * (depth + 1)
+        self.mismatches = [0] * (depth + 1)
+        self.examples = []
+
+    def count(self, moves, won, legacy_won = None):
+        """
+        Counts one position
+        Parameters: self, moves leading to the position of type list or bytes, won of type bool, legacy_won of type bool or None when only one detector runs
+        Returns: None
+        """
+        ply = len(moves)
+        self.positions[ply] += 1
+        if won:
+            self.wins[ply] += 1
+        elif ply == NUM_CELLS:
+            self.draws[ply] += 1
+        if legacy_won is not None and legacy_won != won:
+            self.mismatches[ply] += 1
+            if len(self.examples) < MAX_EXAMPLES:
+                self.examples.append((bytes(moves), won, legacy_won))
+
+    def add(self, other):
+        """
+        Adds the counts of another enumeration
+        Parameters: self, other of type Perft_Counts
+        Returns: None
+        """
+        for name in ("positions", "wins", "draws", "mismatches"):
+            totals = getattr(self, name)
+            for ply, value in enumerate(getattr(other, name)):
+                totals[ply] += value
+        self.examples = (self.examples + other.examples)[:MAX_EXAMPLES]
+
+def legacy_board(moves):
+    """
+    Builds connect4.py's list board for a sequence of moves
+    Parameters: moves of type iterable of int
+    Returns: list board from connect4.create_board
+    """
+    board = connect4.create_board()
+    for ply, column in enumerate(moves):
+        connect4.place_piece(board, COLORS[ply % 2], connect4.check_below(column, board), column)
+    return board
+
+def legacy_won(board, color, row, column):
+    """
+    Checks if the piece just placed connected four with the chain connect4.py's game loop used
+    Parameters: board of type list, color of type str, row index of type int, column index of type int
+    Returns: True or False based on if check_win found four in a row in any direction
+    """
+    coords = connect4.find_adjacent(board, color.lower()[0], row, column)
+    return any(connect4.check_win(board, color, row, column, direction) for direction in connect4.find_directions(coords, row, column))
+
+def walk_bitboard(position, depth, counts):
+    """
+    Counts every position below a bitboard position depth first
+    Parameters: position of type Position, depth of type int, counts of type Perft_Counts
+    Returns: None
+    """
+    moves = position.moves
+    if len(moves) == depth:
+        return
+    for column in range(NUM_COLS):
+        if not position.can_play(column):
+            continue
+        won = position.is_winning_move(column)
+        position.play(column)
+        counts.count(moves, won)
+        if not won:
+            walk_bitboard(position, depth, counts)
+        position.undo()
+
+def walk_legacy(board, moves, depth, counts):
+    """
+    Counts every position below a list board depth first, using only connect4.py's functions
+    Parameters: board of type list, moves leading to the board of type list, depth of type int, counts of type Perft_Counts
+    Returns: None
+    """
+    if len(moves) == depth:
+        return
+    color = COLORS[len(moves) % 2]
+    for column in range(NUM_COLS):
+        row = connect4.check_below(column, board)
+        if row == -1:
+            continue  # Column is full
+        connect4.place_piece(board, color, row, column)
+        moves.append(column)
+        won = legacy_won(board, color, row, column)
+        counts.count(moves, won)
+        if not won and not connect4.check_tie(board):
+            walk_legacy(board, moves, depth, counts)
+        moves.pop()
+        board[row][column] = "*"
+
+def walk_check(position, board, depth, counts):
+    """
+    Counts every position below a position with both detectors, the bitboard decides which games go on
+    Parameters: position of type Position, board of type list with the same pieces, depth of type int, counts of type Perft_Counts
+    Returns: None
+    """
+    moves = position.moves
+    if len(moves) == depth:
+        return
+    color = COLORS[len(moves) % 2]
+    for column in range(NUM_COLS):
+        if not position.can_play(column):
+            continue
+        won = position.is_winning_move(column)
+        row = connect4.check_below(column, board)
+        connect4.place_piece(board, color, row, column)
+        position.play(column)
+        counts.count(moves, won, legacy_won(board, color, row, column))
+        if not won:
+            walk_check(position, board, depth, counts)
+        position.undo()
+        board[row][column] = "*"
+
+def perft_subtree(moves, depth, detector):
+    """
+    Counts every position below a starting position, run inside a worker process
+    Parameters: moves of the starting position of type bytes, depth of type int, detector of type str
+    Returns: Perft_Counts
+    """
+    counts = Perft_Counts(depth)
+    if detector == "bitboard":
+        walk_bitboard(Position.from_moves(moves), depth, counts)
+    elif detector == "legacy":
+        walk_legacy(legacy_board(moves), list(moves), depth, counts)
+    else:
+        walk_check(Position.from_moves(moves), legacy_board(moves), depth, counts)
+    return counts
+
+def split_points(depth, split_ply):
+    """
+    Lists the starting positions handed to the workers, every game still going at split_ply
+    Parameters: depth of type int, split_ply of type int
+    Returns: Tuple of (list of moves of type bytes, Perft_Counts of the plies up to split_ply)
+    """
+    split_ply = min(split_ply, depth)
+    counts = Perft_Counts(depth)
+    starts = []
+
+    def visit(position):
+        if len(position.moves) == split_ply:
+            starts.append(position.serialize())
+            return
+        for column in range(NUM_COLS):
+            if not position.can_play(column):
+                continue
+            won = position.is_winning_move(column)
+            position.play(column)
+            counts.count(position.moves, won)
+            if not won:
+                visit(position)
+            position.undo()
+
+    visit(Position())
+    return starts, counts
+
+def expand(frontier, detector):
+    """
+    Finds every distinct position one move past a list of positions, run inside a worker process
+    Parameters: frontier of type list of moves of type bytes, detector of type str
+    Returns: Dict with position keys as keys, values contain (moves, bitboard result, legacy result) where a result is None if its detector didn't run
+    """
+    children = {}
+    for moves in frontier:
+        position = Position.from_moves(moves) if detector != "legacy" else None
+        board = legacy_board(moves) if detector != "bitboard" else None
+        color = COLORS[len(moves) % 2]
+        for column in range(NUM_COLS):
+            won = legacy = None
+            if position is not None:
+                if not position.can_play(column):
+                    continue
+                won = position.is_winning_move(column)
+                position.play(column)
+                key = position.key()
+                position.undo()
+            if board is not None:
+                row = connect4.check_below(column, board)
+                if row == -1:
+                    continue
+                connect4.place_piece(board, color, row, column)
+                legacy = legacy_won(board, color, row, column)
+                if position is None:
+                    key = "".join("".join(row_cells) for row_cells in board)
+                board[row][column] = "*"
+            if key not in children:
+                children[key] = (moves + bytes([column]), won, legacy)
+    return children
+
+def perft_dedupe(depth, detector, executor, workers):
+    """
+    Counts every distinct position at each ply, expanding one ply at a time with the frontier split between the workers
+    Parameters: depth of type int, detector of type str, executor of type ProcessPoolExecutor, workers of type int
+    Returns: Perft_Counts
+    """
+    counts = Perft_Counts(depth)
+    counts.count(b"", False)
+    frontier = [b""]
+    for ply in range(depth):
+        size = max(1, -(-len(frontier) // (4 * workers)))  # A few chunks per worker keeps them all busy
+        chunks = [frontier[start:start + size] for start in range(0, len(frontier), size)]
+        children = {}
+        for chunk_children in executor.map(expand, chunks, [detector] * len(chunks)):
+            children.update(chunk_children)  # Positions found by several workers are counted once
+        frontier = []
+        for moves, won, legacy in children.values():
+            ended = won if detector != "legacy" else legacy
+            if detector == "check":
+                counts.count(moves, won, legacy)
+            else:
+                counts.count(moves, ended)
+            if not ended and len(moves) < NUM_CELLS:
+                frontier.append(moves)
+        if not frontier:
+            break
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description = "Count every position reachable from the empty board to time and cross-check win detection")
+    parser.add_argument("--depth", type = int, default = 7, help = "number of moves to enumerate")
+    parser.add_argument("--detector", choices = DETECTORS, default = "bitboard", help = "win detection driving the enumeration, check runs both and compares them")
+    parser.add_argument("--dedupe", action = "store_true", help = "count each distinct position once per ply")
+    parser.add_argument("--split-ply", type = int, default = 3, help = "ply the tree is split into worker jobs at without --dedupe")
+    parser.add_argument("--workers", type = int, default = None, help = "worker processes, defaults to the CPU count")
+    args = parser.parse_args()
+    depth = min(args.depth, NUM_CELLS)
+    workers = args.workers or os.cpu_count()
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        if args.dedupe:
+            counts = perft_dedupe(depth, args.detector, executor, workers)
+        else:
+            starts, counts = split_points(depth, args.split_ply)
+            counts.count(b"", False)
+            for subtree in executor.map(perft_subtree, starts, [depth] * len(starts), [args.detector] * len(starts)):
+                counts.add(subtree)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'ply':>3} {'positions':>12} {'wins':>10} {'draws':>6}" + (f" {'mismatches':>10}" if args.detector == "check" else ""))
+    for ply in range(depth + 1):
+        line = f"{ply:>3} {counts.positions[ply]:>12} {counts.wins[ply]:>10} {counts.draws[ply]:>6}"
+        print(line + (f" {counts.mismatches[ply]:>10}" if args.detector == "check" else ""))
+    leaves = counts.positions[depth] + sum(counts.wins[:depth]) + sum(counts.draws[:depth])
+    total = sum(counts.positions) - 1  # The empty board isn't generated
+    print(f"{leaves} leaves, {total} nodes in {elapsed:.2f}s ({total / elapsed:.0f} nodes/s, {args.detector}{', deduped' if args.dedupe else ''}, {workers} workers)")
+
+    if args.detector == "check":
+        print(f"{sum(counts.mismatches)} moves where connect4.py's check_win chain and the bitboard disagree")
+        for moves, won, legacy in counts.examples:
+            print(f"  moves {''.join(str(column) for column in moves)}: bitboard {'wins' if won else 'no win'}, check_win {'wins' if legacy else 'no win'}")
+
+if __name__ == "__main__":
+    main()
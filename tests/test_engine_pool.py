@@ -0,0 +1,41 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Connect_Four_Bot"))  # The bot imports its modules from its own folder
+
+from utils.engine_pool import Engine_Pool
+
+class Engine_Pool_Cancel_Test(unittest.IsolatedAsyncioTestCase):
+    """
+    Class contains tests telling a job cancelled by its game ending apart from a caller that was cancelled
+    """
+    async def asyncSetUp(self):
+        self.pool = Engine_Pool(max_workers = 1)
+        # The executor hands a worker one job more than it runs, these keep the only worker busy so later jobs stay queued
+        self.busy = asyncio.gather(*(self.pool.submit("busy", time.sleep, 0.3) for _ in range(3)))
+        await asyncio.sleep(0.1)
+
+    async def asyncTearDown(self):
+        await self.busy
+        self.pool.shutdown()
+
+    async def test_cancelled_caller_raises(self):
+        waiting = asyncio.create_task(self.pool.submit("game", time.sleep, 0))
+        await asyncio.sleep(0.1)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(self.pool.pending, 3)
+
+    async def test_cancelled_game_returns_none(self):
+        waiting = asyncio.create_task(self.pool.submit("game", time.sleep, 0))
+        await asyncio.sleep(0.1)
+        self.pool.cancel("game")
+        self.assertIsNone(await waiting)
+        self.assertEqual(self.pool.cancelled, set())
+
+if __name__ == "__main__":
+    unittest.main()